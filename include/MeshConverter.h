@@ -29,7 +29,23 @@ extern "C" {
 		const float* ptr_uv2,
 		const float* ptr_color,
 		const float* ptr_tangents,
-		const int32_t* ptr_bitangent_signs
+		const int32_t* ptr_bitangent_signs,
+		const uint16_t* ptr_weight_bones,
+		const uint16_t* ptr_weight_values
+	);
+
+	DLL uint32_t ExportMeshNumpyEx(const mesh::mesh_export_header* header,
+		const char* output_file,
+		const float* ptr_positions,
+		const int64_t* ptr_indices,
+		const float* ptr_normals,
+		const float* ptr_uv1,
+		const float* ptr_uv2,
+		const float* ptr_color,
+		const float* ptr_tangents,
+		const int32_t* ptr_bitangent_signs,
+		const uint16_t* ptr_weight_bones,
+		const uint16_t* ptr_weight_values
 	);
 
 	DLL uint32_t ExportMorph(const char* json_data,
@@ -43,12 +59,23 @@ extern "C" {
 		const float* delta_tangents
 	);
 
+	DLL uint32_t ExportMorphNumpyEx(const morph::morph_header* header,
+		const char* names,
+		const char* output_file,
+		const float* delta_positions,
+		const float* target_colors,
+		const float* delta_normals,
+		const float* delta_tangents
+	);
+
 	DLL uint32_t ExportEmptyMorph(uint32_t n_verts, const char* output_file);
 
 	DLL const char * ImportMesh(const char* input_file);
 
 	DLL const char* ImportMeshHeader(const char* input_file);
 
+	DLL uint32_t ImportMeshHeaderEx(const char* input_file, mesh::mesh_header* header);
+
 	DLL uint32_t ImportMeshNumpy(const char* input_file,
 		float* positions,
 		int64_t* indices,
@@ -60,10 +87,24 @@ extern "C" {
 		int32_t* bitangent_signs
 	);
 
+	DLL uint32_t ImportMeshNumpyEx(const char* input_file,
+		float* positions,
+		void* indices,
+		uint32_t index_byte_size,
+		float* normals,
+		float* uv1,
+		float* uv2,
+		float* colors,
+		float* tangents,
+		int32_t* bitangent_signs
+	);
+
 	DLL const char* ImportMorph(const char* input_file);
 
 	DLL const char* ImportMorphHeader(const char* input_file);
 
+	DLL const uint8_t* ImportMorphHeaderEx(const char* input_file, morph::morph_header* header);
+
 	DLL uint32_t ImportMorphNumpy(const char* input_file, 
 		float* delta_positions, 
 		float* target_colors, 
@@ -77,5 +118,9 @@ extern "C" {
 
 	DLL const char* ImportNif(const char* input_file, bool export_havok_readable, const char* readable_filepath);
 
+	DLL const uint8_t* ImportNifBinary(const char* input_file, bool export_havok_readable, const char* readable_filepath, uint64_t* out_size);
+
+	DLL void FreeBuffer(const uint8_t* buffer);
+
 	DLL uint32_t ComposePhysicsData(const char* json_data, uint32_t platform, const char* transcript_path, const char* output_file, bool export_readable);
 }
\ No newline at end of file
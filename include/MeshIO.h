@@ -16,6 +16,30 @@ namespace mesh {
 		uint8_t r, g, b, a;
 	}vertex_color;
 
+	// Fixed layout headers exchanged with python as ctypes structures, field order must match MeshConverter.py
+	typedef struct {
+		uint32_t indices_size;
+		uint32_t num_triangles;
+		float max_border;
+		uint32_t num_weightsPerVertex;
+		uint32_t num_vertices;
+		uint32_t num_uv1;
+		uint32_t num_uv2;
+		uint32_t num_vert_colors;
+		uint32_t num_normals;
+		uint32_t num_tangents;
+		uint32_t num_weights;
+		uint32_t num_lods;
+		uint32_t num_meshlets;
+	}mesh_header;
+
+	typedef struct {
+		uint32_t num_verts;
+		uint32_t num_indices;
+		uint32_t num_weightsPerVertex;
+		float max_border;
+	}mesh_export_header;
+
 	class MeshIO
 	{
 	public:
@@ -63,6 +87,8 @@ namespace mesh {
 			const float* ptr_color,
 			const float* ptr_tangents,
 			const int32_t* ptr_bitangent_signs,
+			const uint16_t* ptr_weight_bones,
+			const uint16_t* ptr_weight_values,
 			const uint32_t options = Options::None
 		);
 
@@ -75,9 +101,37 @@ namespace mesh {
 			const float* ptr_color,
 			const float* ptr_tangents,
 			const int32_t* ptr_bitangent_signs,
+			const uint16_t* ptr_weight_bones,
+			const uint16_t* ptr_weight_values,
+			const uint32_t options = Options::None
+		);
+
+		bool LoadFromNumpy(const mesh_export_header& header,
+			const float* ptr_positions,
+			const int64_t* ptr_indices,
+			const float* ptr_normals,
+			const float* ptr_uv1,
+			const float* ptr_uv2,
+			const float* ptr_color,
+			const float* ptr_tangents,
+			const int32_t* ptr_bitangent_signs,
+			const uint16_t* ptr_weight_bones,
+			const uint16_t* ptr_weight_values,
 			const uint32_t options = Options::None
 		);
 
+		// Copies every stream but the weights, shared by the json and header entry points
+		bool LoadNumpyStreams(const mesh_export_header& header,
+			const float* ptr_positions,
+			const int64_t* ptr_indices,
+			const float* ptr_normals,
+			const float* ptr_uv1,
+			const float* ptr_uv2,
+			const float* ptr_color,
+			const float* ptr_tangents,
+			const int32_t* ptr_bitangent_signs
+		);
+
 		bool LoadFromJson(const nlohmann::json& jsonData, const float scale_factor = 1.f, const uint32_t options = Options::None);
 
 		bool LoadToNumpy(
@@ -91,6 +145,18 @@ namespace mesh {
 			int32_t* ptr_bitangent_signs
 		);
 
+		bool LoadToNumpy(
+			float* ptr_positions,
+			void* ptr_indices,
+			const uint32_t index_byte_size,
+			float* ptr_normals,
+			float* ptr_uv1,
+			float* ptr_uv2,
+			float* ptr_color,
+			float* ptr_tangents,
+			int32_t* ptr_bitangent_signs
+		);
+
 		bool SerializeToJsonStr(std::string& json_data) const;
 
 		bool SerializeToJson(nlohmann::json& jsonData) const;
@@ -184,5 +250,7 @@ namespace mesh {
 		static const uint32_t                   kIndexByteCount = 2;
 
 		static bool read_header(const std::string filename, std::string& header_str);
+
+		static bool read_header(const std::string filename, mesh_header& header);
 	};
 }
\ No newline at end of file
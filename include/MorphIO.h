@@ -61,6 +61,14 @@ namespace morph{
 		morph_key_selection _marker[4];
 	}IOffset;
 
+	// Fixed layout header exchanged with python, shape key names travel in a separate name table
+	// of names_size bytes holding every name followed by a null terminator
+	typedef struct {
+		uint32_t num_vertices;
+		uint32_t num_shape_keys;
+		uint64_t names_size;
+	}morph_header;
+
 
 	class MorphIO
 	{
@@ -84,6 +92,8 @@ namespace morph{
 
 		bool LoadFromNumpy(const std::string json_header_data, const float* delta_positions, const float* target_colors, const float* delta_normals, const float* delta_tangents, const uint32_t options);
 
+		bool LoadFromNumpy(const uint32_t num_vertices, const std::vector<std::string>& names, const float* delta_positions, const float* target_colors, const float* delta_normals, const float* delta_tangents, const uint32_t options);
+
 		bool Save(const std::string jsonMorphFile);
 
 		bool SerializeToJson(std::string& json_data);
@@ -188,6 +198,8 @@ namespace morph{
 		std::vector<std::vector<uint32_t>> per_vert_morph_key_indices;
 
 		static bool read_header(const std::string filename, std::string& header_str);
+
+		static bool read_header(const std::string filename, morph_header& header, std::vector<std::string>& names);
 	};
 
 }
\ No newline at end of file
@@ -0,0 +1,196 @@
+'''
+Long lived worker processes for the slow dll entry points (ImportNifBinary, CreateNif).
+Workers are spawned, so they share nothing with Blender. A crash in the dll only takes down the worker
+and the pool is rebuilt on the next submit. Array buffers referenced by ptr_* entries in a nif json
+are copied into one shared memory block instead of being pickled, the worker rewrites the pointers
+to its own mapping of that block before calling the dll.
+'''
+
+import os
+import json
+import threading
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import MeshConverter
+
+WORKER_CRASHED_RETURN_CODE = 98
+
+_SHM_ALIGNMENT = 64
+
+def _iter_ptr_entries(node):
+    # Yields (container, key) for every nonzero 'ptr_*' integer in a nested json structure
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(key, str) and key.startswith('ptr_') and isinstance(value, int) and value != 0:
+                yield node, key
+            elif isinstance(value, (dict, list)):
+                yield from _iter_ptr_entries(value)
+    elif isinstance(node, list):
+        for value in node:
+            if isinstance(value, (dict, list)):
+                yield from _iter_ptr_entries(value)
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # The parent owns the block, keep this process's resource tracker from unlinking it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def _pack_arrays(data: dict, arrays: list[np.ndarray]) -> tuple[shared_memory.SharedMemory | None, dict[int, int]]:
+    '''
+    Copies every array referenced by a ptr_* entry of data into one shared memory block.
+    Returns the block and a {original address: offset in block} table.
+    '''
+    by_address = {}
+    for arr in arrays:
+        if arr is None or not isinstance(arr, np.ndarray) or arr.size == 0:
+            continue
+        by_address[arr.ctypes.data] = arr
+
+    offsets = {}
+    total_size = 0
+    for container, key in _iter_ptr_entries(data):
+        address = container[key]
+        if address in offsets:
+            continue
+        if address not in by_address:
+            raise ValueError(f"'{key}' points to a buffer that was not passed to the worker pool")
+        offsets[address] = total_size
+        total_size += (by_address[address].nbytes + _SHM_ALIGNMENT - 1) // _SHM_ALIGNMENT * _SHM_ALIGNMENT
+
+    if total_size == 0:
+        return None, offsets
+
+    shm = shared_memory.SharedMemory(create=True, size=total_size)
+    for address, offset in offsets.items():
+        arr = np.ascontiguousarray(by_address[address])
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf, offset=offset)[...] = arr
+    return shm, offsets
+
+def _worker_import_nif(input_file: str, export_havok_readable: bool, readable_path: str) -> bytes:
+    return MeshConverter.ImportNifAsBinary(input_file, export_havok_readable, readable_path)
+
+def _worker_create_nif(json_data_string: str, output_file: str, assets_folder_path: str, shm_name: str | None, offsets: dict[int, int]) -> int:
+    if shm_name is None:
+        return int(MeshConverter.CreateNifFromJson(json_data_string, output_file, assets_folder_path))
+
+    shm = _attach_shared_memory(shm_name)
+    try:
+        view = np.frombuffer(shm.buf, dtype=np.uint8)
+        base_address = view.ctypes.data
+
+        data = json.loads(json_data_string)
+        for container, key in _iter_ptr_entries(data):
+            container[key] = base_address + offsets[container[key]]
+
+        rtn = int(MeshConverter.CreateNifFromJson(json.dumps(data), output_file, assets_folder_path))
+        del view
+        return rtn
+    finally:
+        shm.close()
+
+class ConverterPool():
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers if max_workers else max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            print("Converter worker pool was broken, restarting.")
+            self.shutdown(wait=False)
+            return self._get_executor().submit(fn, *args)
+
+    def _on_crash(self):
+        print("Converter worker terminated unexpectedly, restarting the pool on next use.")
+        self.shutdown(wait=False)
+
+    def import_nif(self, input_file: str, export_havok_readable: bool = False, readable_path: str = '') -> Future:
+        '''
+        Returns a future of the decoded nif (see MeshConverter.ImportNifAsNumpy), None if loading failed or the worker died.
+        '''
+        result = Future()
+        inner = self._submit(_worker_import_nif, input_file, export_havok_readable, readable_path)
+
+        def _done(f: Future):
+            try:
+                buffer = f.result()
+                result.set_result(MeshConverter.DecodeNifBinary(buffer) if len(buffer) > 0 else None)
+            except BrokenProcessPool:
+                self._on_crash()
+                result.set_result(None)
+            except Exception as e:
+                result.set_exception(e)
+        inner.add_done_callback(_done)
+        return result
+
+    def create_nif(self, data: dict, output_file: str, assets_folder_path: str, arrays: list[np.ndarray] = []) -> Future:
+        '''
+        Returns a future of the DLLReturnCode. data is the nif json dict, arrays must contain every buffer its ptr_* entries point to.
+        '''
+        if not output_file.endswith('.nif'):
+            output_file += '.nif'
+
+        shm, offsets = _pack_arrays(data, arrays)
+        result = Future()
+        try:
+            inner = self._submit(_worker_create_nif, json.dumps(data), output_file, assets_folder_path, shm.name if shm else None, offsets)
+        except Exception:
+            if shm:
+                shm.close()
+                shm.unlink()
+            raise
+
+        def _done(f: Future):
+            try:
+                result.set_result(MeshConverter.DLLReturnCode(f.result()))
+            except BrokenProcessPool:
+                self._on_crash()
+                result.set_result(MeshConverter.DLLReturnCode(WORKER_CRASHED_RETURN_CODE))
+            except Exception as e:
+                result.set_exception(e)
+            finally:
+                if shm:
+                    shm.close()
+                    shm.unlink()
+        inner.add_done_callback(_done)
+        return result
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def GetPool(max_workers: int | None = None) -> ConverterPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or (max_workers and _pool.max_workers != max_workers):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ConverterPool(max_workers)
+        return _pool
+
+def ShutdownPool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
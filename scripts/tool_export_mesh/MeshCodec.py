@@ -0,0 +1,600 @@
+'''
+Pure NumPy reader and writer for Starfield .mesh files.
+
+Mirrors the layout read by MeshIO::Deserialize and written by MeshIO::Serialize in the
+C++ converter, without loading MeshConverter.dll. Every section is decoded with a single
+np.frombuffer call, so this runs headless on any platform that has NumPy.
+
+Layout (little endian):
+    uint32 magic
+    uint32 num_indices, uint16[num_indices]
+    float  max_border
+    uint32 num_weightsPerVertex
+    uint32 num_vertices, int16[num_vertices * 3] (snorm, scaled by max_border)
+    uint32 num_uv1, half[num_uv1 * 2]
+    uint32 num_uv2, half[num_uv2 * 2]
+    uint32 num_colors, uint8[num_colors * 4]
+    uint32 num_normals, uint32[num_normals] (DEC3N)
+    uint32 num_tangents, uint32[num_tangents] (DEC3N, w = bitangent sign)
+    uint32 num_weights, (uint16 bone, uint16 weight)[num_vertices * num_weightsPerVertex]
+    uint32 num_lods, { uint32 n, uint16[n] } * num_lods
+    uint32 num_meshlets, uint32[num_meshlets * 4]
+    uint32 num_culldata, float[num_meshlets * 6]
+'''
+import mmap
+import functools
+import numpy as np
+
+MESH_MAGIC = 2
+
+MESHLET_DTYPE = np.dtype([('vert_count', '<u4'), ('vert_offset', '<u4'), ('prim_count', '<u4'), ('prim_offset', '<u4')])
+CULLDATA_DTYPE = np.dtype([('center', '<f4', 3), ('expand', '<f4', 3)])
+
+class MeshFormatException(Exception):
+    pass
+
+def snorm_to_float(snorm:np.ndarray, max_border:float) -> np.ndarray:
+    '''
+    int16 snorm -> float32, negative values are scaled by 32768 and positive values by 32767.
+    '''
+    values = snorm.astype(np.float32)
+    scale = np.where(snorm < 0, np.float32(max_border / 32768.0), np.float32(max_border / 32767.0))
+    values *= scale
+    return values
+
+def float_to_snorm(values:np.ndarray, max_border:float) -> np.ndarray:
+    '''
+    float -> int16 snorm, rounding half away from zero like utils::double_to_snorm.
+    '''
+    normalized = np.clip(np.asarray(values, dtype=np.float64) / max_border, -1.0, 1.0)
+    scaled = normalized * np.where(normalized >= 0, 32767.0, 32768.0)
+    return np.copysign(np.floor(np.abs(scaled) + 0.5), scaled).astype('<i2')
+
+def float_to_half(values:np.ndarray) -> np.ndarray:
+    '''
+    float32 -> half bits, truncating the mantissa like utils::floatToHalf instead of rounding like astype(np.float16).
+    '''
+    x = np.ascontiguousarray(values, dtype=np.float32).view(np.uint32)
+    sign = ((x >> 16) & 0x8000).astype(np.uint32)
+    hx = x & 0x7fffffff
+    exponent = hx >> 23
+    mantissa = (hx & 0x007fffff) >> 13
+
+    normal = ((exponent.astype(np.int64) - 0x70) << 10).astype(np.uint32) | mantissa
+    subnormal_shift = np.clip(0x71 - exponent.astype(np.int64), 0, 31).astype(np.uint32)
+    subnormal = (mantissa | 0x400) >> subnormal_shift
+
+    half = sign | np.where(exponent > 0x70, normal, subnormal)
+    half = np.where(hx < 0x33800000, sign, half)
+    half = np.where(hx >= 0x477fffff, sign | 0x7c00, half)
+    half = np.where(hx > 0x7f800000, 0x7e00, half)
+    return half.astype('<u2')
+
+def decode_dec3n(packed:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    uint32 DEC3N -> (N, 3) float32 vectors and (N,) int32 w bits.
+    '''
+    packed = packed.astype(np.uint32, copy=False)
+    vectors = np.empty((len(packed), 3), dtype=np.float32)
+    vectors[:, 0] = packed & 1023
+    vectors[:, 1] = (packed >> 10) & 1023
+    vectors[:, 2] = (packed >> 20) & 1023
+    vectors /= np.float32(511.5)
+    vectors -= np.float32(1.0)
+    w = (packed >> 30).astype(np.int32)
+    return vectors, w
+
+def encode_dec3n(vectors:np.ndarray, w:int|np.ndarray = 1) -> np.ndarray:
+    '''
+    (N, 3) float vectors in [-1, 1] -> uint32 DEC3N, truncating like utils::encodeDEC3N.
+    '''
+    quantized = ((np.clip(vectors, -1.0, 1.0) + 1.0) * 511.5).astype(np.uint32) & 1023
+    packed = quantized[:, 0] | (quantized[:, 1] << 10) | (quantized[:, 2] << 20)
+    packed |= (np.asarray(w, dtype=np.uint32) & 0b11) << 30
+    return packed.astype('<u4')
+
+def _read_u32(buffer, offset:int) -> int:
+    if offset + 4 > len(buffer):
+        raise MeshFormatException(f"Unexpected end of file at offset {offset:#x}")
+    return int(np.frombuffer(buffer, dtype='<u4', count=1, offset=offset)[0])
+
+def read_section_table(buffer) -> dict:
+    '''
+    Walks the section counters of a .mesh buffer without decoding any stream.
+        return: {section_name: (byte_offset, count)} plus the scalar header fields.
+    '''
+    table = {}
+    offset = 0
+
+    table['magic'] = _read_u32(buffer, offset)
+    offset += 4
+
+    num_indices = _read_u32(buffer, offset)
+    table['indices'] = (offset + 4, num_indices)
+    offset += 4 + num_indices * 2
+
+    if offset + 8 > len(buffer):
+        raise MeshFormatException(f"Unexpected end of file at offset {offset:#x}")
+    table['max_border'] = float(np.frombuffer(buffer, dtype='<f4', count=1, offset=offset)[0])
+    table['num_weightsPerVertex'] = _read_u32(buffer, offset + 4)
+    offset += 8
+
+    num_vertices = _read_u32(buffer, offset)
+    table['positions'] = (offset + 4, num_vertices)
+    offset += 4 + num_vertices * 6
+
+    for name, stride in (('uv1', 4), ('uv2', 4), ('colors', 4), ('normals', 4), ('tangents', 4)):
+        count = _read_u32(buffer, offset)
+        table[name] = (offset + 4, count)
+        offset += 4 + count * stride
+
+    num_weights = _read_u32(buffer, offset)
+    num_weight_entries = num_vertices * table['num_weightsPerVertex'] if num_weights != 0 else 0
+    table['weights'] = (offset + 4, num_weight_entries)
+    offset += 4 + num_weight_entries * 4
+
+    num_lods = _read_u32(buffer, offset)
+    offset += 4
+    lods = []
+    for _ in range(num_lods):
+        count = _read_u32(buffer, offset)
+        lods.append((offset + 4, count))
+        offset += 4 + count * 2
+    table['lods'] = lods
+
+    num_meshlets = _read_u32(buffer, offset)
+    table['meshlets'] = (offset + 4, num_meshlets)
+    offset += 4 + num_meshlets * MESHLET_DTYPE.itemsize
+
+    # The reader always consumes one cull entry per meshlet, regardless of the stored counter.
+    table['num_culldata'] = _read_u32(buffer, offset)
+    table['culldata'] = (offset + 4, num_meshlets)
+    offset += 4 + num_meshlets * CULLDATA_DTYPE.itemsize
+
+    if offset > len(buffer):
+        raise MeshFormatException(f"Mesh file truncated, expected {offset} bytes, got {len(buffer)}")
+
+    table['size'] = offset
+    return table
+
+def decode_section(buffer, table:dict, name:str):
+    '''
+    Decodes a single stream of a .mesh buffer described by read_section_table().
+    '''
+    match name:
+        case 'indices':
+            offset, count = table['indices']
+            return np.frombuffer(buffer, dtype='<u2', count=count, offset=offset)
+        case 'positions':
+            offset, count = table['positions']
+            snorm = np.frombuffer(buffer, dtype='<i2', count=count * 3, offset=offset).reshape(-1, 3)
+            return snorm_to_float(snorm, table['max_border'])
+        case 'uv1' | 'uv2':
+            offset, count = table[name]
+            return np.frombuffer(buffer, dtype='<f2', count=count * 2, offset=offset).reshape(-1, 2).astype(np.float32)
+        case 'colors':
+            offset, count = table['colors']
+            rgba = np.frombuffer(buffer, dtype=np.uint8, count=count * 4, offset=offset).reshape(-1, 4)
+            return rgba.astype(np.float32) / np.float32(255.0)
+        case 'normals':
+            offset, count = table['normals']
+            return decode_dec3n(np.frombuffer(buffer, dtype='<u4', count=count, offset=offset))[0]
+        case 'tangents':
+            offset, count = table['tangents']
+            return decode_dec3n(np.frombuffer(buffer, dtype='<u4', count=count, offset=offset))
+        case 'weights':
+            offset, count = table['weights']
+            num_weights_per_vertex = max(table['num_weightsPerVertex'], 1)
+            pairs = np.frombuffer(buffer, dtype='<u2', count=count * 2, offset=offset).reshape(-1, num_weights_per_vertex, 2)
+            return pairs[..., 0], pairs[..., 1]
+        case 'lods':
+            return [np.frombuffer(buffer, dtype='<u2', count=count, offset=offset) for offset, count in table['lods']]
+        case 'meshlets':
+            offset, count = table['meshlets']
+            return np.frombuffer(buffer, dtype=MESHLET_DTYPE, count=count, offset=offset)
+        case 'culldata':
+            offset, count = table['culldata']
+            return np.frombuffer(buffer, dtype=CULLDATA_DTYPE, count=count, offset=offset)
+        case _:
+            raise KeyError(f"Unknown mesh section: {name}")
+
+class MeshFile():
+    '''
+    Memory mapped .mesh file. The section table is parsed once on open; every stream is decoded
+    on first access and cached. Header fields and bounds never touch vertex data.
+
+        with MeshFile(path) as mesh:
+            if mesh.num_vertices > 60000:
+                positions = mesh.positions
+    '''
+    def __init__(self, input_file:str):
+        self.path = input_file
+        self._file = open(input_file, 'rb')
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise MeshFormatException(f"Empty mesh file: {input_file}")
+        try:
+            self.table = read_section_table(self._buffer)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Drop cached views first, the map can only be closed once no buffer export is alive.
+        for name in [name for name, value in vars(type(self)).items() if isinstance(value, functools.cached_property)]:
+            self.__dict__.pop(name, None)
+        if self._buffer is not None:
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass # Views handed out to the caller are still alive, the map is released with them.
+            self._buffer = None
+        self._file.close()
+
+    def _decode(self, name:str):
+        if self._buffer is None:
+            raise ValueError(f"MeshFile {self.path} is closed")
+        return decode_section(self._buffer, self.table, name)
+
+    @property
+    def max_border(self) -> float:
+        return self.table['max_border']
+
+    @property
+    def num_vertices(self) -> int:
+        return self.table['positions'][1]
+
+    @property
+    def num_indices(self) -> int:
+        return self.table['indices'][1]
+
+    @property
+    def num_triangles(self) -> int:
+        return self.num_indices // 3
+
+    @property
+    def num_weights_per_vertex(self) -> int:
+        return self.table['num_weightsPerVertex'] if self.table['weights'][1] else 0
+
+    @property
+    def num_lods(self) -> int:
+        return len(self.table['lods'])
+
+    @property
+    def num_meshlets(self) -> int:
+        return self.table['meshlets'][1]
+
+    @property
+    def has_uv2(self) -> bool:
+        return self.table['uv2'][1] == self.num_vertices and self.num_vertices > 0
+
+    @property
+    def has_colors(self) -> bool:
+        return self.table['colors'][1] == self.num_vertices and self.num_vertices > 0
+
+    @property
+    def has_weights(self) -> bool:
+        return self.num_weights_per_vertex > 0
+
+    @functools.cached_property
+    def bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        (min, max) corners. Uses the union of the meshlet cull boxes when present, otherwise the
+        max_border cube the positions are quantized in.
+        '''
+        if self.num_meshlets > 0:
+            culldata = self.culldata
+            return (culldata['center'] - culldata['expand']).min(axis=0), (culldata['center'] + culldata['expand']).max(axis=0)
+        border = np.full(3, self.max_border, dtype=np.float32)
+        return -border, border
+
+    @functools.cached_property
+    def indices(self) -> np.ndarray:
+        return self._decode('indices')
+
+    @functools.cached_property
+    def triangles(self) -> np.ndarray:
+        return self.indices[:self.num_triangles * 3].reshape(-1, 3)
+
+    @functools.cached_property
+    def positions(self) -> np.ndarray:
+        return self._decode('positions')
+
+    @functools.cached_property
+    def uv1(self) -> np.ndarray:
+        return self._decode('uv1')
+
+    @functools.cached_property
+    def uv2(self) -> np.ndarray:
+        return self._decode('uv2')
+
+    @functools.cached_property
+    def colors(self) -> np.ndarray:
+        return self._decode('colors')
+
+    @functools.cached_property
+    def normals(self) -> np.ndarray:
+        return self._decode('normals')
+
+    @functools.cached_property
+    def _tangent_frame(self) -> tuple[np.ndarray, np.ndarray]:
+        return self._decode('tangents')
+
+    @property
+    def tangents(self) -> np.ndarray:
+        return self._tangent_frame[0]
+
+    @property
+    def bitangent_signs(self) -> np.ndarray:
+        return self._tangent_frame[1]
+
+    @functools.cached_property
+    def weights(self) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        (bones, weights), both (num_vertices, num_weights_per_vertex) uint16 views.
+        '''
+        return self._decode('weights')
+
+    @functools.cached_property
+    def lods(self) -> list[np.ndarray]:
+        return self._decode('lods')
+
+    @functools.cached_property
+    def meshlets(self) -> np.ndarray:
+        return self._decode('meshlets')
+
+    @functools.cached_property
+    def culldata(self) -> np.ndarray:
+        return self._decode('culldata')
+
+def ImportMeshAsNumpy(input_file: str) -> dict:
+    '''
+    Same dict layout as MeshConverter.ImportMeshAsNumpy, with the weight, LOD, meshlet and
+    culldata sections appended.
+    '''
+    with open(input_file, 'rb') as f:
+        buffer = f.read()
+
+    table = read_section_table(buffer)
+
+    num_vertices = table['positions'][1]
+    num_indices = table['indices'][1]
+    num_triangles = num_indices // 3
+
+    tangents, tangent_w = decode_section(buffer, table, 'tangents')
+    weight_bones, weight_values = decode_section(buffer, table, 'weights')
+
+    uv2 = decode_section(buffer, table, 'uv2')
+    if len(uv2) != num_vertices:
+        uv2 = np.zeros((num_vertices, 2), dtype=np.float32)
+
+    color = decode_section(buffer, table, 'colors')
+    if len(color) != num_vertices:
+        color = np.zeros((num_vertices, 4), dtype=np.float32)
+
+    return {
+        "num_verts": num_vertices,
+        "num_indices": num_indices,
+        "num_triangles": num_triangles,
+        "num_weightsPerVertex": table['num_weightsPerVertex'],
+        "max_border": table['max_border'],
+        "positions_raw": decode_section(buffer, table, 'positions'),
+        "vertex_indices_raw": decode_section(buffer, table, 'indices')[:num_triangles * 3].astype(np.int64).reshape(-1, 3),
+        "normals": decode_section(buffer, table, 'normals'),
+        "uv_coords": decode_section(buffer, table, 'uv1'),
+        "uv_coords_2": uv2,
+        "vertex_color": color,
+        "tangents": tangents,
+        "bitangent_signs": tangent_w,
+        "vertex_weight_bones": weight_bones.copy(),
+        "vertex_weight_values": weight_values.copy(),
+        "lods": [lod.copy() for lod in decode_section(buffer, table, 'lods')],
+        "meshlets": decode_section(buffer, table, 'meshlets').copy(),
+        "culldata": decode_section(buffer, table, 'culldata').copy(),
+    }
+
+def quantize_weight_list(vertex_weights:list, num_verts:int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    [vertex: [[bone, weight], ...]] -> normalized (N, k) uint16 bone and weight arrays.
+    '''
+    if len(vertex_weights) == 0:
+        return np.zeros((num_verts, 0), dtype=np.uint16), np.zeros((num_verts, 0), dtype=np.uint16)
+
+    lengths = np.fromiter((len(vw) for vw in vertex_weights), dtype=np.int64, count=len(vertex_weights))
+    k = int(lengths.max())
+    flat = np.array([pair for vw in vertex_weights for pair in vw], dtype=np.float64).reshape(-1, 2)
+
+    rows = np.repeat(np.arange(len(vertex_weights)), lengths)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    bones = np.zeros((len(vertex_weights), k), dtype=np.float64)
+    weights = np.zeros((len(vertex_weights), k), dtype=np.float64)
+    bones[rows, cols] = flat[:, 0]
+    weights[rows, cols] = flat[:, 1]
+    return bones.astype(np.uint16), quantize_weights(weights)
+
+def dense_weights_from_csr(indptr:np.ndarray, bones:np.ndarray, weights:np.ndarray, max_weights:int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    CSR (indptr, bone, weight) per vertex -> (N, k) uint16 bone and row normalized float64 weight arrays.
+    Repeated bones of a vertex are summed, only the max_weights heaviest are kept, heaviest first.
+    Vertices without weights get bone 0 with weight 0 in their first slot.
+    '''
+    num_rows = len(indptr) - 1
+    rows = np.repeat(np.arange(num_rows, dtype=np.int64), np.diff(indptr))
+    bones = np.asarray(bones, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    # Merge on (vertex, bone) keys, np.unique returns them sorted by vertex
+    num_bones = int(bones.max()) + 1 if len(bones) > 0 else 1
+    keys, inverse = np.unique(rows * num_bones + bones, return_inverse=True)
+    merged = np.bincount(inverse.ravel(), weights=weights, minlength=len(keys))
+    keep = merged != 0
+    keys, merged = keys[keep], merged[keep]
+    rows, bones = np.divmod(keys, num_bones)
+
+    counts = np.bincount(rows, minlength=num_rows)
+    width = max(int(counts.max()) if num_rows > 0 else 0, 1)
+    cols = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # Padding sorts below every real weight
+    dense_weights = np.full((num_rows, width), -1.0)
+    dense_bones = np.zeros((num_rows, width), dtype=np.int64)
+    dense_weights[rows, cols] = merged
+    dense_bones[rows, cols] = bones
+
+    k = min(width, max(int(max_weights), 1))
+    if width > k:
+        top = np.argpartition(-dense_weights, k - 1, axis=1)[:, :k]
+        dense_weights = np.take_along_axis(dense_weights, top, axis=1)
+        dense_bones = np.take_along_axis(dense_bones, top, axis=1)
+
+    order = np.argsort(-dense_weights, axis=1, kind='stable')
+    dense_weights = np.maximum(np.take_along_axis(dense_weights, order, axis=1), 0.0)
+    dense_bones = np.take_along_axis(dense_bones, order, axis=1)
+    dense_bones[dense_weights == 0] = 0
+
+    sums = dense_weights.sum(axis=1, keepdims=True)
+    normalized = np.divide(dense_weights, sums, out=np.zeros_like(dense_weights), where=sums > 0)
+    return dense_bones.astype(np.uint16), normalized
+
+def quantize_weights(weights:np.ndarray) -> np.ndarray:
+    '''
+    (N, k) float weights -> (N, k) uint16 weights normalized per row to 65535.
+    '''
+    sums = weights.sum(axis=1, keepdims=True)
+    normalized = np.divide(weights, sums, out=np.zeros_like(weights, dtype=np.float64), where=sums > 0)
+    return np.clip(np.floor(normalized * 65535.0), 0, 65535).astype(np.uint16)
+
+def _as_records(data, dtype:np.dtype) -> np.ndarray:
+    '''
+    Accepts either structured records or a plain (N, fields) array and returns packed records.
+    '''
+    if data is None:
+        return np.zeros(0, dtype=dtype)
+    data = np.asarray(data)
+    if data.dtype == dtype:
+        return np.ascontiguousarray(data)
+    base = dtype.fields[dtype.names[0]][0].base
+    return np.ascontiguousarray(data, dtype=base).reshape(-1, dtype.itemsize // base.itemsize).view(dtype).ravel()
+
+def encode_lods(lods:list[np.ndarray]) -> bytes:
+    '''
+    LOD section bytes: the number of index lists, then every list as a count and uint16 indices.
+    '''
+    chunks = [np.uint32(len(lods)).astype('<u4').tobytes()]
+    for lod in lods:
+        lod = np.asarray(lod).ravel().astype('<u2')
+        chunks += [np.uint32(len(lod)).astype('<u4').tobytes(), lod.tobytes()]
+    return b''.join(chunks)
+
+def write_lods(output_file: str, lods:list[np.ndarray]) -> bool:
+    '''
+    Replaces the LOD section of an existing .mesh file, for files written by MeshConverter.dll which has no LOD input.
+    '''
+    try:
+        with open(output_file, 'rb') as f:
+            buffer = f.read()
+        table = read_section_table(buffer)
+        # The section ends where the meshlet count starts
+        end = table['meshlets'][0] - 4
+        start = end - 4 - sum(4 + 2 * count for _, count in table['lods'])
+        with open(output_file, 'wb') as f:
+            f.write(buffer[:start] + encode_lods(lods) + buffer[end:])
+    except (OSError, MeshFormatException) as e:
+        print(f"MeshCodec.write_lods() failed to write {output_file}: {e}")
+        return False
+    return True
+
+def ExportMeshFromNumpy(numpy_dict: dict, output_file: str) -> bool:
+    '''
+    Writes a .mesh file from the dict produced by Primitive.to_mesh_numpy_dict() (matrices and
+    header merged). Meshlets, culldata and LODs are written when present in the dict; this writer
+    does not build meshlets or reorder indices on its own.
+    '''
+    positions = np.asarray(numpy_dict['positions_raw'], dtype=np.float32).reshape(-1, 3)
+    num_verts = len(positions)
+    if num_verts > 65535:
+        print("MeshCodec.ExportMeshFromNumpy() Number of vertices has exceeded the maximum amount of 65535.")
+        return False
+
+    indices = np.asarray(numpy_dict['vertex_indices_raw']).ravel()
+
+    pos_max = float(np.abs(positions).max()) if num_verts > 0 else 0.0
+    max_border = pos_max + 0.1
+    settings_max_border = float(numpy_dict.get('max_border', 0.0))
+    if settings_max_border > pos_max:
+        max_border = settings_max_border
+
+    normals = np.array(numpy_dict['normals'], dtype=np.float32).reshape(-1, 3)
+    norms = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, norms, out=normals, where=norms != 0)
+
+    tangents = np.asarray(numpy_dict['tangents'], dtype=np.float32).reshape(-1, 3)
+    tangent_w = np.where(np.asarray(numpy_dict['bitangent_signs']) < 0, 3, 0).astype(np.uint32)
+
+    uv1 = np.asarray(numpy_dict['uv_coords'], dtype=np.float32).reshape(-1, 2)
+    uv2 = numpy_dict.get('uv_coords_2')
+    uv2 = np.zeros((0, 2), dtype=np.float32) if uv2 is None else np.asarray(uv2, dtype=np.float32).reshape(-1, 2)
+
+    color = numpy_dict.get('vertex_color')
+    if color is None or len(color) == 0:
+        color = np.zeros((0, 4), dtype=np.uint8)
+    else:
+        color = (np.clip(np.asarray(color, dtype=np.float32).reshape(-1, 4), 0, 1) * 255).astype(np.uint8)
+
+    if 'vertex_weight_bones' in numpy_dict and numpy_dict['vertex_weight_bones'] is not None:
+        weight_bones = np.asarray(numpy_dict['vertex_weight_bones'], dtype=np.uint16)
+        weight_values = np.asarray(numpy_dict['vertex_weight_values'], dtype=np.uint16)
+    else:
+        weight_bones, weight_values = quantize_weight_list(numpy_dict.get('vertex_weights', []), num_verts)
+    num_weights_per_vertex = weight_bones.shape[1] if weight_bones.size else 0
+
+    lods = numpy_dict.get('lods', [])
+    meshlets = _as_records(numpy_dict.get('meshlets'), MESHLET_DTYPE)
+    culldata = _as_records(numpy_dict.get('culldata'), CULLDATA_DTYPE)
+
+    def u32(value):
+        return np.uint32(value).astype('<u4').tobytes()
+
+    chunks = [
+        u32(MESH_MAGIC),
+        u32(len(indices)), indices.astype('<u2').tobytes(),
+        np.float32(max_border).astype('<f4').tobytes(),
+        u32(num_weights_per_vertex),
+        u32(num_verts), float_to_snorm(positions, max_border).tobytes(),
+        u32(len(uv1)), float_to_half(uv1).tobytes(),
+        u32(len(uv2)), float_to_half(uv2).tobytes(),
+        u32(len(color)), color.tobytes(),
+        u32(len(normals)), encode_dec3n(normals, 1).tobytes(),
+        u32(len(tangents)), encode_dec3n(tangents, tangent_w).tobytes(),
+    ]
+
+    if num_weights_per_vertex:
+        pairs = np.empty((num_verts, num_weights_per_vertex, 2), dtype='<u2')
+        pairs[..., 0] = weight_bones
+        pairs[..., 1] = weight_values
+        chunks += [u32(num_verts * num_weights_per_vertex), pairs.tobytes()]
+    else:
+        chunks.append(u32(0))
+
+    chunks.append(encode_lods(lods))
+
+    chunks += [u32(len(meshlets)), meshlets.tobytes()]
+    chunks += [u32(len(culldata)), culldata.tobytes()]
+
+    try:
+        with open(output_file, 'wb') as f:
+            f.write(b''.join(chunks))
+    except OSError as e:
+        print(f"MeshCodec.ExportMeshFromNumpy() failed to write {output_file}: {e}")
+        return False
+
+    return True
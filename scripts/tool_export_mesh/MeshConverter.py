@@ -1,98 +1,172 @@
 import ctypes
 import os
 import json
+import threading
 import numpy as np
-
-# Load the DLL
-_dll = ctypes.CDLL(os.path.join(os.path.dirname(__file__),'MeshConverter.dll'))
-print("Loaded DLL from: ", os.path.join(os.path.dirname(__file__),'MeshConverter.dll'))
-print(_dll)
-# Define the function signature
-_dll_export_mesh = _dll.ExportMesh
-_dll_export_mesh.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_float, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool]
-
-_dll_export_mesh_numpy = _dll.ExportMeshNumpy
-_dll_export_mesh_numpy.argtypes = [
-    ctypes.c_char_p, 
-    ctypes.c_char_p,
-    ctypes.POINTER(ctypes.c_float), # ptr_positions
-    ctypes.POINTER(ctypes.c_int64), # ptr_indices
-    ctypes.POINTER(ctypes.c_float), # ptr_normals
-    ctypes.POINTER(ctypes.c_float), # ptr_uv1
-    ctypes.POINTER(ctypes.c_float), # ptr_uv2
-    ctypes.POINTER(ctypes.c_float), # ptr_color
-    ctypes.POINTER(ctypes.c_float), # ptr_tangents
-    ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
-    ]
-
-_dll_export_morph = _dll.ExportMorph
-_dll_export_morph.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
-
-_dll_export_morph_numpy = _dll.ExportMorphNumpy
-_dll_export_morph_numpy.argtypes = [
-    ctypes.c_char_p, 
-    ctypes.c_char_p, 
-    ctypes.POINTER(ctypes.c_float), 
-    ctypes.POINTER(ctypes.c_float), 
-    ctypes.POINTER(ctypes.c_float), 
-    ctypes.POINTER(ctypes.c_float),
+from concurrent.futures import ThreadPoolExecutor
+
+import MeshCodec
+
+_dll_path = os.path.join(os.path.dirname(__file__),'MeshConverter.dll')
+
+# Fixed layout headers, field order must match mesh::mesh_header, mesh::mesh_export_header and morph::morph_header
+class MeshHeader(ctypes.Structure):
+    _fields_ = [
+        ("indices_size", ctypes.c_uint32),
+        ("num_triangles", ctypes.c_uint32),
+        ("max_border", ctypes.c_float),
+        ("num_weightsPerVertex", ctypes.c_uint32),
+        ("num_vertices", ctypes.c_uint32),
+        ("num_uv1", ctypes.c_uint32),
+        ("num_uv2", ctypes.c_uint32),
+        ("num_vert_colors", ctypes.c_uint32),
+        ("num_normals", ctypes.c_uint32),
+        ("num_tangents", ctypes.c_uint32),
+        ("num_weights", ctypes.c_uint32),
+        ("num_lods", ctypes.c_uint32),
+        ("num_meshlets", ctypes.c_uint32),
     ]
 
-_dll_export_empty_morph = _dll.ExportEmptyMorph
-_dll_export_empty_morph.argtypes = [ctypes.c_uint32, ctypes.c_char_p]
-
-_dll_export_nif = _dll.CreateNif
-_dll_export_nif.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-
-_dll_import_nif = _dll.ImportNif
-_dll_import_nif.argtypes = [ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p]
-_dll_import_nif.restype = ctypes.c_char_p
-
-_dll_edit_nif_bsgeometries = _dll.EditNifBSGeometries
-_dll_edit_nif_bsgeometries.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool]
-
-_dll_import_mesh = _dll.ImportMesh
-_dll_import_mesh.argtypes = [ctypes.c_char_p]
-_dll_import_mesh.restype = ctypes.c_char_p
-
-_dll_import_morph = _dll.ImportMorph
-_dll_import_morph.argtypes = [ctypes.c_char_p]
-_dll_import_morph.restype = ctypes.c_char_p
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name, _ in self._fields_}
 
-_dll_import_morph_header = _dll.ImportMorphHeader
-_dll_import_morph_header.argtypes = [ctypes.c_char_p]
-_dll_import_morph_header.restype = ctypes.c_char_p
-
-_dll_import_morph_numpy = _dll.ImportMorphNumpy
-_dll_import_morph_numpy.argtypes = [
-    ctypes.c_char_p, # morph file path
-    ctypes.POINTER(ctypes.c_float), # delta_pos
-    ctypes.POINTER(ctypes.c_float), # target_colors
-    ctypes.POINTER(ctypes.c_float), # delta_norm
-    ctypes.POINTER(ctypes.c_float), # delta_tangent
+class MeshExportHeader(ctypes.Structure):
+    _fields_ = [
+        ("num_verts", ctypes.c_uint32),
+        ("num_indices", ctypes.c_uint32),
+        ("num_weightsPerVertex", ctypes.c_uint32),
+        ("max_border", ctypes.c_float),
     ]
 
-
-_dll_import_mesh_header = _dll.ImportMeshHeader
-_dll_import_mesh_header.argtypes = [ctypes.c_char_p]
-_dll_import_mesh_header.restype = ctypes.c_char_p
-
-_dll_import_mesh_numpy = _dll.ImportMeshNumpy
-_dll_import_mesh_numpy.argtypes = [
-    ctypes.c_char_p, # morph file path
-    ctypes.POINTER(ctypes.c_float), # ptr_positions
-    ctypes.POINTER(ctypes.c_int64), # ptr_indices
-    ctypes.POINTER(ctypes.c_float), # ptr_normals
-    ctypes.POINTER(ctypes.c_float), # ptr_uv1
-    ctypes.POINTER(ctypes.c_float), # ptr_uv2
-    ctypes.POINTER(ctypes.c_float), # ptr_color
-    ctypes.POINTER(ctypes.c_float), # ptr_tangents
-    ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
+class MorphHeader(ctypes.Structure):
+    _fields_ = [
+        ("num_vertices", ctypes.c_uint32),
+        ("num_shape_keys", ctypes.c_uint32),
+        ("names_size", ctypes.c_uint64), # bytes in the name table, every name is null terminated
     ]
 
-_dll_compose_physics_data = _dll.ComposePhysicsData
-_dll_compose_physics_data.argtypes = [ctypes.c_char_p, ctypes.c_uint32, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool]
+def _pack_name_table(names: list[str]) -> bytes:
+    return b''.join(name.encode('utf-8') + b'\0' for name in names)
+
+def _unpack_name_table(table: bytes, count: int) -> list[str]:
+    if count == 0:
+        return []
+    return [name.decode('utf-8') for name in table.split(b'\0')[:count]]
+
+# symbol: (argtypes, restype), bound on first use by _get_dll()
+_dll_signatures = {
+    "ExportMesh": ([ctypes.c_char_p, ctypes.c_char_p, ctypes.c_float, ctypes.c_bool, ctypes.c_bool, ctypes.c_bool], None),
+    "ExportMeshNumpy": ([
+        ctypes.c_char_p, 
+        ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_float), # ptr_positions
+        ctypes.POINTER(ctypes.c_int64), # ptr_indices
+        ctypes.POINTER(ctypes.c_float), # ptr_normals
+        ctypes.POINTER(ctypes.c_float), # ptr_uv1
+        ctypes.POINTER(ctypes.c_float), # ptr_uv2
+        ctypes.POINTER(ctypes.c_float), # ptr_color
+        ctypes.POINTER(ctypes.c_float), # ptr_tangents
+        ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
+        ctypes.POINTER(ctypes.c_uint16), # ptr_weight_bones
+        ctypes.POINTER(ctypes.c_uint16), # ptr_weight_values
+        ], None),
+    "ExportMeshNumpyEx": ([
+        ctypes.POINTER(MeshExportHeader),
+        ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_float), # ptr_positions
+        ctypes.POINTER(ctypes.c_int64), # ptr_indices
+        ctypes.POINTER(ctypes.c_float), # ptr_normals
+        ctypes.POINTER(ctypes.c_float), # ptr_uv1
+        ctypes.POINTER(ctypes.c_float), # ptr_uv2
+        ctypes.POINTER(ctypes.c_float), # ptr_color
+        ctypes.POINTER(ctypes.c_float), # ptr_tangents
+        ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
+        ctypes.POINTER(ctypes.c_uint16), # ptr_weight_bones
+        ctypes.POINTER(ctypes.c_uint16), # ptr_weight_values
+        ], None),
+    "ExportMorph": ([ctypes.c_char_p, ctypes.c_char_p], None),
+    "ExportMorphNumpy": ([
+        ctypes.c_char_p, 
+        ctypes.c_char_p, 
+        ctypes.POINTER(ctypes.c_float), 
+        ctypes.POINTER(ctypes.c_float), 
+        ctypes.POINTER(ctypes.c_float), 
+        ctypes.POINTER(ctypes.c_float),
+        ], None),
+    "ExportMorphNumpyEx": ([
+        ctypes.POINTER(MorphHeader),
+        ctypes.c_char_p, # name table
+        ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_float),
+        ctypes.POINTER(ctypes.c_float),
+        ctypes.POINTER(ctypes.c_float),
+        ctypes.POINTER(ctypes.c_float),
+        ], None),
+    "ExportEmptyMorph": ([ctypes.c_uint32, ctypes.c_char_p], None),
+    "CreateNif": ([ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p], None),
+    "ImportNif": ([ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p], ctypes.c_char_p),
+    "ImportNifBinary": ([ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint64)], ctypes.c_void_p),
+    "FreeBuffer": ([ctypes.c_void_p], None),
+    "EditNifBSGeometries": ([ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool], None),
+    "ImportMesh": ([ctypes.c_char_p], ctypes.c_char_p),
+    "ImportMorph": ([ctypes.c_char_p], ctypes.c_char_p),
+    "ImportMorphHeader": ([ctypes.c_char_p], ctypes.c_char_p),
+    "ImportMorphHeaderEx": ([ctypes.c_char_p, ctypes.POINTER(MorphHeader)], ctypes.c_void_p),
+    "ImportMorphNumpy": ([
+        ctypes.c_char_p, # morph file path
+        ctypes.POINTER(ctypes.c_float), # delta_pos
+        ctypes.POINTER(ctypes.c_float), # target_colors
+        ctypes.POINTER(ctypes.c_float), # delta_norm
+        ctypes.POINTER(ctypes.c_float), # delta_tangent
+        ], None),
+    "ImportMeshHeader": ([ctypes.c_char_p], ctypes.c_char_p),
+    "ImportMeshHeaderEx": ([ctypes.c_char_p, ctypes.POINTER(MeshHeader)], None),
+    "ImportMeshNumpy": ([
+        ctypes.c_char_p, # morph file path
+        ctypes.POINTER(ctypes.c_float), # ptr_positions
+        ctypes.POINTER(ctypes.c_int64), # ptr_indices
+        ctypes.POINTER(ctypes.c_float), # ptr_normals
+        ctypes.POINTER(ctypes.c_float), # ptr_uv1
+        ctypes.POINTER(ctypes.c_float), # ptr_uv2
+        ctypes.POINTER(ctypes.c_float), # ptr_color
+        ctypes.POINTER(ctypes.c_float), # ptr_tangents
+        ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
+        ], None),
+    "ImportMeshNumpyEx": ([
+        ctypes.c_char_p, # mesh file path
+        ctypes.POINTER(ctypes.c_float), # ptr_positions
+        ctypes.c_void_p, # ptr_indices, element size given by the next argument
+        ctypes.c_uint32, # index_byte_size
+        ctypes.POINTER(ctypes.c_float), # ptr_normals
+        ctypes.POINTER(ctypes.c_float), # ptr_uv1
+        ctypes.POINTER(ctypes.c_float), # ptr_uv2
+        ctypes.POINTER(ctypes.c_float), # ptr_color
+        ctypes.POINTER(ctypes.c_float), # ptr_tangents
+        ctypes.POINTER(ctypes.c_int32), # ptr_bitangent_signs
+        ], None),
+    "ComposePhysicsData": ([ctypes.c_char_p, ctypes.c_uint32, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool], None),
+}
 
+_dll_lock = threading.Lock()
+_dll:ctypes.CDLL = None
+
+def _get_dll() -> ctypes.CDLL:
+    # Loading is deferred to the first conversion so registering the add-on never touches the dll
+    global _dll
+    if _dll is not None:
+        return _dll
+    with _dll_lock:
+        # Threads that waited on the lock find the dll another one loaded
+        if _dll is None:
+            dll = ctypes.CDLL(_dll_path)
+            print("Loaded DLL from: ", _dll_path)
+            for symbol, (argtypes, restype) in _dll_signatures.items():
+                func = getattr(dll, symbol)
+                func.argtypes = argtypes
+                if restype is not None:
+                    func.restype = restype
+            _dll = dll
+        return _dll
 
 from enum import Enum
 
@@ -160,11 +234,18 @@ class DLLReturnCode():
                 return "Failed to edit nif geometries"
             case 17:
                 return "Failed to load morph file"
+            case 18:
+                return "Failed to load mesh file"
+            case 98:
+                return "Converter worker process terminated unexpectedly"
+            case 99:
+                return "Failed to copy data into numpy buffers"
             case _:
                 return "Unknown error"
 
 _np_types_to_ctypes = {
     np.float32: ctypes.c_float,
+    np.uint16: ctypes.c_uint16,
     np.int64: ctypes.c_int64,
     np.uint32: ctypes.c_uint32,
     np.int32: ctypes.c_int32,
@@ -181,46 +262,60 @@ def _check_numpy_type_and_size(np_mat: np.ndarray | None, np_type, size, allow_n
     
 
 def ExportMeshFromJson(json_data_string: str, output_file: str, max_border: float, smooth_edge_normal: bool, normalize_weights: bool, do_optimization: bool) -> DLLReturnCode:
-    rtn = _dll_export_mesh(json_data_string.encode('utf-8'), output_file.encode('utf-8'), max_border, smooth_edge_normal, normalize_weights, do_optimization)
+    rtn = _get_dll().ExportMesh(json_data_string.encode('utf-8'), output_file.encode('utf-8'), max_border, smooth_edge_normal, normalize_weights, do_optimization)
     return DLLReturnCode(rtn)
 
+def _dict_pointer(numpy_dict: dict, key: str, ptr_key: str, np_type, count: int):
+    # Prefer the array itself, fall back to a raw 'ptr_*' address for dicts that only carry those
+    np_mat = numpy_dict.get(key)
+    if np_mat is not None:
+        assert np_mat.dtype == np_type, f"dtype of {key} is not {np_type} but {np_mat.dtype}"
+        assert np_mat.size == count, f"size of {key} is not correct, expected {count}, got {np_mat.size}"
+        assert np_mat.flags['C_CONTIGUOUS'], f"{key} must be C contiguous"
+        return np_mat.ctypes.data_as(ctypes.POINTER(_np_types_to_ctypes[np_type]))
+    return ctypes.cast(numpy_dict.get(ptr_key, 0) or 0, ctypes.POINTER(_np_types_to_ctypes[np_type]))
+
 def ExportMeshFromNumpy(numpy_dict: dict, output_file: str) -> DLLReturnCode:
-    header_dict = {key:value for key, value in numpy_dict.items() if not isinstance(value, np.ndarray)}
-    header_json_str = json.dumps(header_dict)
-
-    #ptr_pos = _check_numpy_type_and_size(numpy_dict['positions_raw'], np_type=np.float32, size=(numpy_dict["num_verts"], 3))
-    #ptr_vert_ids = _check_numpy_type_and_size(numpy_dict['vertex_indices_raw'], np_type=np.int64, size=(numpy_dict["num_indices"],))
-    #ptr_norm = _check_numpy_type_and_size(numpy_dict['normals'], np_type=np.float32, size=(numpy_dict["num_verts"], 3))
-    #ptr_uv1 = _check_numpy_type_and_size(numpy_dict['uv_coords'], np_type=np.float32, size=(numpy_dict["num_verts"], 2))
-    #ptr_uv2 = _check_numpy_type_and_size(numpy_dict['uv_coords_2'], np_type=np.float32, size=(numpy_dict["num_verts"], 2), allow_none= True)
-    #ptr_color = _check_numpy_type_and_size(numpy_dict['vertex_color'], np_type=np.float32, size=(numpy_dict["num_verts"], 4), allow_none= True)
-    #ptr_tangent = _check_numpy_type_and_size(numpy_dict['tangents'], np_type=np.float32, size=(numpy_dict["num_verts"], 3))
-    #ptr_bttangent_sign = _check_numpy_type_and_size(numpy_dict['bitangent_signs'], np_type=np.int32, size=(numpy_dict["num_verts"],))
-
-    rtn = _dll_export_mesh_numpy(
-        header_json_str.encode('utf-8'), 
+    if numpy_dict.get("meshlets") is not None:
+        # The dll regenerates meshlets and reorders the indices, meshlets from Primitive.build_meshlets() are written as they are
+        return DLLReturnCode(0 if MeshCodec.ExportMeshFromNumpy(numpy_dict, output_file) else 3)
+
+    num_verts = numpy_dict["num_verts"]
+    num_weights_per_vertex = numpy_dict.get("num_weightsPerVertex", 0)
+
+    header = MeshExportHeader(
+        num_verts = num_verts,
+        num_indices = numpy_dict["num_indices"],
+        num_weightsPerVertex = num_weights_per_vertex,
+        max_border = numpy_dict["max_border"],
+        )
+
+    rtn = _get_dll().ExportMeshNumpyEx(
+        ctypes.byref(header),
         output_file.encode('utf-8'),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.int64])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.float32])),
-        ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np.int32])),
+        _dict_pointer(numpy_dict, 'positions_raw', 'ptr_positions', np.float32, num_verts * 3),
+        _dict_pointer(numpy_dict, 'vertex_indices_raw', 'ptr_indices', np.int64, numpy_dict["num_indices"]),
+        _dict_pointer(numpy_dict, 'normals', 'ptr_normals', np.float32, num_verts * 3),
+        _dict_pointer(numpy_dict, 'uv_coords', 'ptr_uv1', np.float32, num_verts * 2),
+        _dict_pointer(numpy_dict, 'uv_coords_2', 'ptr_uv2', np.float32, num_verts * 2),
+        _dict_pointer(numpy_dict, 'vertex_color', 'ptr_color', np.float32, num_verts * 4),
+        _dict_pointer(numpy_dict, 'tangents', 'ptr_tangents', np.float32, num_verts * 3),
+        _dict_pointer(numpy_dict, 'bitangent_signs', 'ptr_bitangent_signs', np.int32, num_verts),
+        _dict_pointer(numpy_dict, 'vertex_weight_bones', 'ptr_weight_bones', np.uint16, num_verts * num_weights_per_vertex),
+        _dict_pointer(numpy_dict, 'vertex_weight_values', 'ptr_weight_values', np.uint16, num_verts * num_weights_per_vertex),
         )
     return DLLReturnCode(rtn)
 
 def ExportMorphFromJson(json_data_string: str, output_file: str) -> DLLReturnCode:
-    rtn = _dll_export_morph(json_data_string.encode('utf-8'), output_file.encode('utf-8'))
+    rtn = _get_dll().ExportMorph(json_data_string.encode('utf-8'), output_file.encode('utf-8'))
     return DLLReturnCode(rtn)
 
 def ExportMorphFromNumpy(numpy_dict: dict, output_file: str) -> DLLReturnCode:
     if not output_file.endswith('.dat'):
         output_file += '.dat'
 
-    header = {"numVertices":numpy_dict["numVertices"], "shapeKeys":numpy_dict["shapeKeys"]}
-    header_json_str = json.dumps(header)
+    names = _pack_name_table(numpy_dict["shapeKeys"])
+    header = MorphHeader(num_vertices = numpy_dict["numVertices"], num_shape_keys = len(numpy_dict["shapeKeys"]), names_size = len(names))
 
     size = (len(numpy_dict["shapeKeys"]), numpy_dict["numVertices"], 3)
     np_type = np.float32
@@ -230,8 +325,9 @@ def ExportMorphFromNumpy(numpy_dict: dict, output_file: str) -> DLLReturnCode:
     ptr_delta_norm = _check_numpy_type_and_size(numpy_dict['deltaNormals'], np_type=np_type, size=size)
     ptr_delta_tangent = _check_numpy_type_and_size(numpy_dict['deltaTangents'], np_type=np_type, size=size)
 
-    rtn = _dll_export_morph_numpy(
-        header_json_str.encode('utf-8'), 
+    rtn = _get_dll().ExportMorphNumpyEx(
+        ctypes.byref(header),
+        names,
         output_file.encode('utf-8'), 
         ptr_delta_pos, 
         ptr_target_colors, 
@@ -240,80 +336,254 @@ def ExportMorphFromNumpy(numpy_dict: dict, output_file: str) -> DLLReturnCode:
         )
     return DLLReturnCode(rtn)
 
+def _export_batch(export_func, jobs, max_workers: int | None) -> list[DLLReturnCode]:
+    # jobs holds every numpy dict until all futures resolved, the dll only sees raw pointers into them
+    jobs = list(jobs)
+    if len(jobs) == 0:
+        return []
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(export_func, numpy_dict, output_file) for numpy_dict, output_file in jobs]
+        for (numpy_dict, output_file), future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Failed to export {output_file}: {e}")
+                results.append(DLLReturnCode(-1))
+    return results
+
+def ExportMeshesBatch(jobs: list[tuple[dict, str]], max_workers: int | None = None) -> list[DLLReturnCode]:
+    """
+    Serialize already gathered meshes concurrently, ctypes releases the GIL for the duration of each dll call.
+    jobs is a list of (numpy_dict, output_file) as passed to ExportMeshFromNumpy, results keep the same order.
+    """
+    return _export_batch(ExportMeshFromNumpy, jobs, max_workers)
+
+def ExportMorphsBatch(jobs: list[tuple[dict, str]], max_workers: int | None = None) -> list[DLLReturnCode]:
+    """
+    Morph equivalent of ExportMeshesBatch, jobs is a list of (numpy_dict, output_file) as passed to ExportMorphFromNumpy.
+    """
+    return _export_batch(ExportMorphFromNumpy, jobs, max_workers)
+
 def ExportEmptyMorphFromJson(num_vertices: int, output_file: str) -> DLLReturnCode:
-    rtn = _dll_export_empty_morph(num_vertices, output_file.encode('utf-8'))
+    rtn = _get_dll().ExportEmptyMorph(num_vertices, output_file.encode('utf-8'))
     return DLLReturnCode(rtn)
 
 def EditNifBSGeometries(base_nif_path: str, json_data_string: str, output_file: str, assets_folder: str, edit_mat_path: bool = False) -> DLLReturnCode:
-    rtn = _dll_edit_nif_bsgeometries(base_nif_path.encode('utf-8'), json_data_string.encode('utf-8'), output_file.encode('utf-8'), assets_folder.encode('utf-8'), edit_mat_path)
+    rtn = _get_dll().EditNifBSGeometries(base_nif_path.encode('utf-8'), json_data_string.encode('utf-8'), output_file.encode('utf-8'), assets_folder.encode('utf-8'), edit_mat_path)
     return DLLReturnCode(rtn)
 
 def ImportMeshAsJson(input_file: str) -> str:
-    return _dll_import_mesh(input_file.encode('utf-8')).decode('utf-8')
+    return _get_dll().ImportMesh(input_file.encode('utf-8')).decode('utf-8')
+
+def ImportMeshHeaderAsJson(input_file: str) -> str:
+    return _get_dll().ImportMeshHeader(input_file.encode('utf-8')).decode('utf-8')
+
+def ImportMeshHeaderStruct(input_file: str, header: MeshHeader | None = None) -> MeshHeader:
+    """
+    Fills header (a new one if None) straight from the file, no json involved.
+    """
+    if header is None:
+        header = MeshHeader()
+    rtn = DLLReturnCode(_get_dll().ImportMeshHeaderEx(input_file.encode('utf-8'), ctypes.byref(header)))
+    if not rtn:
+        raise Exception(f"Failed to load mesh file: {input_file}, {rtn.what()}")
+    return header
+
+def ImportMeshHeader(input_file: str) -> dict:
+    mesh_header = ImportMeshHeaderStruct(input_file).to_dict()
+    assert(mesh_header['num_triangles'] * 3 == mesh_header['indices_size'])
+
+    mesh_header['has_uv2'] = mesh_header.get('num_uv2', 0) == mesh_header['num_vertices'] and mesh_header['num_vertices'] > 0
+    # Same rule as MeshCodec.MeshFile, a stream shorter than the vertex count is treated as absent
+    mesh_header['has_colors'] = mesh_header.get('num_vert_colors', 0) == mesh_header['num_vertices'] and mesh_header['num_vertices'] > 0
+    mesh_header['has_weights'] = mesh_header.get('num_weights', 0) > 0
+    return mesh_header
+
+_index_dtypes = (np.uint16, np.uint32, np.int64)
+
+def _buffer_pointer(np_mat: np.ndarray | None, np_type, size):
+    if np_mat is None:
+        return ctypes.cast(0, ctypes.POINTER(_np_types_to_ctypes[np_type]))
+    assert np_mat.flags['C_CONTIGUOUS'], "buffer must be C contiguous"
+    return _check_numpy_type_and_size(np_mat, np_type=np_type, size=size)
+
+def ImportMeshIntoBuffers(input_file: str, 
+                          header: dict,
+                          positions: np.ndarray | None = None, 
+                          indices: np.ndarray | None = None, 
+                          normals: np.ndarray | None = None, 
+                          uv1: np.ndarray | None = None, 
+                          uv2: np.ndarray | None = None, 
+                          color: np.ndarray | None = None, 
+                          tangents: np.ndarray | None = None, 
+                          bitangent_signs: np.ndarray | None = None) -> DLLReturnCode:
+    """
+    Decode a .mesh file straight into caller owned buffers. Any buffer left as None is skipped by the dll,
+    so are uv2 and color when the header has no such stream, their buffers are then left untouched.
+    Buffers must match the sizes reported by ImportMeshHeader, indices may be uint16, uint32 or int64 of shape (num_triangles, 3).
+    """
+    num_vertices = header['num_vertices']
+    num_triangles = header['num_triangles']
+
+    index_dtype = np.int64 if indices is None else indices.dtype.type
+    assert index_dtype in _index_dtypes, f"Unsupported index dtype {index_dtype}"
+    if indices is not None:
+        assert indices.shape == (num_triangles, 3), f"shape is not correct, expected {(num_triangles, 3)}, got {indices.shape}"
+        assert indices.flags['C_CONTIGUOUS'], "buffer must be C contiguous"
+
+    if not header['has_uv2']:
+        uv2 = None
+    if not header['has_colors']:
+        color = None
+
+    rtn = _get_dll().ImportMeshNumpyEx(
+        input_file.encode('utf-8'), 
+        _buffer_pointer(positions, np.float32, (num_vertices, 3)),
+        ctypes.c_void_p(0 if indices is None else indices.ctypes.data),
+        np.dtype(index_dtype).itemsize,
+        _buffer_pointer(normals, np.float32, (num_vertices, 3)),
+        _buffer_pointer(uv1, np.float32, (num_vertices, 2)),
+        _buffer_pointer(uv2, np.float32, (num_vertices, 2)),
+        _buffer_pointer(color, np.float32, (num_vertices, 4)),
+        _buffer_pointer(tangents, np.float32, (num_vertices, 3)),
+        _buffer_pointer(bitangent_signs, np.int32, (num_vertices,)),
+        )
+    return DLLReturnCode(rtn)
 
-def ImportMeshAsNumpy(input_file: str) -> dict:
-    mesh_header_json_str = _dll_import_mesh_header(input_file.encode('utf-8')).decode('utf-8')
-    mesh_header = json.loads(mesh_header_json_str)
-    del mesh_header_json_str
+class MeshBufferPool():
+    """
+    Reusable import buffers for batch loading. Storage only grows, every request returns views sized to the header,
+    so results are overwritten by the next import and must be copied if they need to outlive it.
+    Streams the header marks as absent get no buffer, they are returned as None.
+    """
+    _layout = {
+        "positions_raw": ((3,), np.float32),
+        "normals": ((3,), np.float32),
+        "uv_coords": ((2,), np.float32),
+        "uv_coords_2": ((2,), np.float32),
+        "vertex_color": ((4,), np.float32),
+        "tangents": ((3,), np.float32),
+        "bitangent_signs": ((), np.int32),
+    }
+    # Streams a .mesh may leave out, by the header flag that says they are present
+    _optional = {
+        "uv_coords_2": "has_uv2",
+        "vertex_color": "has_colors",
+    }
+
+    def __init__(self, index_dtype = np.int64):
+        assert index_dtype in _index_dtypes, f"Unsupported index dtype {index_dtype}"
+        self.index_dtype = index_dtype
+        self._storage = {}
+
+    def _view(self, key, count, tail, dtype):
+        size = count * int(np.prod(tail, dtype=np.int64))
+        storage = self._storage.get(key)
+        if storage is None or storage.size < size:
+            storage = np.empty(max(size, 1), dtype=dtype)
+            self._storage[key] = storage
+        return storage[:size].reshape((count,) + tail)
+
+    @classmethod
+    def _requested(cls, header: dict, streams: set | None, index_dtype):
+        # (key, count, tail, dtype) of every buffer the import fills, None for the ones it skips
+        for key, (tail, dtype) in cls._layout.items():
+            present = key not in cls._optional or header[cls._optional[key]]
+            wanted = present and (streams is None or key in streams)
+            yield key, ((header['num_vertices'], tail, dtype) if wanted else None)
+        wanted = streams is None or "vertex_indices_raw" in streams
+        yield "vertex_indices_raw", ((header['num_triangles'], (3,), index_dtype) if wanted else None)
+
+    def request(self, header: dict, streams: set | None = None) -> dict:
+        return {
+            key: self._view(key, *layout) if layout is not None else None
+            for key, layout in self._requested(header, streams, self.index_dtype)
+        }
+
+    @classmethod
+    def allocate(cls, header: dict, streams: set | None = None, index_dtype = np.int64) -> dict:
+        """
+        Same buffers as request(), freshly allocated to their exact size and owned by the caller.
+        """
+        return {
+            key: np.empty((layout[0],) + layout[1], dtype=layout[2]) if layout is not None else None
+            for key, layout in cls._requested(header, streams, index_dtype)
+        }
+
+    def clear(self):
+        self._storage.clear()
+
+def ImportMeshAsNumpy(input_file: str, pool: MeshBufferPool | None = None, streams: set | None = None, index_dtype = np.int64) -> dict:
+    """
+    Without a pool every stream is freshly allocated, with a pool the returned arrays are views into its reused storage.
+    streams limits decoding to the given keys, the others and the streams the file does not have are returned as None.
+    """
+    mesh_header = ImportMeshHeader(input_file)
 
     num_vertices = mesh_header['num_vertices']
-    num_indices = mesh_header['indices_size']
-    num_triangles = mesh_header['num_triangles']
-    num_weightsPerVertex = mesh_header['num_weightsPerVertex']
-
-    max_border = mesh_header['max_border']
-
-    assert(num_triangles * 3 == num_indices)
-
-    positions = np.zeros((num_vertices, 3), dtype=np.float32)
-    indices = np.zeros((num_triangles, 3), dtype=np.int64)
-    normals = np.zeros((num_vertices, 3), dtype=np.float32)
-    uv1 = np.zeros((num_vertices, 2), dtype=np.float32)
-    uv2 = np.zeros((num_vertices, 2), dtype=np.float32)
-    color = np.zeros((num_vertices, 4), dtype=np.float32)
-    tangents = np.zeros((num_vertices, 3), dtype=np.float32)
-    bitangent_signs = np.zeros((num_vertices,), dtype=np.int32)
-
-    ptr_positions = _check_numpy_type_and_size(positions, np_type=np.float32, size=(num_vertices, 3))
-    ptr_indices = _check_numpy_type_and_size(indices, np_type=np.int64, size=(num_triangles, 3))
-    ptr_normals = _check_numpy_type_and_size(normals, np_type=np.float32, size=(num_vertices, 3))
-    ptr_uv1 = _check_numpy_type_and_size(uv1, np_type=np.float32, size=(num_vertices, 2))
-    ptr_uv2 = _check_numpy_type_and_size(uv2, np_type=np.float32, size=(num_vertices, 2))
-    ptr_color = _check_numpy_type_and_size(color, np_type=np.float32, size=(num_vertices, 4))
-    ptr_tangents = _check_numpy_type_and_size(tangents, np_type=np.float32, size=(num_vertices, 3))
-    ptr_bitangent_signs = _check_numpy_type_and_size(bitangent_signs, np_type=np.int32, size=(num_vertices,))
-
-    rtn = _dll_import_mesh_numpy(input_file.encode('utf-8'), ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs)
 
-    if rtn != 0:
-        raise Exception(f"Failed to load mesh file: {input_file}")
+    if pool is None:
+        buffers = MeshBufferPool.allocate(mesh_header, streams, index_dtype)
+    else:
+        buffers = pool.request(mesh_header, streams)
+
+    rtn = ImportMeshIntoBuffers(
+        input_file, 
+        mesh_header,
+        positions = buffers["positions_raw"],
+        indices = buffers["vertex_indices_raw"],
+        normals = buffers["normals"],
+        uv1 = buffers["uv_coords"],
+        uv2 = buffers["uv_coords_2"],
+        color = buffers["vertex_color"],
+        tangents = buffers["tangents"],
+        bitangent_signs = buffers["bitangent_signs"],
+        )
+
+    if not rtn:
+        raise Exception(f"Failed to load mesh file: {input_file}, {rtn.what()}")
     
     return {
         "num_verts": num_vertices,
-        "num_indices": num_indices,
-        "num_triangles": num_triangles,
-        "num_weightsPerVertex": num_weightsPerVertex,
-        "max_border": max_border,
-        "positions_raw": positions,
-        "vertex_indices_raw": indices,
-        "normals": normals,
-        "uv_coords": uv1,
-        "uv_coords_2": uv2,
-        "vertex_color": color,
-        "tangents": tangents,
-        "bitangent_signs": bitangent_signs
+        "num_indices": mesh_header['indices_size'],
+        "num_triangles": mesh_header['num_triangles'],
+        "num_weightsPerVertex": mesh_header['num_weightsPerVertex'],
+        "max_border": mesh_header['max_border'],
+        "has_uv2": mesh_header['has_uv2'],
+        "has_colors": mesh_header['has_colors'],
+        **buffers
     }
 
 def ImportMorphAsJson(input_file: str) -> str:
-    return _dll_import_morph(input_file.encode('utf-8')).decode('utf-8')
+    return _get_dll().ImportMorph(input_file.encode('utf-8')).decode('utf-8')
+
+def ImportMorphHeaderAsJson(input_file: str) -> str:
+    return _get_dll().ImportMorphHeader(input_file.encode('utf-8')).decode('utf-8')
+
+def ImportMorphHeaderStruct(input_file: str) -> tuple[MorphHeader, list[str]]:
+    """
+    Returns the morph header and its shape key names, read from the dll's name table.
+    """
+    header = MorphHeader()
+    dll = _get_dll()
+    ptr_names = dll.ImportMorphHeaderEx(input_file.encode('utf-8'), ctypes.byref(header))
+    if not ptr_names:
+        raise Exception(f"Failed to load morph file: {input_file}")
+    try:
+        names = _unpack_name_table(ctypes.string_at(ptr_names, header.names_size), header.num_shape_keys)
+    finally:
+        dll.FreeBuffer(ptr_names)
+    return header, names
 
 def ImportMorphAsNumpy(input_file: str) -> dict:
-    morph_header_json_str = _dll_import_morph_header(input_file.encode('utf-8')).decode('utf-8')
-    morph_header = json.loads(morph_header_json_str)
-    del morph_header_json_str
+    morph_header, shape_keys = ImportMorphHeaderStruct(input_file)
     
-    num_vertices = morph_header["numVertices"]
-    num_shapes = len(morph_header["shapeKeys"])
+    num_vertices = morph_header.num_vertices
+    num_shapes = morph_header.num_shape_keys
     size = (num_shapes, num_vertices, 3)
     np_type = np.float32
 
@@ -327,14 +597,14 @@ def ImportMorphAsNumpy(input_file: str) -> dict:
     ptr_delta_norm = _check_numpy_type_and_size(delta_norm, np_type=np_type, size=size)
     ptr_delta_tangent = _check_numpy_type_and_size(delta_tangent, np_type=np_type, size=size)
 
-    rtn = _dll_import_morph_numpy(input_file.encode('utf-8'), ptr_delta_pos, ptr_target_colors, ptr_delta_norm, ptr_delta_tangent)
+    rtn = _get_dll().ImportMorphNumpy(input_file.encode('utf-8'), ptr_delta_pos, ptr_target_colors, ptr_delta_norm, ptr_delta_tangent)
 
     if rtn != 0:
         raise Exception(f"Failed to load morph file: {input_file}")
 
     return {
         "numVertices": num_vertices,
-        "shapeKeys": morph_header["shapeKeys"],
+        "shapeKeys": shape_keys,
         "deltaPositions": delta_pos,
         "targetColors": target_colors,
         "deltaNormals": delta_norm,
@@ -346,16 +616,87 @@ def CreateNifFromJson(json_data_string: str, output_file: str, assets_folder_pat
     if not output_file.endswith('.nif'):
         output_file += '.nif'
 
-    rtn = _dll_export_nif(json_data_string.encode('utf-8'), output_file.encode('utf-8'), assets_folder_path.encode('utf-8'))
+    rtn = _get_dll().CreateNif(json_data_string.encode('utf-8'), output_file.encode('utf-8'), assets_folder_path.encode('utf-8'))
     return DLLReturnCode(rtn)
 
 def ImportNifAsJson(input_file: str, export_havok_readable: bool = False, readable_path: str = '') -> str:
-    return _dll_import_nif(input_file.encode('utf-8'), export_havok_readable, readable_path.encode('utf-8')).decode('utf-8')
+    return _get_dll().ImportNif(input_file.encode('utf-8'), export_havok_readable, readable_path.encode('utf-8')).decode('utf-8')
+
+_nif_blob_dtypes = {
+    0: np.float32,
+    1: np.uint32,
+    2: np.int32,
+}
+
+_nif_blob_desc_dtype = np.dtype([('dtype', '<u4'), ('ndim', '<u4'), ('rows', '<u8'), ('cols', '<u8'), ('offset', '<u8')])
+
+def DecodeNifBinary(buffer) -> dict:
+    """
+    Decodes the binary scene produced by ImportNifBinary. The layout is a 16 byte preamble
+    ("NIFB", u32 version, u32 header size, u32 blob count), the json header, a blob table and the blob payload.
+    Stubs in the header are replaced by numpy views into buffer: {"__blob__": i} becomes an (rows,) or (rows, cols)
+    array and {"__ragged__": [counts, values]} becomes a list of (count, cols) arrays.
+    """
+    view = memoryview(buffer)
+    if bytes(view[:4]) != b'NIFB':
+        raise ValueError("Not a binary nif scene")
+    version, header_size, num_blobs = np.frombuffer(view, dtype='<u4', count=3, offset=4)
+    if version != 1:
+        raise ValueError(f"Unsupported binary nif scene version {version}")
+
+    header = json.loads(bytes(view[16:16 + header_size]).decode('utf-8'))
+    table_offset = (16 + int(header_size) + 15) // 16 * 16
+    table = np.frombuffer(view, dtype=_nif_blob_desc_dtype, count=int(num_blobs), offset=table_offset)
+
+    blobs = []
+    for desc in table:
+        dtype = _nif_blob_dtypes[int(desc['dtype'])]
+        rows, cols = int(desc['rows']), int(desc['cols'])
+        shape = (rows, cols) if desc['ndim'] == 2 else (rows,)
+        count = rows * max(cols, 1)
+        blobs.append(np.frombuffer(view, dtype=dtype, count=count, offset=int(desc['offset'])).reshape(shape))
+
+    def _resolve(node):
+        if isinstance(node, dict):
+            if len(node) == 1 and '__blob__' in node:
+                return blobs[node['__blob__']]
+            if len(node) == 1 and '__ragged__' in node:
+                counts_id, values_id = node['__ragged__']
+                return np.split(blobs[values_id], np.cumsum(blobs[counts_id][:-1], dtype=np.int64))
+            for key, value in node.items():
+                node[key] = _resolve(value)
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                node[i] = _resolve(value)
+        return node
+
+    return _resolve(header)
+
+def ImportNifAsBinary(input_file: str, export_havok_readable: bool = False, readable_path: str = '') -> bytes:
+    size = ctypes.c_uint64(0)
+    dll = _get_dll()
+    ptr = dll.ImportNifBinary(input_file.encode('utf-8'), export_havok_readable, readable_path.encode('utf-8'), ctypes.byref(size))
+    if not ptr:
+        return b''
+    try:
+        return ctypes.string_at(ptr, size.value)
+    finally:
+        dll.FreeBuffer(ptr)
+
+def ImportNifAsNumpy(input_file: str, export_havok_readable: bool = False, readable_path: str = '') -> dict | None:
+    """
+    Same content as json.loads(ImportNifAsJson(...)), bulk arrays (havok meshes, mesh data streams) come back as numpy arrays.
+    Returns None if the nif failed to load.
+    """
+    buffer = ImportNifAsBinary(input_file, export_havok_readable, readable_path)
+    if len(buffer) == 0:
+        return None
+    return DecodeNifBinary(buffer)
 
 def GetTranscriptPath() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), 'Assets', 'hkTypeTranscript', 'hkTypeTranscript.json'))
 
 def ComposePhysicsDataFromJson(json_data_string: str, platform: Platform, output_binary_path: str, export_readable: bool = False) -> DLLReturnCode:
     transcript_path = GetTranscriptPath()
-    rtn = _dll_compose_physics_data(json_data_string.encode('utf-8'), int(platform.value), transcript_path.encode('utf-8'), output_binary_path.encode('utf-8'), export_readable)
+    rtn = _get_dll().ComposePhysicsData(json_data_string.encode('utf-8'), int(platform.value), transcript_path.encode('utf-8'), output_binary_path.encode('utf-8'), export_readable)
     return DLLReturnCode(rtn)
\ No newline at end of file
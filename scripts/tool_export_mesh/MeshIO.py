@@ -11,52 +11,45 @@ import utils_blender
 import utils_common as utils
 import utils_math
 import MeshConverter
+import MeshCodec
 
 import utils_primitive
+import utils_meshlet
 
 import time
 
-def MeshToJson(obj, options, bone_list_filter = None, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = []):
+def MeshToJson(obj, options, bone_list_filter = None, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = [], gather_morphs = False):
+	rtn, message, datas, matrices = MeshToJsonPartitioned(obj, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, ref_objects, gather_morphs=gather_morphs)
+	if 'FINISHED' not in rtn:
+		return rtn, message, None, None
+	return rtn, message, datas[0], matrices[0]
+
+def MeshToJsonPartitioned(obj, options, bone_list_filter = None, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = [], auto_partition = False, gather_morphs = False):
+	'''
+	Same as MeshToJson(), but returns lists of data and matrices. With auto_partition, a mesh over the vertex limit
+	is split and gets one entry per partition instead of failing. With gather_morphs, the shape keys are gathered
+	as well so the morph export that follows finds them in the primitive cache.
+	'''
 	start_time = time.time()
 	
 	if not (obj and obj.type == 'MESH'):
 		return {'CANCELLED'}, "Selected object is not a mesh.", None, None
 	
-	# Duplicate the object and triangulate the mesh
-	new_obj = obj.copy()
-	new_obj.data = obj.data.copy()
-	bm = bmesh.new()
-	bm.from_mesh(new_obj.data)
-	bmesh.ops.triangulate(bm, faces=bm.faces[:])
-	bm.to_mesh(new_obj.data)
-	bm.free()
-
-	p_options = utils_primitive.Primitive.Options()
-	p_options.gather_morph_data = False
-	p_options.gather_weights_data = options.WEIGHTS
-	p_options.use_global_positions = options.use_world_origin
-	p_options.max_border = options.max_border
-	
-	p_options.prune_empty_vertex_groups = prune_empty_vertex_groups
+	# Snapped primitives are not cached, their morphs would never reach the morph export
+	p_options = _PrimitiveOptions(obj, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, auto_partition, gather_morphs and len(ref_objects) == 0)
 
-	if options.use_secondary_uv:
-		uv_layer = obj.data.uv_layers.active
-		for _uv_layer in obj.data.uv_layers:
-			if _uv_layer != uv_layer:
-				p_options.secondary_uv_layer_index = obj.data.uv_layers.find(_uv_layer.name)
-				break
-
-	if head_object_mode == 'Base':
-		facebone_vg_names = [vg.name for vg in obj.vertex_groups if vg.name.startswith("faceBone_")]
-		p_options.vertex_group_merge_source = facebone_vg_names
-		p_options.vertex_group_merge_target = "C_Head"
+	# Snapping edits the gathered arrays, only plain gathers are shared through the cache
+	cache_key = utils_primitive.primitive_cache.key(obj, p_options) if len(ref_objects) == 0 else None
+	primitive = utils_primitive.primitive_cache.get(cache_key)
+	if primitive is not None:
+		print(f"MeshToJson reusing cached primitive for {obj.name}")
+		result = _PrimitiveToResult(primitive)
+		print(f"MeshToJson took {time.time() - start_time} seconds")
+		return result
 
-	if bone_list_filter is not None:
-		for vg in obj.vertex_groups:
-			if vg.name not in bone_list_filter:
-				p_options.vertex_group_ignore.append(vg.name)
+	new_obj = _TriangulatedCopy(obj, p_options)
 
-	primitive = utils_primitive.Primitive(new_obj, p_options)
+	primitive = utils_primitive.Primitive(new_obj if new_obj is not None else obj, p_options)
 
 	if len(ref_objects) >= 1:
 		print("Snapping on export mesh was enabled. Snapping the data...")
@@ -72,6 +65,8 @@ def MeshToJson(obj, options, bone_list_filter = None, prune_empty_vertex_groups
 			sel_p_options.gather_morph_data = False
 			sel_p_options.gather_tangents = False
 			sel_p_options.use_global_positions = options.use_world_origin
+			# Only looked up by position, triangle order does not matter
+			sel_p_options.vertex_cache_size = 0
 
 			sel_primitive = utils_primitive.Primitive(ref_obj, sel_p_options)
 			sel_primitive.gather()
@@ -79,35 +74,156 @@ def MeshToJson(obj, options, bone_list_filter = None, prune_empty_vertex_groups
 
 	try:
 		primitive.gather()
-	except utils_primitive.UVNotFoundException as e:
-		return {'CANCELLED'}, "Your mesh has no active UV map.", None, None
-	except utils_primitive.AtomicException as e:
-		return {'CANCELLED'}, "Your mesh has too many vertices or sharp edges or uv islands. Try to reduce them.", None, None
 	except Exception as e:
-		return {'CANCELLED'}, f"An error occurred: {e}", None, None
+		return {'CANCELLED'}, _GatherErrorMessage(e), None, None
 
 	if len(ref_objects) >= 1:
-		for ref_primitive in ref_primitives:
-
-			utils_primitive.CopyNormalsAtSeam(
-				primitive,
-				ref_primitive,
-				copy_range=options.snapping_range,
-				lerp_coeff=options.snap_lerp_coeff
-			)
+		stitcher = utils_primitive.SeamStitcher(ref_primitives, copy_range=options.snapping_range)
+		stitcher.copy_normals(primitive, lerp_coeff=options.snap_lerp_coeff)
 	
-	try:
-		matrices, data = primitive.to_mesh_numpy_dict()
-	except Exception as e:
-		return {'CANCELLED'}, f"An error occurred on at converting to numpy dict: {e}", None, None
+	result = _PrimitiveToResult(primitive)
+	if 'FINISHED' not in result[0]:
+		return result
 	
+	utils_primitive.primitive_cache.put(cache_key, primitive, with_morphs=p_options.gather_morph_data)
+
 	# Cleanup
-	bpy.data.meshes.remove(new_obj.data)	
+	if new_obj is not None:
+		bpy.data.meshes.remove(new_obj.data)
 
 	print(f"MeshToJson took {time.time() - start_time} seconds")
-	return {'FINISHED'}, "", data, matrices
+	return result
+
+def MeshesToJsonPartitioned(objs, options, bone_list_filters, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = [], auto_partition = False, gather_morphs = False):
+	'''
+	MeshToJsonPartitioned() for several objects, one (rtn, message, datas, matrices) per object. Objects missing from
+	the primitive cache are gathered together by Primitive.gather_many(), which pays the per gather overhead once.
+	'''
+	if len(ref_objects) >= 1:
+		# Snapping needs the reference primitives next to every gather
+		return [
+			MeshToJsonPartitioned(obj, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, ref_objects, auto_partition, gather_morphs)
+			for obj, bone_list_filter in zip(objs, bone_list_filters)
+		]
+
+	start_time = time.time()
+	results = [None] * len(objs)
+	pending = []
+	for i, (obj, bone_list_filter) in enumerate(zip(objs, bone_list_filters)):
+		if not (obj and obj.type == 'MESH'):
+			results[i] = ({'CANCELLED'}, "Selected object is not a mesh.", None, None)
+			continue
+
+		p_options = _PrimitiveOptions(obj, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, auto_partition, gather_morphs)
+		cache_key = utils_primitive.primitive_cache.key(obj, p_options)
+		primitive = utils_primitive.primitive_cache.get(cache_key)
+		if primitive is not None:
+			print(f"MeshToJson reusing cached primitive for {obj.name}")
+			results[i] = _PrimitiveToResult(primitive)
+			continue
+
+		pending.append((i, obj, _TriangulatedCopy(obj, p_options), p_options, cache_key))
+
+	primitives = utils_primitive.Primitive.gather_many(
+		[new_obj if new_obj is not None else obj for _, obj, new_obj, _, _ in pending],
+		[p_options for _, _, _, p_options, _ in pending]
+	)
+
+	for (i, obj, new_obj, p_options, cache_key), primitive in zip(pending, primitives):
+		if isinstance(primitive, Exception):
+			results[i] = ({'CANCELLED'}, _GatherErrorMessage(primitive), None, None)
+		else:
+			results[i] = _PrimitiveToResult(primitive)
+			if 'FINISHED' in results[i][0]:
+				utils_primitive.primitive_cache.put(cache_key, primitive, with_morphs=p_options.gather_morph_data)
+
+		if new_obj is not None:
+			bpy.data.meshes.remove(new_obj.data)
 
-def ExportMesh(options, context, filepath: str, operator, bone_list_filter = None, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = []):
+	print(f"MeshesToJson took {time.time() - start_time} seconds for {len(objs)} objects")
+	return results
+
+def _PrimitiveOptions(obj, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, auto_partition, gather_morphs = False):
+	p_options = utils_primitive.Primitive.Options()
+	# Streamed morphs are gathered chunk by chunk by the morph export itself, it cannot take them from the cache
+	prefs = utils_blender.get_preferences()
+	p_options.gather_morph_data = gather_morphs and obj.data.shape_keys is not None and prefs.morph_chunk_size <= 0
+	p_options.quantize_morph_data = p_options.gather_morph_data and prefs.quantize_morphs
+	p_options.partition_oversized = auto_partition
+	p_options.gather_weights_data = options.WEIGHTS
+	p_options.use_global_positions = options.use_world_origin
+	p_options.max_border = options.max_border
+	
+	p_options.prune_empty_vertex_groups = prune_empty_vertex_groups
+	# The deprecated panel passes the scene as options, it has no LOD setting
+	p_options.lod_ratios = ParseLodRatios(getattr(options, 'lod_ratios', ''))
+	p_options.gather_meshlets = getattr(options, 'gather_meshlets', False)
+
+	if options.use_secondary_uv:
+		p_options.secondary_uv_layer_index = utils_primitive.SecondaryUVLayerIndex(obj)
+
+	if head_object_mode == 'Base':
+		facebone_vg_names = [vg.name for vg in obj.vertex_groups if vg.name.startswith("faceBone_")]
+		p_options.vertex_group_merge_source = facebone_vg_names
+		p_options.vertex_group_merge_target = "C_Head"
+
+	if bone_list_filter is not None:
+		for vg in obj.vertex_groups:
+			if vg.name not in bone_list_filter:
+				p_options.vertex_group_ignore.append(vg.name)
+
+	return p_options
+
+def _TriangulatedCopy(obj, p_options):
+	# Triangles come from loop_triangles, the object is only duplicated and triangulated when it has ngons
+	if not utils_primitive.NeedsTriangulatedCopy(obj, p_options):
+		return None
+	new_obj = obj.copy()
+	new_obj.data = obj.data.copy()
+	bm = bmesh.new()
+	bm.from_mesh(new_obj.data)
+	bmesh.ops.triangulate(bm, faces=bm.faces[:])
+	bm.to_mesh(new_obj.data)
+	bm.free()
+	return new_obj
+
+def _GatherErrorMessage(e):
+	if isinstance(e, utils_primitive.UVNotFoundException):
+		return "Your mesh has no active UV map."
+	if isinstance(e, utils_primitive.AtomicException):
+		return "Your mesh has too many vertices or sharp edges or uv islands. Try to reduce them."
+	return f"An error occurred: {e}"
+
+def _PrimitiveToResult(primitive):
+	try:
+		matrices, datas = _PartitionsToNumpyDicts(primitive)
+	except Exception as e:
+		return {'CANCELLED'}, f"An error occurred on at converting to numpy dict: {e}", None, None
+	return {'FINISHED'}, "", datas, matrices
+
+def ParseLodRatios(text):
+	'''
+	"0.5, 0.25, 0.1" -> [0.5, 0.25, 0.1], entries that are not ratios between 0 and 1 are skipped.
+	'''
+	ratios = []
+	for entry in text.replace(';', ',').split(','):
+		try:
+			ratio = float(entry)
+		except ValueError:
+			continue
+		if 0 < ratio < 1:
+			ratios.append(ratio)
+	return ratios
+
+def _PartitionsToNumpyDicts(primitive):
+	matrices, datas = [], []
+	for partition in primitive.partitions:
+		_matrices, _data = partition.to_mesh_numpy_dict()
+		matrices.append(_matrices)
+		datas.append(_data)
+	return matrices, datas
+
+def ExportMesh(options, context, filepath: str, operator, bone_list_filter = None, prune_empty_vertex_groups = False, head_object_mode = 'None', ref_objects = [], gather_morphs = False):
 	export_mesh_file_path = filepath
 	export_mesh_folder_path = os.path.dirname(export_mesh_file_path)
 	
@@ -125,7 +241,7 @@ def ExportMesh(options, context, filepath: str, operator, bone_list_filter = Non
 	
 	time_start = time.time()
 
-	rtn, message, data, matrices = MeshToJson(active_object, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, ref_objects=ref_objects)
+	rtn, message, data, matrices = MeshToJson(active_object, options, bone_list_filter, prune_empty_vertex_groups, head_object_mode, ref_objects=ref_objects, gather_morphs=gather_morphs)
 
 	time_end = time.time()
 
@@ -136,6 +252,9 @@ def ExportMesh(options, context, filepath: str, operator, bone_list_filter = Non
 	#json_data = json.dumps(data)
 	
 	returncode = MeshConverter.ExportMeshFromNumpy({**data, **matrices}, result_file_path)
+	# MeshConverter.dll writes no LODs, they are patched into the file afterwards
+	if returncode and len(matrices['lods']) > 0 and matrices['meshlets'] is None:
+		MeshCodec.write_lods(result_file_path, matrices['lods'])
 
 	time_end1 = time.time()
 
@@ -261,18 +380,33 @@ def MeshFromJson(json_data, options, context, operator, mesh_name_override = Non
 			material.diffuse_color = _c[:] + (1.0,)
 			mesh.materials.append(material)
 
-		curr_tri = 0
-		for i in range(num_meshlets):
-			tri_counts = data['meshlets'][i][2]
-			#tri_offset = data['meshlets'][i][3]
-			for j in range(curr_tri, curr_tri + tri_counts):
-				mesh.polygons[j].material_index = i
-			curr_tri += tri_counts
+		# Triangles are stored in meshlet order, PrimCount consecutive triangles per meshlet
+		records = np.array(data['meshlets'], dtype=np.uint32).reshape(-1, 4)
+		if records[:, 2].sum() != len(mesh.polygons):
+			operator.report({'WARNING'}, f"Meshlet data mismatched.")
+		else:
+			mesh.polygons.foreach_set('material_index', np.repeat(np.arange(num_meshlets, dtype=np.int32), records[:, 2]))
+
+			positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+			mesh.vertices.foreach_get('co', positions)
+			triangles = np.empty(len(mesh.polygons) * 3, dtype=np.int32)
+			mesh.polygons.foreach_get('vertices', triangles)
+			positions, triangles = positions.reshape(-1, 3), triangles.reshape(-1, 3)
+			spheres = utils_meshlet.bounding_spheres(triangles, positions, records[:, 2])
+			cones = utils_meshlet.normal_cones(triangles, positions, records[:, 2], spheres)
+			report = utils_meshlet.meshlet_report(records, cones, spheres)
+			print(f"{num_meshlets} meshlets: vertex fill {report['vertex_fill']:.1%}, primitive fill {report['primitive_fill']:.1%}, "
+				f"usable cones {report['cone_usable']:.1%}, cone culled meshlets {report['meshlets_culled']:.1%}, triangles {report['triangles_culled']:.1%}")
 
 		if options.culldata_debug:
 			
 			CULLDATA_VERSION = 2
 
+			if CULLDATA_VERSION == 2:
+				culldata = np.array(data['culldata'], dtype=np.float32).reshape(-1, 6)
+				boxes = utils_blender.BoxesFromCenterExpand("CullBBoxes", culldata[:, :3], culldata[:, 3:])
+				boxes.display_type = 'WIRE'
+
 			for i in range(num_meshlets):
 				if CULLDATA_VERSION == 1:
 					center = data['culldata'][i][:3]
@@ -311,14 +445,6 @@ def MeshFromJson(json_data, options, context, operator, mesh_name_override = Non
 						pass
 					else:
 						pass
-				elif CULLDATA_VERSION == 2:
-					min_max_bounds = data['culldata'][i][:6]
-
-					box = utils_blender.BoxFromCenterExpand(f"CullBBox_{i}", min_max_bounds[:3], min_max_bounds[3:])
-					box.show_bounds = True
-					box.display_type = 'BOUNDS'
-					box.display_bounds_type = 'BOX'
-					box.show_wire = True
 
 	if options.tangents_debug and len(data['tangents']) > 0:
 		num_tangents = len(data['tangents'])
@@ -53,6 +53,18 @@ class ExportCustomMesh(bpy.types.Operator):
 		default=False,
 	)
 
+	lod_ratios: bpy.props.StringProperty(
+		name="Generate LODs",
+		description="Comma separated triangle ratios of LODs to generate into the .mesh, e.g. 0.5, 0.25, 0.1. Empty writes no LODs.",
+		default="",
+	)
+
+	gather_meshlets: bpy.props.BoolProperty(
+		name="Build Meshlets",
+		description="Build the meshlets and their culling data in python and write the .mesh without MeshConverter.dll.",
+		default=False,
+	)
+
 	snapping_enabled: bpy.props.BoolProperty(
 		name="Snap Normals To Selected",
 		description="Snapping data of connecting vertices to closest verts from selected objects.",
@@ -86,6 +98,8 @@ class ExportCustomMesh(bpy.types.Operator):
 		layout.prop(self, "WEIGHTS")
 		layout.prop(self, "use_secondary_uv")
 		layout.prop(self, "export_sf_mesh_hash_result")
+		layout.prop(self, "lod_ratios")
+		layout.prop(self, "gather_meshlets")
 
 		layout.separator()
 		layout.label(text="Snapping data:") 
@@ -119,7 +133,7 @@ class ExportCustomMesh(bpy.types.Operator):
 		if self.snapping_enabled:
 			mesh_success, _, _, _ = MeshIO.ExportMesh(self,context,self.filepath,self, ref_objects=original_selected)
 		else:
-			mesh_success, _, _, _ = MeshIO.ExportMesh(self,context,self.filepath,self)
+			mesh_success, _, _, _ = MeshIO.ExportMesh(self,context,self.filepath,self, gather_morphs=self.export_morph)
 
 		if 'FINISHED' in mesh_success and self.export_morph:
 			utils_blender.SetSelectObjects(original_selected)
@@ -0,0 +1,195 @@
+'''
+Header-only scanner for folders of .mesh files.
+
+Walks a directory tree, reads just the section counters of every .mesh with MeshCodec.read_section_table
+(the streams themselves are never decoded) on a process pool, and writes one row per file to a columnar
+table in .npz, .sqlite/.db or .parquet (needs pyarrow). Files whose size and mtime match the previous
+table at the same output path are not read again, and the table is checkpointed while scanning so an
+interrupted scan resumes where it stopped.
+
+    python MeshScanner.py <data folder> <output table> [--workers N]
+'''
+import os
+import mmap
+import time
+import sqlite3
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import MeshCodec
+
+SCAN_COLUMNS = [
+    ('path', str),
+    ('size', np.int64),
+    ('mtime_ns', np.int64),
+    ('num_vertices', np.int64),
+    ('num_triangles', np.int64),
+    ('num_weights_per_vertex', np.int64),
+    ('max_border', np.float32),
+    ('num_lods', np.int64),
+    ('num_meshlets', np.int64),
+    ('error', str),
+]
+
+_SQL_TYPES = {
+    str: 'TEXT',
+    np.int64: 'INTEGER',
+    np.float32: 'REAL',
+}
+
+_SQL_TABLE = 'mesh_headers'
+
+def scan_mesh_header(path: str) -> tuple:
+    '''
+    Returns one row in SCAN_COLUMNS order. Unreadable files get -1 counters and the reason in 'error',
+    files gone or locked since the walk also a -1 size and mtime, so the next scan reads them again.
+    '''
+    stat = None
+    try:
+        stat = os.stat(path)
+        if stat.st_size == 0:
+            raise MeshCodec.MeshFormatException("Empty file")
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            table = MeshCodec.read_section_table(buffer)
+        return (
+            path, stat.st_size, stat.st_mtime_ns,
+            table['positions'][1], table['indices'][1] // 3, table['num_weightsPerVertex'], table['max_border'],
+            len(table['lods']), table['meshlets'][1], ''
+        )
+    except (MeshCodec.MeshFormatException, OSError, ValueError) as e:
+        size, mtime_ns = (stat.st_size, stat.st_mtime_ns) if stat is not None else (-1, -1)
+        return (path, size, mtime_ns, -1, -1, -1, 0.0, -1, -1, str(e) or type(e).__name__)
+
+def iter_mesh_files(root: str, extension: str = '.mesh'):
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(extension):
+                yield os.path.join(dirpath, filename)
+
+def _rows_to_columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    columns = {}
+    for i, (name, dtype) in enumerate(SCAN_COLUMNS):
+        values = [row[i] for row in rows]
+        columns[name] = np.array(values, dtype=np.str_ if dtype is str else dtype)
+        if dtype is str and len(values) == 0:
+            columns[name] = np.zeros(0, dtype='<U1')
+    return columns
+
+def _columns_to_rows(columns: dict) -> list[tuple]:
+    names = [name for name, _ in SCAN_COLUMNS]
+    return [tuple(v.item() if hasattr(v, 'item') else v for v in row) for row in zip(*(columns[name] for name in names))]
+
+def _table_format(output_path: str) -> str:
+    ext = os.path.splitext(output_path)[1].lower()
+    match ext:
+        case '.npz':
+            return 'npz'
+        case '.sqlite' | '.db':
+            return 'sqlite'
+        case '.parquet':
+            return 'parquet'
+        case _:
+            raise ValueError(f"Unsupported table format '{ext}', use .npz, .sqlite, .db or .parquet")
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Writing .parquet tables requires pyarrow, use .npz or .sqlite instead")
+
+def load_scan(output_path: str) -> list[tuple]:
+    '''
+    Rows of a previously written table, empty if it does not exist yet.
+    '''
+    if not os.path.isfile(output_path):
+        return []
+
+    match _table_format(output_path):
+        case 'npz':
+            with np.load(output_path) as npz:
+                return _columns_to_rows({name: npz[name] for name, _ in SCAN_COLUMNS})
+        case 'sqlite':
+            conn = sqlite3.connect(output_path)
+            try:
+                exists = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (_SQL_TABLE,)).fetchone()
+                if exists is None:
+                    return []
+                names = ', '.join(name for name, _ in SCAN_COLUMNS)
+                return [tuple(row) for row in conn.execute(f"SELECT {names} FROM {_SQL_TABLE}")]
+            finally:
+                conn.close()
+        case 'parquet':
+            pa = _import_pyarrow()
+            table = pa.parquet.read_table(output_path)
+            return _columns_to_rows({name: table.column(name).to_numpy() for name, _ in SCAN_COLUMNS})
+
+def write_scan(rows: list[tuple], output_path: str):
+    '''
+    Replaces the table at output_path with rows. Files are written next to the target and swapped in,
+    so an interrupted write never leaves a broken table behind.
+    '''
+    fmt = _table_format(output_path)
+    tmp_path = output_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    match fmt:
+        case 'npz':
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **_rows_to_columns(rows))
+        case 'sqlite':
+            with sqlite3.connect(tmp_path) as conn:
+                column_defs = ', '.join(f"{name} {_SQL_TYPES[dtype]}" + (" PRIMARY KEY" if name == 'path' else "") for name, dtype in SCAN_COLUMNS)
+                conn.execute(f"CREATE TABLE {_SQL_TABLE} ({column_defs})")
+                conn.executemany(f"INSERT INTO {_SQL_TABLE} VALUES ({', '.join('?' * len(SCAN_COLUMNS))})", rows)
+            conn.close()
+        case 'parquet':
+            pa = _import_pyarrow()
+            pa.parquet.write_table(pa.table(_rows_to_columns(rows)), tmp_path)
+
+    os.replace(tmp_path, output_path)
+
+def ScanMeshHeaders(root: str, output_path: str, max_workers: int | None = None, chunksize: int = 64, checkpoint_every: int = 5000) -> dict[str, np.ndarray]:
+    '''
+    Scans every .mesh under root into the table at output_path and returns it as {column: array}.
+    '''
+    previous = {row[0]: row for row in load_scan(output_path)}
+
+    rows = []
+    pending = []
+    for path in iter_mesh_files(os.path.abspath(root)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        row = previous.get(path)
+        if row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            rows.append(row)
+        else:
+            pending.append(path)
+
+    print(f"MeshScanner: {len(rows)} unchanged, {len(pending)} to scan.")
+
+    ts = time.time()
+    if len(pending) > 0:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for i, row in enumerate(executor.map(scan_mesh_header, pending, chunksize=chunksize), 1):
+                rows.append(row)
+                if i % checkpoint_every == 0:
+                    write_scan(rows, output_path)
+                    print(f"MeshScanner: {i}/{len(pending)} scanned, checkpoint written.")
+
+    write_scan(rows, output_path)
+    print(f"MeshScanner: scanned {len(pending)} files in {time.time() - ts:.2f} secs, {len(rows)} rows written to {output_path}")
+    return _rows_to_columns(rows)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scan .mesh headers into a columnar table.")
+    parser.add_argument('root', help="Folder to scan recursively")
+    parser.add_argument('output', help="Output table (.npz, .sqlite, .db or .parquet)")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+    ScanMeshHeaders(args.root, args.output, max_workers=args.workers)
@@ -0,0 +1,404 @@
+'''
+Pure NumPy reader and writer for Starfield .morph.dat files.
+
+MorphWriter produces the same file as MorphIO::LoadFromNumpy followed by MorphIO::Serialize in the C++
+converter, but takes the shape keys a few at a time instead of as one (num shape keys, num vertices, 3) block.
+Encoded records of every chunk are spooled to a temporary file, closing the writer scatters them into
+vertex order straight into the output file, so only one chunk of keys is ever held in memory.
+
+Files only hold the vertices a shape key moves. SparseMorphs keeps morphs that way in memory too,
+ImportMorphAsSparse and ExportSparseMorph read and write it without ever building the dense arrays.
+EncodedMorphs goes one step further and holds the encoded records themselves, half float deltas and DEC3N
+normals and tangents, so they are quantized once and written as they are.
+
+Layout (little endian):
+    char[4] 'MDAT'
+    uint32 num_axis (3)
+    uint32 num_vertices
+    uint32 num_shape_keys, { uint32 n, char[n] } * num_shape_keys
+    uint32 num_morph_data
+    uint32 num_offsets (= num_vertices)
+    morph_data[num_morph_data], grouped by vertex, shape keys ascending within a vertex
+    { uint32 offset, uint32 key_mask[4] } * num_offsets
+'''
+import os
+import tempfile
+import numpy as np
+
+import MeshCodec
+
+MORPH_MAGIC = b'MDAT'
+MORPH_NUM_AXIS = 3
+MAX_SHAPE_KEYS = 128
+
+# Entries whose position delta stays within this on every axis are not written, as in MorphIO::LoadFromNumpy
+DELTA_THRESHOLD = 1e-4
+
+MORPH_DATA_DTYPE = np.dtype([('offset', '<u2', 3), ('target_color', '<u2'), ('normal', '<u4'), ('tangent', '<u4')])
+OFFSET_DTYPE = np.dtype([('offset', '<u4'), ('mask', '<u4', 4)])
+
+class MorphFormatException(Exception):
+    pass
+
+def encode_rgb565(colors:np.ndarray) -> np.ndarray:
+    '''
+    (N, 3) float colors in [0, 255] -> uint16 RGB565, channels truncated to uint8 first like utils::encodeRGB565 is called.
+    '''
+    c = np.clip(colors, 0, 255).astype(np.uint8).astype(np.uint16)
+    return (((c[:, 0] >> 3) << 11) | ((c[:, 1] >> 2) << 5) | (c[:, 2] >> 3)).astype('<u2')
+
+def encode_records(delta_positions:np.ndarray, target_colors:np.ndarray, delta_normals:np.ndarray, delta_tangents:np.ndarray) -> np.ndarray:
+    '''
+    (N, 3) float values -> (N,) MORPH_DATA_DTYPE records, encoded as MorphIO::Serialize does.
+    '''
+    records = np.empty(len(delta_positions), dtype=MORPH_DATA_DTYPE)
+    records['offset'] = MeshCodec.float_to_half(delta_positions)
+    records['target_color'] = encode_rgb565(target_colors)
+    records['normal'] = MeshCodec.encode_dec3n(delta_normals, 1)
+    records['tangent'] = MeshCodec.encode_dec3n(delta_tangents, 1)
+    return records
+
+def decode_records(records:np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    (N,) MORPH_DATA_DTYPE records -> (N, 3) float32 position deltas, target colors, normal deltas and tangent deltas.
+    '''
+    delta_positions = records['offset'].view('<f2').astype(np.float32)
+    colors = records['target_color'].astype(np.uint16)
+    target_colors = np.stack([(colors >> 11) << 3, ((colors >> 5) & 0x3F) << 2, (colors & 0x1F) << 3], axis=1).astype(np.float32)
+    delta_normals, _ = MeshCodec.decode_dec3n(records['normal'])
+    delta_tangents, _ = MeshCodec.decode_dec3n(records['tangent'])
+    return delta_positions, target_colors, delta_normals, delta_tangents
+
+def _split_by_key(values:np.ndarray, counts:list[int]) -> list[np.ndarray]:
+    return np.split(values, np.cumsum(counts)[:-1]) if len(counts) > 0 else []
+
+class SparseMorphs():
+    '''
+    Morph data as stored in a .morph.dat: for every shape key the ids of the vertices it moves and the
+    (n, 3) float32 position deltas, target colors, normal deltas and tangent deltas of those vertices.
+    Field names match the keys of Primitive.to_morph_numpy_dict() through _dense_keys.
+    '''
+    fields = ('delta_positions', 'target_colors', 'delta_normals', 'delta_tangents')
+    _dense_keys = ('deltaPositions', 'targetColors', 'deltaNormals', 'deltaTangents')
+
+    def __init__(self, num_vertices:int, shape_keys:list[str], indices:list[np.ndarray], delta_positions:list[np.ndarray], target_colors:list[np.ndarray], delta_normals:list[np.ndarray], delta_tangents:list[np.ndarray]):
+        self.num_vertices = num_vertices
+        self.shape_keys = list(shape_keys)
+        self.indices = indices
+        self.delta_positions = delta_positions
+        self.target_colors = target_colors
+        self.delta_normals = delta_normals
+        self.delta_tangents = delta_tangents
+
+    @property
+    def nnz(self) -> int:
+        return sum(len(i) for i in self.indices)
+
+    @classmethod
+    def from_dense(cls, numpy_dict:dict, epsilon:float = DELTA_THRESHOLD) -> 'SparseMorphs':
+        '''
+        Dict laid out like Primitive.to_morph_numpy_dict() -> SparseMorphs keeping the vertices whose position delta exceeds epsilon.
+        '''
+        delta_positions = np.asarray(numpy_dict['deltaPositions'], dtype=np.float32)
+        indices = [np.flatnonzero(np.any(np.abs(d) > epsilon, axis=1)) for d in delta_positions]
+        values = [
+            [np.asarray(numpy_dict[key][k], dtype=np.float32)[ids] for k, ids in enumerate(indices)]
+            for key in cls._dense_keys
+        ]
+        return cls(numpy_dict['numVertices'], numpy_dict['shapeKeys'], indices, *values)
+
+    def dense(self, field:str, key:int) -> np.ndarray:
+        '''
+        (num_vertices, 3) float32 values of one field of one shape key, zero where the key does not move a vertex.
+        '''
+        result = np.zeros((self.num_vertices, 3), dtype=np.float32)
+        result[self.indices[key]] = getattr(self, field)[key]
+        return result
+
+    def to_dense(self) -> dict:
+        '''
+        Same layout as Primitive.to_morph_numpy_dict() and MeshConverter.ImportMorphAsNumpy().
+        '''
+        data = {
+            "numVertices": self.num_vertices,
+            "shapeKeys": self.shape_keys,
+        }
+        for field, key in zip(self.fields, self._dense_keys):
+            data[key] = np.stack([self.dense(field, k) for k in range(len(self.shape_keys))]) if self.shape_keys else np.zeros((0, self.num_vertices, 3), dtype=np.float32)
+        return data
+
+    def resized(self, num_vertices:int) -> 'SparseMorphs':
+        '''
+        Copy for a mesh of num_vertices vertices, entries of vertices past the end are dropped.
+        '''
+        keep = [ids < num_vertices for ids in self.indices]
+        values = [[v[k] for v, k in zip(getattr(self, field), keep)] for field in self.fields]
+        return SparseMorphs(num_vertices, self.shape_keys, [ids[k] for ids, k in zip(self.indices, keep)], *values)
+
+class EncodedMorphs():
+    '''
+    Morph data as the records a .morph.dat stores: for every shape key the ids of the vertices it moves and their
+    MORPH_DATA_DTYPE records, 16 bytes an entry instead of the 48 of the float values.
+    errors holds, per shape key, the largest absolute error of the position deltas, normal deltas and tangent deltas
+    against the float values the records were encoded from.
+    '''
+    def __init__(self, num_vertices:int, shape_keys:list[str], indices:list[np.ndarray], records:list[np.ndarray], errors:np.ndarray | None = None):
+        self.num_vertices = num_vertices
+        self.shape_keys = list(shape_keys)
+        self.indices = indices
+        self.records = records
+        self.errors = np.zeros((len(self.shape_keys), 3), dtype=np.float32) if errors is None else errors
+
+    @property
+    def nnz(self) -> int:
+        return sum(len(i) for i in self.indices)
+
+    @classmethod
+    def from_sparse(cls, morphs:SparseMorphs) -> 'EncodedMorphs':
+        '''
+        Encodes the entries of SparseMorphs that a MorphWriter would write, all shape keys at once.
+        '''
+        if len(morphs.shape_keys) == 0:
+            return cls(morphs.num_vertices, morphs.shape_keys, [], [])
+        values = [np.concatenate(getattr(morphs, field)).reshape(-1, 3).astype(np.float32) for field in SparseMorphs.fields]
+        key = np.repeat(np.arange(len(morphs.shape_keys)), [len(ids) for ids in morphs.indices])
+        # Same cut as MorphWriter, entries below it are never written
+        stored = np.any(np.abs(values[0]) > DELTA_THRESHOLD, axis=1)
+        values = [v[stored] for v in values]
+        key = key[stored]
+        vertex = np.concatenate(morphs.indices)[stored]
+
+        records = encode_records(*values)
+        decoded = decode_records(records)
+        errors = np.zeros((len(morphs.shape_keys), 3), dtype=np.float32)
+        for column, i in enumerate((0, 2, 3)):
+            np.maximum.at(errors[:, column], key, np.abs(decoded[i] - values[i]).max(axis=1, initial=0))
+
+        counts = np.bincount(key, minlength=len(morphs.shape_keys)).tolist()
+        return cls(morphs.num_vertices, morphs.shape_keys, _split_by_key(vertex, counts), _split_by_key(records, counts), errors)
+
+    def to_sparse(self) -> SparseMorphs:
+        '''
+        Decoded copy, the values the file written from these records reads back as.
+        '''
+        counts = [len(ids) for ids in self.indices]
+        records = np.concatenate(self.records) if self.records else np.zeros(0, dtype=MORPH_DATA_DTYPE)
+        values = [_split_by_key(v, counts) for v in decode_records(records)]
+        return SparseMorphs(self.num_vertices, self.shape_keys, self.indices, *values)
+
+class MorphWriter():
+    '''
+    with MorphWriter(path, num_vertices, shape_keys) as writer:
+        for chunk in chunks:
+            writer.write_keys(delta_positions, target_colors, delta_normals, delta_tangents)
+
+    Every write_keys() call takes the next (K, num_vertices, 3) slice of the four float arrays
+    Primitive.to_morph_numpy_dict() would return. The file is only written when the writer is closed
+    after all shape keys were given, a writer left by an exception writes nothing.
+    '''
+    def __init__(self, output_file:str, num_vertices:int, shape_keys:list[str]):
+        if not output_file.endswith('.dat'):
+            output_file += '.dat'
+        if len(shape_keys) > MAX_SHAPE_KEYS:
+            raise MorphFormatException(f"A .morph.dat holds at most {MAX_SHAPE_KEYS} shape keys, got {len(shape_keys)}")
+
+        self.output_file = output_file
+        self.num_vertices = num_vertices
+        self.shape_keys = list(shape_keys)
+
+        self._spool = tempfile.TemporaryFile()
+        self._chunk_counts:list[np.ndarray] = []
+        self._masks = np.zeros((num_vertices, 4), dtype='<u4')
+        self._next_key = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+
+    def write_keys(self, delta_positions:np.ndarray, target_colors:np.ndarray, delta_normals:np.ndarray, delta_tangents:np.ndarray):
+        num_keys = len(delta_positions)
+        if self._next_key + num_keys > len(self.shape_keys):
+            raise MorphFormatException(f"MorphWriter got more than the {len(self.shape_keys)} shape keys it was created for")
+
+        stored = np.any(np.abs(delta_positions) > DELTA_THRESHOLD, axis=2)
+        vertex, key = np.nonzero(stored.T)
+        self._write_entries(num_keys, vertex, key, delta_positions[key, vertex], target_colors[key, vertex], delta_normals[key, vertex], delta_tangents[key, vertex])
+
+    def write_sparse_keys(self, indices:list[np.ndarray], delta_positions:list[np.ndarray], target_colors:list[np.ndarray], delta_normals:list[np.ndarray], delta_tangents:list[np.ndarray]):
+        '''
+        Sparse counterpart of write_keys(), one entry per shape key laid out like SparseMorphs.
+        '''
+        num_keys = len(indices)
+        if self._next_key + num_keys > len(self.shape_keys):
+            raise MorphFormatException(f"MorphWriter got more than the {len(self.shape_keys)} shape keys it was created for")
+        if num_keys == 0:
+            return
+
+        vertex = np.concatenate(indices).astype(np.int64)
+        key = np.repeat(np.arange(num_keys), [len(ids) for ids in indices])
+        values = [np.concatenate(v).reshape(-1, 3) for v in (delta_positions, target_colors, delta_normals, delta_tangents)]
+
+        # Same cut as the dense path, entries below it would not be written by the dll either
+        stored = np.any(np.abs(values[0]) > DELTA_THRESHOLD, axis=1)
+        order = np.lexsort((key[stored], vertex[stored]))
+        vertex, key = vertex[stored][order], key[stored][order]
+        self._write_entries(num_keys, vertex, key, *(v[stored][order] for v in values))
+
+    def write_records(self, indices:list[np.ndarray], records:list[np.ndarray]):
+        '''
+        Encoded counterpart of write_sparse_keys(), one entry per shape key laid out like EncodedMorphs.
+        '''
+        num_keys = len(indices)
+        if self._next_key + num_keys > len(self.shape_keys):
+            raise MorphFormatException(f"MorphWriter got more than the {len(self.shape_keys)} shape keys it was created for")
+        if num_keys == 0:
+            return
+
+        vertex = np.concatenate(indices).astype(np.int64)
+        key = np.repeat(np.arange(num_keys), [len(ids) for ids in indices])
+        order = np.lexsort((key, vertex))
+        self._write_records(num_keys, vertex[order], key[order], np.concatenate(records)[order])
+
+    def _write_entries(self, num_keys:int, vertex:np.ndarray, key:np.ndarray, delta_positions:np.ndarray, target_colors:np.ndarray, delta_normals:np.ndarray, delta_tangents:np.ndarray):
+        self._write_records(num_keys, vertex, key, encode_records(delta_positions, target_colors, delta_normals, delta_tangents))
+
+    def _write_records(self, num_keys:int, vertex:np.ndarray, key:np.ndarray, records:np.ndarray):
+        # Entries must come grouped by vertex with keys ascending, keys relative to the first key of this call
+        self._spool.write(records.tobytes())
+
+        # A vertex meets every key at most once, so summing its key bits equals or-ing them, and float64 holds 32 bits exactly
+        global_key = key + self._next_key
+        for word in range(4):
+            in_word = global_key // 32 == word
+            if np.any(in_word):
+                bits = np.ldexp(1.0, global_key[in_word] % 32)
+                self._masks[:, word] |= np.bincount(vertex[in_word], weights=bits, minlength=self.num_vertices).astype(np.uint32)
+
+        self._chunk_counts.append(np.bincount(vertex, minlength=self.num_vertices).astype(np.int64))
+        self._next_key += num_keys
+
+    def close(self):
+        try:
+            if self._next_key != len(self.shape_keys):
+                raise MorphFormatException(f"MorphWriter closed after {self._next_key} of {len(self.shape_keys)} shape keys")
+            self._write()
+        finally:
+            self._spool.close()
+
+    def _write(self):
+        counts = np.zeros(self.num_vertices, dtype=np.int64)
+        for chunk_counts in self._chunk_counts:
+            counts += chunk_counts
+        num_morph_data = int(counts.sum())
+
+        offsets = np.empty(self.num_vertices, dtype=OFFSET_DTYPE)
+        offsets['offset'] = np.cumsum(counts) - counts
+        offsets['mask'] = self._masks
+
+        def u32(value):
+            return np.uint32(value).astype('<u4').tobytes()
+
+        header = [MORPH_MAGIC, u32(MORPH_NUM_AXIS), u32(self.num_vertices), u32(len(self.shape_keys))]
+        for name in self.shape_keys:
+            encoded = name.encode('utf-8')
+            header += [u32(len(encoded)), encoded]
+        header += [u32(num_morph_data), u32(self.num_vertices)]
+        header = b''.join(header)
+
+        with open(self.output_file, 'wb') as f:
+            f.write(header)
+            f.truncate(len(header) + num_morph_data * MORPH_DATA_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(offsets.tobytes())
+
+        if num_morph_data == 0:
+            return
+
+        data = np.memmap(self.output_file, dtype=MORPH_DATA_DTYPE, mode='r+', offset=len(header), shape=(num_morph_data,))
+        cursor = offsets['offset'].astype(np.int64)
+        self._spool.seek(0)
+        for chunk_counts in self._chunk_counts:
+            num_records = int(chunk_counts.sum())
+            records = np.frombuffer(self._spool.read(num_records * MORPH_DATA_DTYPE.itemsize), dtype=MORPH_DATA_DTYPE)
+            # Records of a chunk are grouped by vertex, each lands after what earlier chunks put at that vertex
+            vertex = np.repeat(np.arange(self.num_vertices), chunk_counts)
+            rank = np.arange(num_records) - (np.cumsum(chunk_counts) - chunk_counts)[vertex]
+            data[cursor[vertex] + rank] = records
+            cursor += chunk_counts
+        data.flush()
+        del data
+
+def ExportSparseMorph(morphs:SparseMorphs | EncodedMorphs, output_file:str) -> bool:
+    '''
+    Writes a .morph.dat from SparseMorphs or EncodedMorphs, the file is identical to the one the dll writes from the dense arrays.
+    '''
+    try:
+        with MorphWriter(output_file, morphs.num_vertices, morphs.shape_keys) as writer:
+            if isinstance(morphs, EncodedMorphs):
+                writer.write_records(morphs.indices, morphs.records)
+            else:
+                writer.write_sparse_keys(morphs.indices, morphs.delta_positions, morphs.target_colors, morphs.delta_normals, morphs.delta_tangents)
+    except OSError as e:
+        print(f"MorphCodec.ExportSparseMorph() failed to write {output_file}: {e}")
+        return False
+    return True
+
+def _read_u32(buffer, offset:int) -> int:
+    if offset + 4 > len(buffer):
+        raise MorphFormatException(f"Unexpected end of file at offset {offset}")
+    return int(np.frombuffer(buffer, dtype='<u4', count=1, offset=offset)[0])
+
+def ImportMorphAsSparse(input_file:str) -> SparseMorphs:
+    '''
+    Reads a .morph.dat into SparseMorphs, decoding the values as MorphIO::LoadToNumpy does.
+    '''
+    with open(input_file, 'rb') as f:
+        buffer = f.read()
+
+    if buffer[:4] != MORPH_MAGIC:
+        raise MorphFormatException(f"{input_file} is not a .morph.dat file")
+    num_vertices = _read_u32(buffer, 8)
+    num_shape_keys = _read_u32(buffer, 12)
+    if num_shape_keys > MAX_SHAPE_KEYS:
+        raise MorphFormatException(f"{input_file} claims {num_shape_keys} shape keys, at most {MAX_SHAPE_KEYS} fit the format")
+
+    offset = 16
+    shape_keys = []
+    for _ in range(num_shape_keys):
+        length = _read_u32(buffer, offset)
+        shape_keys.append(buffer[offset + 4:offset + 4 + length].decode('utf-8'))
+        offset += 4 + length
+
+    num_morph_data = _read_u32(buffer, offset)
+    num_offsets = _read_u32(buffer, offset + 4)
+    offset += 8
+    if num_offsets != num_vertices or offset + num_morph_data * MORPH_DATA_DTYPE.itemsize + num_offsets * OFFSET_DTYPE.itemsize > len(buffer):
+        raise MorphFormatException(f"{input_file} is truncated or has an inconsistent header")
+
+    records = np.frombuffer(buffer, dtype=MORPH_DATA_DTYPE, count=num_morph_data, offset=offset)
+    offsets = np.frombuffer(buffer, dtype=OFFSET_DTYPE, count=num_offsets, offset=offset + records.nbytes)
+
+    # Records are grouped by vertex, the set bits of each vertex's key mask name their shape keys in order
+    bits = np.unpackbits(np.ascontiguousarray(offsets['mask']).view(np.uint8), bitorder='little').reshape(num_vertices, 128)
+    vertex, key = np.nonzero(bits[:, :num_shape_keys])
+    if len(vertex) != num_morph_data:
+        raise MorphFormatException(f"{input_file} key masks name {len(vertex)} entries, the file holds {num_morph_data}")
+
+    delta_positions, target_colors, delta_normals, delta_tangents = decode_records(records)
+
+    order = np.argsort(key, kind='stable')
+    splits = np.searchsorted(key[order], np.arange(1, num_shape_keys))
+    groups = np.split(order, splits)
+    return SparseMorphs(
+        num_vertices, shape_keys,
+        [vertex[g] for g in groups],
+        [delta_positions[g] for g in groups],
+        [target_colors[g] for g in groups],
+        [delta_normals[g] for g in groups],
+        [delta_tangents[g] for g in groups],
+    )
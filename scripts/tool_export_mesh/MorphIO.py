@@ -12,6 +12,7 @@ import utils_math
 import utils_primitive
 import utils_morph_attrs
 import MeshConverter
+import MorphCodec
 
 def IsMorphExportNode(obj):
 	return obj.name.startswith('[MorphExport]')
@@ -31,30 +32,18 @@ def IsMorphObject(obj):
 def ImportMorphFromNumpy(filepath, operator, debug_delta_normal = False, force_import_on_active = False, use_colors = False, use_normals = False):
 	import_path = filepath
 	
-	data = MeshConverter.ImportMorphAsNumpy(import_path)
+	# Kept sparse, shape keys only touch the vertices they move
+	morphs = MorphCodec.ImportMorphAsSparse(import_path)
 
-	vert_count = data["numVertices"]
-	shape_keys = list(data["shapeKeys"])
-	delta_pos = data["deltaPositions"]
-	target_colors = data["targetColors"]
-	delta_normals = data["deltaNormals"]
-	delta_tangents = data["deltaTangents"]
+	vert_count = morphs.num_vertices
+	shape_keys = list(morphs.shape_keys)
 
 	target_obj = bpy.context.active_object
 
 	if force_import_on_active:
 		target_vert_count = len(target_obj.data.vertices)
 		operator.report({'WARNING'}, f"Forcing import on active object. Morph verts: {vert_count}, Target object verts: {target_vert_count}")
-		if vert_count > target_vert_count:
-			delta_pos = delta_pos[:, :target_vert_count, :]
-			target_colors = target_colors[:, :target_vert_count, :]
-			delta_normals = delta_normals[:, :target_vert_count, :]
-			delta_tangents = delta_tangents[:, :target_vert_count, :]
-		elif vert_count < target_vert_count:
-			delta_pos = np.concatenate((delta_pos, np.zeros((len(shape_keys), target_vert_count - vert_count, 3))), axis=1)
-			target_colors = np.concatenate((target_colors, np.zeros((len(shape_keys), target_vert_count - vert_count, 3))), axis=1)
-			delta_normals = np.concatenate((delta_normals, np.zeros((len(shape_keys), target_vert_count - vert_count, 3))), axis=1)
-			delta_tangents = np.concatenate((delta_tangents, np.zeros((len(shape_keys), target_vert_count - vert_count, 3))), axis=1)
+		morphs = morphs.resized(target_vert_count)
 		vert_count = target_vert_count
 
 	if target_obj == None or len(target_obj.data.vertices) != vert_count:
@@ -86,7 +75,7 @@ def ImportMorphFromNumpy(filepath, operator, debug_delta_normal = False, force_i
 	target_obj.data.shape_keys.use_relative = True
 
 	if (use_normals or use_colors):
-		ones_column = np.zeros((data["targetColors"][0].shape[0], 1), dtype=np.float32)
+		ones_column = np.zeros((vert_count, 1), dtype=np.float32)
 
 		loop_indices = np.array([loop.vertex_index for loop in target_obj.data.loops], dtype=np.int32)
 
@@ -97,16 +86,18 @@ def ImportMorphFromNumpy(filepath, operator, debug_delta_normal = False, force_i
 		sk.slider_min = 0
 		sk.slider_max = 1
 
-		sk.data.foreach_set('co', (basis_positions + delta_pos[n]).ravel())
+		positions = basis_positions.copy()
+		positions[morphs.indices[n]] += morphs.delta_positions[n]
+		sk.data.foreach_set('co', positions.ravel())
 
 		if debug_delta_normal:
-			utils_blender.VisualizeVectors(target_obj.data, delta_pos[n], basis_normals + delta_normals[n], key_name)
+			utils_blender.VisualizeVectors(target_obj.data, morphs.dense('delta_positions', n), basis_normals + morphs.dense('delta_normals', n), key_name)
 		
 		if use_colors:
-			utils_morph_attrs.MorphTargetColors().set_data(target_obj.data, key_name, np.hstack((target_colors[n] / 255.0, ones_column))[loop_indices].ravel(), create_if_not_exist=True)
+			utils_morph_attrs.MorphTargetColors().set_data(target_obj.data, key_name, np.hstack((morphs.dense('target_colors', n) / 255.0, ones_column))[loop_indices].ravel(), create_if_not_exist=True)
 
 		if use_normals:
-			utils_morph_attrs.MorphNormals().set_data(target_obj.data, key_name, delta_normals[n][loop_indices].ravel(), create_if_not_exist=True)
+			utils_morph_attrs.MorphNormals().set_data(target_obj.data, key_name, morphs.dense('delta_normals', n)[loop_indices].ravel(), create_if_not_exist=True)
 
 	operator.report({'INFO'}, f"Import Morph Successful.")
 	return {'FINISHED'}
@@ -226,18 +217,38 @@ def ExportMorph_alt(options, context, export_file_path, operator, snapping_range
 	p_options = utils_primitive.Primitive.Options()
 	p_options.gather_morph_data = True
 	p_options.use_global_positions = options.use_world_origin
+	# Snapping edits every shape key after gathering, it needs them all in memory
+	p_options.morph_chunk_size = utils_blender.get_preferences().morph_chunk_size if snapping_range <= 0 else 0
+	p_options.quantize_morph_data = utils_blender.get_preferences().quantize_morphs and snapping_range <= 0
+	# The second uv splits atomics, it has to match the mesh export for the vertex counts to agree
+	if getattr(options, 'use_secondary_uv', False):
+		p_options.secondary_uv_layer_index = utils_primitive.SecondaryUVLayerIndex(target_obj)
 	
-	new_obj = target_obj.copy()
-	new_obj.data = target_obj.data.copy()
-	bm = bmesh.new()
-	bm.from_mesh(new_obj.data)
-	bmesh.ops.triangulate(bm, faces=bm.faces[:])
-	bm.to_mesh(new_obj.data)
-	bm.free()
-
 	time_start = time.time()
 
-	primitive = utils_primitive.Primitive(new_obj, p_options)
+	# Snapping edits the gathered arrays, only plain gathers are shared through the cache
+	cache_key = utils_primitive.primitive_cache.key(target_obj, p_options) if snapping_range <= 0 else None
+	primitive = utils_primitive.primitive_cache.get(cache_key, with_morphs=True, mesh_export=False)
+	if primitive is not None and len(primitive.atomic_vertices) > p_options.atomic_max_number:
+		# Gathered for a mesh export that partitions it, the gather below reports the limit
+		primitive = None
+
+	new_obj = None
+	from_cache = primitive is not None
+	if not from_cache:
+		# Triangles come from loop_triangles, the object is only duplicated and triangulated when it has ngons
+		if utils_primitive.NeedsTriangulatedCopy(target_obj, p_options):
+			new_obj = target_obj.copy()
+			new_obj.data = target_obj.data.copy()
+			bm = bmesh.new()
+			bm.from_mesh(new_obj.data)
+			bmesh.ops.triangulate(bm, faces=bm.faces[:])
+			bm.to_mesh(new_obj.data)
+			bm.free()
+
+		primitive = utils_primitive.Primitive(new_obj if new_obj is not None else target_obj, p_options)
+	else:
+		print(f"ExportMorph_alt reusing cached primitive for {target_obj.name}")
 
 	sel_primitives = []
 	if snapping_range > 0:
@@ -251,18 +262,40 @@ def ExportMorph_alt(options, context, export_file_path, operator, snapping_range
 			sel_p_options.gather_morph_data = True
 			sel_p_options.gather_tangents = False
 			sel_p_options.use_global_positions = options.use_world_origin
+			# Only looked up by position, triangle order does not matter
+			sel_p_options.vertex_cache_size = 0
 
 			sel_primitive = utils_primitive.Primitive(select_obj, sel_p_options)
 			sel_primitive.gather()
 			sel_primitives.append(sel_primitive)
 
+	jsondata = None
+	returncode = None
 	try:
-		primitive.gather()
-
-		for sel_prim in sel_primitives:
-			utils_primitive.CopyMorphNormalsAtSeam(primitive, sel_prim, snapping_range, snap_delta_positions=snap_delta_positions, lerp_coeff=snap_lerp_coeff, lerp_coeff_delta_pos=snap_lerp_coeff_delta_pos)
+		if not from_cache:
+			primitive.gather()
+
+		if len(sel_primitives) > 0:
+			stitcher = utils_primitive.SeamStitcher(sel_primitives, snapping_range)
+			stitcher.copy_morph_normals(primitive, snap_delta_positions=snap_delta_positions, lerp_coeff=snap_lerp_coeff, lerp_coeff_delta_pos=snap_lerp_coeff_delta_pos)
+
+		num_vertices = len(primitive.atomic_vertices)
+		if primitive.streams_morphs:
+			# Shape keys go to the file chunk by chunk, nothing is left to hand to the dll
+			with MorphCodec.MorphWriter(export_path, num_vertices, primitive.shapeKeys) as writer:
+				primitive.stream_morphs(writer)
+			returncode = MeshConverter.DLLReturnCode(0)
+		elif len(sel_primitives) == 0:
+			# Only the vertices each shape key moves are written, the dense arrays are never built
+			sparse_morphs = primitive.to_sparse_morphs()
+			print(f"ExportMorph_alt writing {sparse_morphs.nnz} morph entries of {num_vertices * len(primitive.shapeKeys)}")
+			returncode = MeshConverter.DLLReturnCode(0 if MorphCodec.ExportSparseMorph(sparse_morphs, export_path) else 9)
+		else:
+			# Snapping edits the dense morph arrays
+			jsondata = primitive.to_morph_numpy_dict()
 
-		jsondata = primitive.to_morph_numpy_dict()
+		if not from_cache:
+			utils_primitive.primitive_cache.put(cache_key, primitive, with_morphs=not primitive.streams_morphs, mesh_export=False)
 	except utils_primitive.UVNotFoundException as e:
 		operator.report({'WARNING'}, f"UVNotFoundException caught: {e}.")
 		return {'CANCELLED'},  None
@@ -285,24 +318,27 @@ def ExportMorph_alt(options, context, export_file_path, operator, snapping_range
 	#	with open(export_path + ".json", 'w') as f:
 	#		f.write(debug_json_data)
 
-	returncode = MeshConverter.ExportMorphFromNumpy(jsondata, export_path)
+	if returncode is None:
+		returncode = MeshConverter.ExportMorphFromNumpy(jsondata, export_path)
 
 	time_end2 = time.time()
 
 	if not returncode:
-		bpy.data.meshes.remove(new_obj.data)
+		if new_obj is not None:
+			bpy.data.meshes.remove(new_obj.data)
 		
 		utils_blender.SetActiveObject(target_obj)
 
 		operator.report({'INFO'}, f"Execution failed with error message: \"{returncode.what()}\". Contact the author for assistance.")
 		return {"CANCELLED"}, None
 
-	bpy.data.meshes.remove(new_obj.data)
+	if new_obj is not None:
+		bpy.data.meshes.remove(new_obj.data)
 
 	utils_blender.SetActiveObject(target_obj)
 
 	operator.report({'INFO'}, f"Export morph successful. Time taken: Gather: {time_end - time_start:.2f}  + Dll: {time_end2 - time_end1:.2} seconds.")
-	return {"FINISHED"}, jsondata['numVertices']
+	return {"FINISHED"}, num_vertices
 
 def ExportMorph(options, context, export_file_path, operator):
 	export_path = export_file_path
@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import bpy
 import mathutils
 
@@ -11,6 +12,7 @@ import nif_armature
 import nif_template
 import utils_common as utils
 import MeshConverter
+import MeshCodec
 import PhysicsConverter
 import MaterialConverter
 
@@ -209,7 +211,7 @@ def TraverseNodeRecursive(armature_dict:dict, parent_node, collection, root_dict
 
 	return _objects
 
-def ImportNif(file_path, options, context, operator):
+def ImportNif(file_path, options, context, operator, nif_data = None):
 	nif_armature.LoadAllSkeletonLookup()
 	ResetSkeletonObjDict()
 	assets_folder = options.assets_folder
@@ -221,13 +223,18 @@ def ImportNif(file_path, options, context, operator):
 		operator.report({'WARNING'}, 'Setup your assets folder before importing!')
 		return {'CANCELLED'}, None, None
 	
-	json_str = MeshConverter.ImportNifAsJson(file_path, utils_blender.is_plugin_debug_mode(), os.path.join(utils.export_mesh_folder_path, 'havok_debug.txt'))
+	if nif_data is None:
+		converter_pool = utils_blender.get_converter_pool()
+		if converter_pool is not None:
+			nif_data = converter_pool.import_nif(file_path, utils_blender.is_plugin_debug_mode(), os.path.join(utils.export_mesh_folder_path, 'havok_debug.txt')).result()
+		else:
+			nif_data = MeshConverter.ImportNifAsNumpy(file_path, utils_blender.is_plugin_debug_mode(), os.path.join(utils.export_mesh_folder_path, 'havok_debug.txt'))
 	
-	if len(json_str) == 0:
+	if not nif_data:
 		operator.report({'WARNING'}, f'Nif failed to load.')
 		return {'CANCELLED'}, None, None
 	
-	_data = json.loads(json_str)
+	_data = nif_data
 
 	prev_coll = bpy.data.collections.new(nifname)
 	bpy.context.scene.collection.children.link(prev_coll)
@@ -317,6 +324,22 @@ def ImportNif(file_path, options, context, operator):
 
 	return {'FINISHED'}, best_skel, obj_list
 
+def _RemapGeometryIndices(node, remap):
+	# Nodes of geometries that were not written keep no geometry
+	if node.get('geometry_index', 4294967295) != 4294967295:
+		node['geometry_index'] = remap.get(node['geometry_index'], 4294967295)
+	for child in node.get('children', []):
+		_RemapGeometryIndices(child, remap)
+
+def _FindGeometryNode(node, geometry_index):
+	if node.get('geometry_index') == geometry_index:
+		return node
+	for child in node.get('children', []):
+		found = _FindGeometryNode(child, geometry_index)
+		if found is not None:
+			return found
+	return None
+
 def ExportNif(options, context, operator, head_object_mode = 'None'):
 	nif_armature.LoadAllSkeletonLookup()
 	original_selected = utils_blender.GetSelectedObjs(True)
@@ -377,7 +400,15 @@ def ExportNif(options, context, operator, head_object_mode = 'None'):
 
 	_data['geometries'] = []
 
-	for mesh_obj in geometries:
+	mesh_export_jobs = []
+	mesh_export_owners = []
+	# Geometries by template index, indices into _data["geometries"] are only given out once the meshes are written
+	template_geometries = {}
+	partition_geometries = []
+	# Materials and skeletons first, the meshes are then gathered in one batch
+	prepared_geometries = []
+
+	for geometry_index, mesh_obj in enumerate(geometries):
 		if mesh_obj.data == None:
 			operator.report({'WARNING'}, f'Object {mesh_obj.name} has no mesh. Skipping...')
 			continue
@@ -443,22 +474,6 @@ def ExportNif(options, context, operator, head_object_mode = 'None'):
 						physics_armature_attached = True
 			#bone_list_filter = list(set(bone_list_filter) | set(cloth_bones))
 
-		if hash_filepath:
-			mesh_folder, mesh_name = utils.hash_string(mesh_obj.name)
-			factory_name = mesh_folder + '\\' + mesh_name
-		else:
-			mesh_folder = utils.sanitize_filename(mesh_obj.name)
-			if mesh_obj.data.name.endswith('.mesh'):
-				mesh_name = utils.sanitize_filename(mesh_obj.data.name[:-5])
-			else:
-				mesh_name = utils.sanitize_filename(mesh_obj.data.name)
-			factory_name = mesh_folder + '\\' + mesh_name + ".mesh"
-
-		result_file_folder = os.path.join(export_folder, 'geometries', mesh_folder)
-		if not options.use_internal_geom_data:
-			os.makedirs(result_file_folder, exist_ok = True)
-		result_file_path = os.path.join(result_file_folder, mesh_name + ".mesh")
-
 		if mode == "SINGLE_MESH":
 			utils_blender.SetSelectObjects(original_selected)
 			utils_blender.SetActiveObject(mesh_obj)
@@ -466,76 +481,171 @@ def ExportNif(options, context, operator, head_object_mode = 'None'):
 			utils_blender.SetSelectObjects([])
 			utils_blender.SetActiveObject(mesh_obj)
 
-		geom_data = None
-		if options.use_internal_geom_data:
-			rtn, message, geom_data, matrices = MeshIO.MeshToJson(mesh_obj, options, bone_list_filter, True, head_object_mode, ref_objects=ref_objs)
-			if 'FINISHED' not in rtn:
-				operator.report({'WARNING'}, f'Failed exporting {mesh_obj.name}. Message: {message}. Skipping...')
-				continue
-			verts_count = geom_data['num_verts']
-			indices_count = geom_data['num_indices']
-			bone_list = geom_data['vertex_group_names']
-			_matrices_cache.append(matrices)
-		else:
-			rtn, verts_count, indices_count, bone_list = MeshIO.ExportMesh(options, context, result_file_path, operator, bone_list_filter, True, head_object_mode, ref_objects=ref_objs)
-			if 'FINISHED' not in rtn:
-				operator.report({'WARNING'}, f'Failed exporting {mesh_obj.name}. Skipping...')
-				continue
-
-		print("Bone list: ", bone_list)
-
-		has_skinned_geometry = True
-		
-		if options.export_morph:
-			if mode == "SINGLE_MESH":
-				result_morph_folder = os.path.join(export_folder, 'meshes', 'morphs', mesh_folder, mesh_name)
-				os.makedirs(result_morph_folder, exist_ok = True)
-				result_morph_path = os.path.join(result_morph_folder, "morph.dat")
+		prepared_geometries.append((geometry_index, mesh_obj, mesh_data, skeleton_info, bone_list_filter))
+
+	gather_results = MeshIO.MeshesToJsonPartitioned(
+		[mesh_obj for _, mesh_obj, _, _, _ in prepared_geometries],
+		options,
+		[bone_list_filter for _, _, _, _, bone_list_filter in prepared_geometries],
+		True,
+		head_object_mode,
+		ref_objects=ref_objs,
+		auto_partition=options.auto_partition,
+		# The morph export below then reuses the cached primitive
+		gather_morphs=options.export_morph and mode == "SINGLE_MESH"
+	)
+
+	for (geometry_index, mesh_obj, mesh_data, skeleton_info, bone_list_filter), (rtn, message, mesh_numpy_datas, matrices_list) in zip(prepared_geometries, gather_results):
+		if 'FINISHED' not in rtn:
+			operator.report({'WARNING'}, f'Failed exporting {mesh_obj.name}. Message: {message}. Skipping...')
+			continue
 
-				utils_blender.SetSelectObjects(original_selected)
-				utils_blender.SetActiveObject(mesh_obj)
+		num_partitions = len(mesh_numpy_datas)
+		if num_partitions > 1:
+			operator.report({'INFO'}, f'{mesh_obj.name} exceeds the vertex limit and was split into {num_partitions} geometries.')
+
+		base_mesh_data = mesh_data
+		for part_index, (mesh_numpy_data, matrices) in enumerate(zip(mesh_numpy_datas, matrices_list)):
+			# Partitions after the first become extra geometries next to the object's own
+			mesh_data = base_mesh_data if part_index == 0 else {**base_mesh_data, 'geo_mesh_lod': []}
+			mesh_lod_info = {}
+			part_suffix = f'_part{part_index}' if part_index > 0 else ''
+
+			if num_partitions > 1:
+				positions = matrices['positions_raw']
+				mins, maxs = positions.min(axis=0), positions.max(axis=0)
+				mesh_data["geo_bounding_center"] = ((maxs + mins) * 0.5).tolist()
+				mesh_data["geo_bounding_expand"] = ((maxs - mins) * 0.5).tolist()
+
+			if hash_filepath:
+				mesh_folder, mesh_name = utils.hash_string(mesh_obj.name + part_suffix)
+				factory_name = mesh_folder + '\\' + mesh_name
+			else:
+				mesh_folder = utils.sanitize_filename(mesh_obj.name)
+				if mesh_obj.data.name.endswith('.mesh'):
+					mesh_name = utils.sanitize_filename(mesh_obj.data.name[:-5])
+				else:
+					mesh_name = utils.sanitize_filename(mesh_obj.data.name)
+				mesh_name += part_suffix
+				factory_name = mesh_folder + '\\' + mesh_name + ".mesh"
+
+			result_file_folder = os.path.join(export_folder, 'geometries', mesh_folder)
+			if not options.use_internal_geom_data:
+				os.makedirs(result_file_folder, exist_ok = True)
+			result_file_path = os.path.join(result_file_folder, mesh_name + ".mesh")
+
+			geom_data = None
+			if options.use_internal_geom_data:
+				geom_data = mesh_numpy_data
+				_matrices_cache.append(matrices)
+			else:
+				# Serialized after the loop so all geometries can be written in parallel
+				mesh_export_jobs.append(({**mesh_numpy_data, **matrices}, result_file_path))
+				mesh_export_owners.append((mesh_obj.name + part_suffix, mesh_data))
+			verts_count = mesh_numpy_data['num_verts']
+			indices_count = mesh_numpy_data['num_indices']
+			bone_list = mesh_numpy_data['vertex_group_names']
 
-				morph_success, num_vertices_in_morph = MorphIO.ExportMorph_alt(options, context, result_morph_path, operator)
+			print("Bone list: ", bone_list)
 
-				if 'FINISHED' in morph_success:
-					if verts_count != num_vertices_in_morph:
-						operator.report({'WARNING'}, f"Number of vertices in morph doesn't match with the base mesh for {mesh_obj.name}. Please report to the author.")
+			has_skinned_geometry = True
+			
+			if options.export_morph and part_index == 0:
+				if num_partitions > 1:
+					operator.report({'WARNING'}, f'Morph export for split geometries is not supported! Skipping morphs of {mesh_obj.name}.')
+				elif mode == "SINGLE_MESH":
+					result_morph_folder = os.path.join(export_folder, 'meshes', 'morphs', mesh_folder, mesh_name)
+					os.makedirs(result_morph_folder, exist_ok = True)
+					result_morph_path = os.path.join(result_morph_folder, "morph.dat")
+
+					utils_blender.SetSelectObjects(original_selected)
+					utils_blender.SetActiveObject(mesh_obj)
+
+					morph_success, num_vertices_in_morph = MorphIO.ExportMorph_alt(options, context, result_morph_path, operator)
+
+					if 'FINISHED' in morph_success:
+						if verts_count != num_vertices_in_morph:
+							operator.report({'WARNING'}, f"Number of vertices in morph doesn't match with the base mesh for {mesh_obj.name}. Please report to the author.")
+						else:
+							operator.report({'INFO'}, f"Morph export for {mesh_obj.name} successful.")
 					else:
-						operator.report({'INFO'}, f"Morph export for {mesh_obj.name} successful.")
+						operator.report({'WARNING'}, f"Morph export for {mesh_obj.name} failed.")
 				else:
-					operator.report({'WARNING'}, f"Morph export for {mesh_obj.name} failed.")
-			else:
-				operator.report({'WARNING'}, f'Morph export for multiple geometries in one nif is not supported!')
+					operator.report({'WARNING'}, f'Morph export for multiple geometries in one nif is not supported!')
 
-		mesh_data['use_internal_geom_data'] = 1 if options.use_internal_geom_data else 0
-		mesh_data['scale_factor'] = 1
-		mesh_lod_info['mesh_data'] = geom_data
-		mesh_lod_info['factory_path'] = factory_name
-		mesh_lod_info['num_indices'] = indices_count
-		mesh_lod_info['num_vertices'] = verts_count
+			mesh_data['use_internal_geom_data'] = 1 if options.use_internal_geom_data else 0
+			mesh_data['scale_factor'] = 1
+			mesh_lod_info['mesh_data'] = geom_data
+			mesh_lod_info['factory_path'] = factory_name
+			mesh_lod_info['num_indices'] = indices_count
+			mesh_lod_info['num_vertices'] = verts_count
 
-		mesh_data['geo_mesh_lod'].append(mesh_lod_info)
+			mesh_data['geo_mesh_lod'].append(mesh_lod_info)
 
-		if bone_list != None and len(bone_list) > 0 and skeleton_info != None:
-			mesh_data['has_skin'] = 1
-			mesh_data['bone_names'] = utils_blender.RevertRenamingBoneList(bone_list)
-			mesh_data['bone_infos'] = []
+			if bone_list != None and len(bone_list) > 0 and skeleton_info != None:
+				mesh_data['has_skin'] = 1
+				mesh_data['bone_names'] = utils_blender.RevertRenamingBoneList(bone_list)
+				mesh_data['bone_infos'] = []
 
-			#pivot = mathutils.Matrix.Identity(4)
-			#for j in range(3):
-			#	pivot[j][3] = mesh_obj.matrix_local[j][3]
-
-			for bone_name in bone_list:
-				bone_info = {}
-				B_inv = skeleton_info[bone_name]['matrix'].inverted()
+				#pivot = mathutils.Matrix.Identity(4)
+				#for j in range(3):
+				#	pivot[j][3] = mesh_obj.matrix_local[j][3]
 
-				V = B_inv @ mesh_obj.matrix_local # Or 'matrix_world' idk
+				for bone_name in bone_list:
+					bone_info = {}
+					B_inv = skeleton_info[bone_name]['matrix'].inverted()
 
-				bone_info['matrix'] = [[V[i][j] for j in range(4)]for i in range(4)]
-				bone_info['scale'] = 1 / skeleton_info[bone_name]['scale']
-				mesh_data['bone_infos'].append(bone_info)
+					V = B_inv @ mesh_obj.matrix_local # Or 'matrix_world' idk
 
+					bone_info['matrix'] = [[V[i][j] for j in range(4)]for i in range(4)]
+					bone_info['scale'] = 1 / skeleton_info[bone_name]['scale']
+					mesh_data['bone_infos'].append(bone_info)
 
+			if part_index == 0:
+				template_geometries[geometry_index] = mesh_data
+			else:
+				partition_geometries.append((geometry_index, mesh_obj.name + part_suffix, mesh_data))
+
+	failed_geometries = set()
+	if len(mesh_export_jobs) > 0:
+		time_start = time.time()
+		returncodes = MeshConverter.ExportMeshesBatch(mesh_export_jobs)
+		for (mesh_obj_name, mesh_data), (job_data, job_path), returncode in zip(mesh_export_owners, mesh_export_jobs, returncodes):
+			if not returncode:
+				operator.report({'WARNING'}, f'Failed exporting {mesh_obj_name}. Message: {returncode.what()}. Skipping...')
+				failed_geometries.add(id(mesh_data))
+			elif len(job_data['lods']) > 0 and job_data['meshlets'] is None:
+				# MeshConverter.dll writes no LODs, they are patched into the file afterwards
+				MeshCodec.write_lods(job_path, job_data['lods'])
+		print(f"Serialized {len(mesh_export_jobs)} meshes in {time.time() - time_start} seconds")
+		del mesh_export_jobs
+
+	# Nodes still carry template indices here, the parents of partitions are looked up before they are remapped
+	partition_nodes = [(_FindGeometryNode(_data, geometry_index), name, mesh_data) for geometry_index, name, mesh_data in partition_geometries]
+
+	# Written geometries in template order, nodes then point at their new positions
+	remap = {}
+	for geometry_index, mesh_data in sorted(template_geometries.items()):
+		if id(mesh_data) not in failed_geometries:
+			remap[geometry_index] = len(_data["geometries"])
+			_data["geometries"].append(mesh_data)
+	_RemapGeometryIndices(_data, remap)
+
+	# Partitions come last, each one hangs under its object's node
+	for node, name, mesh_data in partition_nodes:
+		if id(mesh_data) in failed_geometries:
+			continue
+		if node is None:
+			operator.report({'WARNING'}, f'No node found for {name}. Skipping...')
+			continue
+		node['children'].append({
+			'name': name,
+			'matrix': [[1 if i == j else 0 for i in range(4)] for j in range(4)],
+			'scale': 1,
+			'sgo_keep': 0,
+			'geometry_index': len(_data["geometries"]),
+			'children': [],
+		})
 		_data["geometries"].append(mesh_data)
 
 	_data['skeleton_mode'] = False
@@ -583,7 +693,12 @@ def ExportNif(options, context, operator, head_object_mode = 'None'):
 		additive_nif_path = os.path.join(export_folder, nif_name + '_additive.nif')
 		returncode = MeshConverter.EditNifBSGeometries(nif_filepath, json_data, additive_nif_path, export_folder, options.overwrite_material_paths)
 	else:
-		returncode = MeshConverter.CreateNifFromJson(json_data, nif_filepath, export_folder)
+		converter_pool = utils_blender.get_converter_pool()
+		if converter_pool is not None:
+			arrays = [arr for matrices in _matrices_cache for arr in matrices.values() if arr is not None]
+			returncode = converter_pool.create_nif(_data, nif_filepath, export_folder, arrays).result()
+		else:
+			returncode = MeshConverter.CreateNifFromJson(json_data, nif_filepath, export_folder)
 
 	if not returncode:
 		operator.report({'INFO'}, f"Execution failed with error message: \"{returncode.what()}\". Contact the author for assistance.")
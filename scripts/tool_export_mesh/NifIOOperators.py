@@ -338,10 +338,20 @@ class ImportCustomNif(bpy.types.Operator, ImportHelper):
 						if txt_file_path.endswith('.nif') and os.path.exists(txt_file_path):
 							files.append(txt_file_path)
 
+		# With worker processes every file is parsed in parallel up front, only the object creation stays on this thread
+		prefetched = {}
+		converter_pool = utils_blender.get_converter_pool()
+		if converter_pool is not None:
+			readable_path = os.path.join(utils.export_mesh_folder_path, 'havok_debug.txt')
+			for current_file in files:
+				if current_file.endswith('.nif') and current_file not in prefetched:
+					prefetched[current_file] = converter_pool.import_nif(current_file, utils_blender.is_plugin_debug_mode(), readable_path)
+
 		skeleton_obj_dict = {}
 		for current_file in files:
 			filepath = current_file
-			rtn, skel, objs = NifIO.ImportNif(filepath, self, context, self)
+			nif_data = prefetched[current_file].result() if current_file in prefetched else None
+			rtn, skel, objs = NifIO.ImportNif(filepath, self, context, self, nif_data)
 			if 'CANCELLED' in rtn:
 				self.report({'WARNING'}, f'{os.path.basename(current_file)} failed to import.')
 			elif skel != None and objs != None and len(objs) > 0:
@@ -470,6 +480,24 @@ class ExportCustomNif(bpy.types.Operator):
 		default=True,
 	)
 
+	auto_partition: bpy.props.BoolProperty(
+		name="Split Oversized Meshes",
+		description="Split meshes with more vertices than a .mesh can hold into several geometries instead of failing.",
+		default=False,
+	)
+
+	lod_ratios: bpy.props.StringProperty(
+		name="Generate LODs",
+		description="Comma separated triangle ratios of LODs to generate into the .mesh, e.g. 0.5, 0.25, 0.1. Empty writes no LODs, needs external .mesh files.",
+		default="",
+	)
+
+	gather_meshlets: bpy.props.BoolProperty(
+		name="Build Meshlets",
+		description="Build the meshlets and their culling data in python and write the .mesh without MeshConverter.dll, needs external .mesh files.",
+		default=False,
+	)
+
 	is_head_object: bpy.props.EnumProperty(
 		name="Export Head Object",
 		description="If the model is a head model with facebones, nif export will export <model_name>.nif and <model_name>_facebones.nif.",	
@@ -515,6 +543,9 @@ class ExportCustomNif(bpy.types.Operator):
 		layout.separator()
 		layout.label(text="Special Controls:") 
 		layout.prop(self, "use_internal_geom_data")
+		layout.prop(self, "auto_partition")
+		layout.prop(self, "lod_ratios")
+		layout.prop(self, "gather_meshlets")
 		layout.prop(self, "is_head_object")
 		layout.prop(self, "export_sf_mesh_hash_result")
 
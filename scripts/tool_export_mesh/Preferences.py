@@ -2,6 +2,7 @@ import bpy
 import os
 import shutil
 import utils_blender as utils_blender
+import ConverterWorkers
 import functools
 import version
 
@@ -90,6 +91,34 @@ class SGBPreferences(bpy.types.AddonPreferences):
         description="Path to texconv.exe"
     )
 
+    use_converter_workers: bpy.props.BoolProperty(
+        name="Use Worker Processes",
+        default=False,
+        description="Run nif import and export in separate processes, a crash in the converter will not close Blender"
+    )
+
+    converter_worker_count: bpy.props.IntProperty(
+        name="Worker Count",
+        default=2,
+        min=1,
+        max=16,
+        description="Number of converter worker processes"
+    )
+
+    morph_chunk_size: bpy.props.IntProperty(
+        name="Shape Keys Per Chunk",
+        default=0,
+        min=0,
+        max=128,
+        description="Gather and write morphs this many shape keys at a time to bound memory use, 0 gathers all shape keys at once"
+    )
+
+    quantize_morphs: bpy.props.BoolProperty(
+        name="Quantized Morph Storage",
+        default=False,
+        description="Keep gathered morphs as the half float and DEC3N records the .morph.dat stores instead of float arrays. Not used when snapping"
+    )
+
     scipy_installed: bpy.props.BoolProperty(
         name="Scipy",
         default=False,
@@ -136,6 +165,16 @@ class SGBPreferences(bpy.types.AddonPreferences):
         row.operator("object.install_modules_sgb")
         row.enabled = not all([self.scipy_installed])
 
+        sublayout = layout.column(heading="Converter Workers")
+        sublayout.prop(self, "use_converter_workers")
+        row = sublayout.row()
+        row.enabled = self.use_converter_workers
+        row.prop(self, "converter_worker_count")
+
+        sublayout = layout.column(heading="Morph Export")
+        sublayout.prop(self, "morph_chunk_size")
+        sublayout.prop(self, "quantize_morphs")
+
         sublayout = layout.column(heading="Debug Mode")
         sublayout.enabled = True
         sublayout.prop(context.scene, "sgb_debug_mode", toggle=True)
@@ -148,6 +187,7 @@ def register():
     bpy.utils.register_class(InstallModulesOperator)
 
 def unregister():
+    ConverterWorkers.ShutdownPool()
     bpy.utils.unregister_class(SGBPreferences)
     bpy.utils.unregister_class(ChooseFileForPreferencesOperator)
     bpy.utils.unregister_class(InstallModulesOperator)
\ No newline at end of file
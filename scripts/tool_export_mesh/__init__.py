@@ -9,15 +9,16 @@ if dir not in sys.path:
 import utils_common as utils
 
 # Modules
-import PhysicsPanel
-import MaterialPanel
-import ImportSkeleOp
-import Preferences
-import BoneRegionsPanel
-import MorphPanel
-import NifIOOperators
-import MorphIOOperators
-import MeshIOOperators
+with utils.import_timer(dir):
+	import PhysicsPanel
+	import MaterialPanel
+	import ImportSkeleOp
+	import Preferences
+	import BoneRegionsPanel
+	import MorphPanel
+	import NifIOOperators
+	import MorphIOOperators
+	import MeshIOOperators
 
 bl_info = {
 	"name": "Starfield Geometry Bridge",
@@ -55,7 +55,7 @@ def RegisterSkeleton(skeleton_name:str, skeleton_data:dict, overwrite = False):
 		return False
 	
 	with open(os.path.join(utils_blender.PluginAssetsFolderPath(), skeleton_name + '.json'), 'w') as file:
-		file.write(json.dumps(skeleton_data))
+		file.write(json.dumps(skeleton_data, default=utils.json_array_default))
 
 	if skeleton_name not in skeleton_names:
 		skeleton_names.append(skeleton_name)
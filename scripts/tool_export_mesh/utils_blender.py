@@ -720,6 +720,21 @@ def BoxFromCenterExpand(name: str, center: list, expand: list):
 
 	return BoxFromMinMax(name, min_position, max_position)
 
+def BoxesFromCenterExpand(name: str, centers: np.ndarray, expands: np.ndarray):
+	'''
+	One object holding a box for every (center, expand) row, instead of one object per box.
+	'''
+	mesh = bpy.data.meshes.new(name)
+	obj = bpy.data.objects.new(name, mesh)
+	bpy.context.collection.objects.link(obj)
+	# Same corner and face order as BoxFromMinMax(), corner i takes max on x, y, z for bits 2, 1, 0 of i
+	signs = np.array([[(i >> 2) & 1, (i >> 1) & 1, i & 1] for i in range(8)], dtype=np.float32) * 2 - 1
+	verts = (np.asarray(centers)[:, np.newaxis] + np.asarray(expands)[:, np.newaxis] * signs).reshape(-1, 3)
+	box_faces = np.array([[0,1,3,2], [4,5,7,6], [0,1,5,4], [2,3,7,6], [0,2,6,4], [1,3,7,5]])
+	faces = (box_faces[np.newaxis] + 8 * np.arange(len(centers))[:, np.newaxis, np.newaxis]).reshape(-1, 4)
+	mesh.from_pydata(verts.tolist(), [], faces.tolist())
+	return obj
+
 def SphereFromCenterRadius(name: str, center: list, radius):
 	obj = BoxFromCenterExpand(name, center, [radius, radius, radius])
 	obj.display_type = 'BOUNDS'
@@ -838,9 +853,10 @@ def BuildhkBufferedMesh(mesh: dict, hkaSkeleton_obj: bpy.types.Object):
 		mesh_obj.matrix_world = T
 		mesh_objs.append(mesh_obj)
 	elif mesh_type == 0:
-		positions = mesh['positions']
-		normals = mesh['normals']
-		triangles = mesh['triangleIndices']
+		# Arrays when the nif came through the binary scene channel
+		positions = np.asarray(mesh['positions']).tolist()
+		normals = np.asarray(mesh['normals']).tolist()
+		triangles = np.asarray(mesh['triangleIndices']).tolist()
 		boneWeights = utils.TransformWeightData(mesh['boneWeights'], do_normalize=True)
 		bl_mesh = bpy.data.meshes.new(name = name)
 		bl_mesh.from_pydata(positions, [], triangles)
@@ -1164,6 +1180,14 @@ def TransferWeightByDistance(target_obj: bpy.types.Object, reference_obj: bpy.ty
 def get_preferences():
     return bpy.context.preferences.addons["tool_export_mesh"].preferences
 
+def get_converter_pool():
+	# None when the user keeps the converter in process
+	prefs = get_preferences()
+	if not prefs.use_converter_workers:
+		return None
+	import ConverterWorkers
+	return ConverterWorkers.GetPool(prefs.converter_worker_count)
+
 def get_preference(prop:str):
 	return get_preferences().get(prop)
 
@@ -4,6 +4,9 @@ import hashlib
 import datetime
 import shutil
 import re
+import sys
+import builtins
+from contextlib import contextmanager
 from functools import wraps
 from time import time
 
@@ -73,6 +76,37 @@ def timer(f):
 		return result
 	return wrap
 
+module_import_times = {}
+
+@contextmanager
+def import_timer(module_folder, report = True):
+	# Records how long each module living in module_folder takes to import, nested imports are included in the parent's time
+	module_folder = os.path.realpath(module_folder)
+	original_import = builtins.__import__
+
+	def _timed_import(name, globals = None, locals = None, fromlist = (), level = 0):
+		if level != 0 or name in sys.modules:
+			return original_import(name, globals, locals, fromlist, level)
+		ts = time()
+		try:
+			return original_import(name, globals, locals, fromlist, level)
+		finally:
+			te = time()
+			module_file = getattr(sys.modules.get(name), '__file__', None)
+			if module_file and os.path.dirname(os.path.realpath(module_file)) == module_folder:
+				module_import_times[name] = te - ts
+
+	builtins.__import__ = _timed_import
+	ts = time()
+	try:
+		yield module_import_times
+	finally:
+		builtins.__import__ = original_import
+		if report:
+			print(f'Imported {len(module_import_times)} modules in {time() - ts:.4f} secs')
+			for name, t in sorted(module_import_times.items(), key = lambda x: x[1], reverse = True):
+				print(f'	import {name} took: {t:.4f} secs')
+
 default_assets_folder = 'YOUR_LOOSE_DATA_FOLDER'
 export_mesh_folder_path = None
 assets_folder = None
@@ -306,12 +340,19 @@ def TransformWeightData(weight_data: list[list[list]], do_normalize = False) ->
 			total_weight = sum([entry[1] for entry in weight_data[index]])
 			weight_data[index] = [[entry[0], entry[1] / total_weight] for entry in weight_data[index] if entry[1] > 0]
 		for entry in weight_data[index]:
-			if entry[0] not in output:
-				output[entry[0]] = []
-			output[entry[0]].append([index, entry[1]])
+			bone_index = int(entry[0])
+			if bone_index not in output:
+				output[bone_index] = []
+			output[bone_index].append([index, entry[1]])
 		
 	return output
 
+def json_array_default(obj):
+	# json.dumps fallback for data decoded from the binary nif channel, which holds numpy arrays
+	if hasattr(obj, 'tolist'):
+		return obj.tolist()
+	raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
 def RandomHexHashStr(seed:int = 0, hex_len:int = 8, upper_case = True) -> tuple[str, int]:
 	# Get a random number base-10 from the seed
 	random.seed(seed)
@@ -145,6 +145,84 @@ def batch_rotation_matrices(vec1_stack:np.ndarray, vec2_stack:np.ndarray):
     R[mask] += masked_kmat + dot_kmat * multiplier
     return R
 
+_ROTATE_BLOCK_ROWS = 1 << 16
+# Below this 1 + c the float32 terms cancel, those rows are evaluated in float64
+_PRECISE_EPSILON = 1e-2
+_ANTIPARALLEL_EPSILON = 1e-6
+
+def _rodrigues(a:np.ndarray, b:np.ndarray, t:np.ndarray, dtype) -> tuple[np.ndarray, np.ndarray]:
+	# R t = t + k x t + (k (k.t) - t |k|^2) / (1 + c), k = a x b, c = a.b. Returns (R t, 1 + c)
+	a, b, t = (np.asarray(v, dtype=dtype) for v in (a, b, t))
+	k = np.cross(a, b)
+	denominator = 1 + np.einsum('ij,ij->i', a, b)
+	kt = np.einsum('ij,ij->i', k, t)
+	kk = np.einsum('ij,ij->i', k, k)
+	scale = np.divide(1, denominator, out=np.zeros_like(denominator), where=denominator > _ANTIPARALLEL_EPSILON)
+
+	rotated = np.cross(k, t)
+	rotated += t
+	rotated += (k * kt[:, np.newaxis] - t * kk[:, np.newaxis]) * scale[:, np.newaxis]
+	return rotated, denominator
+
+def rotate_tangents(normals_before:np.ndarray, normals_after:np.ndarray, tangents:np.ndarray, out:np.ndarray | None = None) -> np.ndarray:
+	"""
+	Rotates every tangent by the rotation taking normals_before to normals_after, same result as applying
+	batch_rotation_matrices() but evaluated as a Rodrigues formula in float32, without building the matrices.
+	Nearly antiparallel normals are evaluated in float64, antiparallel ones turn the tangent half way around
+	the tangent's own in-plane direction, zero normals leave it untouched. Results keep the tangent's length.
+
+	:param normals_before: (N, 3) unit normals.
+	:param normals_after: (N, 3) unit normals.
+	:param tangents: (N, 3) tangents to rotate.
+	:param out: (N, 3) float32 buffer for the result, may be tangents itself. Allocated if None.
+	:return: out
+	"""
+	assert normals_before.shape == normals_after.shape == tangents.shape, "Input stacks must have the same shape."
+	if out is None:
+		out = np.empty(tangents.shape, dtype=np.float32)
+
+	# Row blocks keep the (N, 3) temporaries small
+	for start in range(0, len(tangents), _ROTATE_BLOCK_ROWS):
+		block = slice(start, start + _ROTATE_BLOCK_ROWS)
+		a = np.asarray(normals_before[block], dtype=np.float32)
+		b = np.asarray(normals_after[block], dtype=np.float32)
+		t = np.array(tangents[block], dtype=np.float32)
+
+		rotated, denominator = _rodrigues(a, b, t, np.float32)
+
+		precise = denominator < _PRECISE_EPSILON
+		if np.any(precise):
+			# Unit length errors of the normals are divided by 1 + c as well, they are normalized in float64 first
+			a_precise = a[precise].astype(np.float64)
+			b_precise = b[precise].astype(np.float64)
+			NormalizeRows(a_precise)
+			NormalizeRows(b_precise)
+			rotated_precise, denominator_precise = _rodrigues(a_precise, b_precise, t[precise], np.float64)
+			rotated[precise] = rotated_precise
+			antiparallel = np.flatnonzero(precise)[denominator_precise <= _ANTIPARALLEL_EPSILON]
+			if len(antiparallel) > 0:
+				rotated[antiparallel] = _half_turn(a[antiparallel], t[antiparallel])
+
+		# A rotation keeps lengths, rescaling removes what rounding added
+		lengths = np.linalg.norm(rotated, axis=1)
+		np.divide(np.linalg.norm(t, axis=1), lengths, out=lengths, where=lengths > 0)
+		rotated *= lengths[:, np.newaxis]
+
+		out[block] = rotated
+	return out
+
+def _half_turn(normals:np.ndarray, tangents:np.ndarray) -> np.ndarray:
+	# Half turn around the tangent projected off the normal, an in-plane tangent keeps its direction
+	axis = tangents - normals * np.einsum('ij,ij->i', normals, tangents)[:, np.newaxis]
+	norms = np.linalg.norm(axis, axis=1)
+	degenerate = norms < _ANTIPARALLEL_EPSILON
+	if np.any(degenerate):
+		# Tangent along the normal, any axis perpendicular to the normal does
+		fallback = np.eye(3, dtype=np.float32)[np.argmin(np.abs(normals[degenerate]), axis=1)]
+		axis[degenerate] = np.cross(normals[degenerate], fallback)
+	NormalizeRows(axis)
+	return 2 * axis * np.einsum('ij,ij->i', axis, tangents)[:, np.newaxis] - tangents
+
 def apply_mat_to_all(matrix:mathutils.Matrix, vectors:np.ndarray) -> np.ndarray:
 	"""Given matrix m and vectors [v1,v2,...], computes [m@v1,m@v2,...]"""
 	# Linear part
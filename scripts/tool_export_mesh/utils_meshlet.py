@@ -0,0 +1,315 @@
+'''
+Meshlets and their culling volumes, the Python counterpart of MeshIO::GenerateMeshlets().
+
+build_meshlets() grows one meshlet at a time: it takes the candidate triangle that brings the fewest new vertices,
+nearest the meshlet's centroid on ties, until the next triangle would break the vertex or primitive limit.
+Candidates are the triangles touching a vertex already in the meshlet. Once none are left, the next triangle
+comes from a Morton order of the triangle centroids, so new and disconnected meshlets still start close by.
+meshlet_records() and cull_data() give the 4 x uint32 meshlet records and the BSCullData center/expand boxes
+the .mesh stores. bounding_spheres() and normal_cones() give the sphere and backface cone of every meshlet,
+the format keeps neither, meshlet_report() uses them to tell how much cone culling would save.
+'''
+import numpy as np
+
+# DirectXMesh limits MeshIO::GenerateMeshlets() builds with
+MAX_VERTICES = 96
+MAX_PRIMITIVES = 128
+# Cones wider than this (dot of the axis with the farthest normal) cull nothing worth the test
+_MIN_CONE_SPREAD = 0.1
+_SPHERE_ITERATIONS = 8
+
+def _vertex_triangles(triangles:np.ndarray, num_vertices:int) -> tuple[np.ndarray, np.ndarray]:
+    # CSR of the triangles around every vertex
+    corners = triangles.ravel()
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corners, minlength=num_vertices), out=indptr[1:])
+    return indptr, np.argsort(corners, kind='stable') // 3
+
+def _spread_bits(values:np.ndarray) -> np.ndarray:
+    # 10 bit integers -> every bit moved to every third position
+    values = values.astype(np.uint64) & 0x3ff
+    values = (values | values << 16) & 0x030000ff
+    values = (values | values << 8) & 0x0300f00f
+    values = (values | values << 4) & 0x030c30c3
+    values = (values | values << 2) & 0x09249249
+    return values
+
+def morton_order(points:np.ndarray) -> np.ndarray:
+    '''
+    (N, 3) points -> permutation sorting them along a Z order curve over their bounding box.
+    '''
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    low, high = points.min(axis=0), points.max(axis=0)
+    extent = np.where(high > low, high - low, 1)
+    cells = ((points - low) / extent * 1023).astype(np.int64)
+    codes = _spread_bits(cells[:, 0]) << 2 | _spread_bits(cells[:, 1]) << 1 | _spread_bits(cells[:, 2])
+    return np.argsort(codes, kind='stable')
+
+def build_meshlets(triangles:np.ndarray, positions:np.ndarray, max_vertices:int = MAX_VERTICES, max_primitives:int = MAX_PRIMITIVES) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    (T, 3) triangles and (V, 3) positions -> (triangle order, (M,) triangle count of every meshlet).
+    Meshlets are consecutive runs of the order, each references at most max_vertices distinct vertices.
+    '''
+    if max_vertices < 3 or max_primitives < 1:
+        raise ValueError("build_meshlets() needs room for at least one triangle per meshlet")
+    num_triangles = len(triangles)
+    if num_triangles == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    num_vertices = len(positions)
+    indptr, adjacency = _vertex_triangles(triangles, num_vertices)
+    centroids_array = np.asarray(positions, dtype=np.float64)[triangles].mean(axis=1)
+    seeds = morton_order(centroids_array).tolist()
+    indptr, adjacency = indptr.tolist(), adjacency.tolist()
+    corners = triangles.tolist()
+    centroids = centroids_array.tolist()
+
+    emitted = [False] * num_triangles
+    # Corners of every triangle not yet in the current meshlet, candidates sit in the bucket of their count
+    missing = [3] * num_triangles
+    holder = [-1] * num_vertices
+    buckets = [[], [], []]
+    touched = []
+    order = []
+    counts = []
+
+    meshlet = vertex_count = primitive_count = 0
+    center_sum = [0.0, 0.0, 0.0]
+    cursor = 0
+
+    def next_seed():
+        nonlocal cursor
+        while emitted[seeds[cursor]]:
+            cursor += 1
+        return seeds[cursor]
+
+    def nearest(candidates, center):
+        cx, cy, cz = center
+        best, best_distance = -1, float('inf')
+        for t in candidates:
+            x, y, z = centroids[t]
+            distance = (x - cx) * (x - cx) + (y - cy) * (y - cy) + (z - cz) * (z - cz)
+            if distance < best_distance:
+                best, best_distance = t, distance
+        return best
+
+    while len(order) < num_triangles:
+        best = -1
+        center = [c / max(primitive_count, 1) for c in center_sum]
+        if primitive_count < max_primitives:
+            for new_vertices, bucket in enumerate(buckets):
+                live = [t for t in bucket if not emitted[t] and missing[t] == new_vertices]
+                buckets[new_vertices] = live
+                if live and vertex_count + new_vertices <= max_vertices:
+                    best = nearest(live, center)
+                    break
+            if best < 0 and vertex_count + 3 <= max_vertices:
+                # Nothing touching the meshlet fits, carry on with the next triangle along the curve
+                best = next_seed()
+
+        if best < 0:
+            # Meshlet is full, the next one starts from its leftover candidate nearest its centroid
+            leftovers = [t for bucket in buckets for t in bucket if not emitted[t]]
+            best = nearest(leftovers, center) if leftovers else next_seed()
+            counts.append(primitive_count)
+            for t in touched:
+                missing[t] = 3
+            touched, buckets = [], [[], [], []]
+            meshlet += 1
+            vertex_count = primitive_count = 0
+            center_sum = [0.0, 0.0, 0.0]
+
+        emitted[best] = True
+        order.append(best)
+        primitive_count += 1
+        for i in range(3):
+            center_sum[i] += centroids[best][i]
+        for v in corners[best]:
+            if holder[v] == meshlet:
+                continue
+            holder[v] = meshlet
+            vertex_count += 1
+            for t in adjacency[indptr[v]:indptr[v + 1]]:
+                if emitted[t]:
+                    continue
+                if missing[t] == 3:
+                    touched.append(t)
+                missing[t] -= 1
+                if missing[t] < 3:
+                    buckets[missing[t]].append(t)
+
+    counts.append(primitive_count)
+    return np.array(order, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+def _meshlet_ids(primitive_counts:np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(primitive_counts)), primitive_counts)
+
+def meshlet_vertices(triangles:np.ndarray, primitive_counts:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    (T, 3) triangles in meshlet order -> (unique vertex indices of all meshlets back to back in order of first use,
+    (T, 3) uint8 primitive indices into their meshlet's vertices), the uniqueVertexIB and primitiveIndices of DirectXMesh.
+    '''
+    num_vertices = int(triangles.max()) + 1 if len(triangles) else 0
+    corners = triangles.ravel().astype(np.int64)
+    keys = np.repeat(_meshlet_ids(primitive_counts), 3) * num_vertices + corners
+    unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    by_first_use = np.argsort(first, kind='stable')
+    rank = np.empty(len(unique_keys), dtype=np.int64)
+    rank[by_first_use] = np.arange(len(unique_keys))
+
+    unique_vertices = (unique_keys[by_first_use] % max(num_vertices, 1)).astype(np.uint32)
+    vertex_counts = np.bincount(unique_keys // max(num_vertices, 1), minlength=len(primitive_counts))
+    vertex_offsets = np.cumsum(vertex_counts) - vertex_counts
+    local = rank[inverse.ravel()] - np.repeat(vertex_offsets, primitive_counts * 3)
+    return unique_vertices, local.reshape(-1, 3).astype(np.uint8)
+
+def meshlet_records(triangles:np.ndarray, primitive_counts:np.ndarray) -> np.ndarray:
+    '''
+    (T, 3) triangles in meshlet order -> (M, 4) uint32 VertCount, VertOffset, PrimCount, PrimOffset records,
+    with PrimOffset mocked up the way MeshIO::GenerateMeshlets() writes it.
+    '''
+    primitive_counts = np.asarray(primitive_counts, dtype=np.int64)
+    num_vertices = int(triangles.max()) + 1 if len(triangles) else 1
+    keys = np.unique(np.repeat(_meshlet_ids(primitive_counts), 3) * num_vertices + triangles.ravel())
+    vertex_counts = np.bincount(keys // num_vertices, minlength=len(primitive_counts))
+
+    # Every meshlet starts (3 * PrimCount + 3) & ~3 after the previous one, the first at 0
+    strides = (3 * primitive_counts + 3) & ~3
+    primitive_offsets = np.cumsum(strides) - strides
+
+    records = np.empty((len(primitive_counts), 4), dtype=np.uint32)
+    records[:, 0] = vertex_counts
+    records[:, 1] = np.cumsum(vertex_counts) - vertex_counts
+    records[:, 2] = primitive_counts
+    records[:, 3] = primitive_offsets
+    return records
+
+def _corner_segments(triangles:np.ndarray, positions:np.ndarray, primitive_counts:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    corners = np.asarray(positions, dtype=np.float64)[triangles.ravel()]
+    starts = 3 * (np.cumsum(primitive_counts) - primitive_counts)
+    return corners, starts
+
+def cull_data(triangles:np.ndarray, positions:np.ndarray, primitive_counts:np.ndarray) -> np.ndarray:
+    '''
+    (T, 3) triangles in meshlet order -> (M, 6) float32 BSCullData, center and half extent of every meshlet's box.
+    '''
+    if len(primitive_counts) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    corners, starts = _corner_segments(triangles, positions, primitive_counts)
+    low = np.minimum.reduceat(corners, starts, axis=0)
+    high = np.maximum.reduceat(corners, starts, axis=0)
+    center = (low + high) / 2
+    return np.hstack([center, high - center]).astype(np.float32)
+
+def bounding_spheres(triangles:np.ndarray, positions:np.ndarray, primitive_counts:np.ndarray) -> np.ndarray:
+    '''
+    (T, 3) triangles in meshlet order -> (M, 4) float32 center and radius of a sphere around every meshlet.
+    Starts at the box center and steps towards the farthest corner with shrinking steps (Badoiu-Clarkson),
+    the radius is then whatever encloses every corner, so the sphere is never too small.
+    '''
+    if len(primitive_counts) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    corners, starts = _corner_segments(triangles, positions, primitive_counts)
+    segment = np.repeat(np.arange(len(primitive_counts)), primitive_counts * 3)
+    boxes = cull_data(triangles, positions, primitive_counts).astype(np.float64)
+
+    def farthest(centers):
+        distances = ((corners - centers[segment]) ** 2).sum(axis=1)
+        largest = np.maximum.reduceat(distances, starts)
+        # First corner reaching the largest distance in every meshlet
+        hits = np.flatnonzero(distances == largest[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        return corners[hits[first]], np.sqrt(largest)
+
+    centers = boxes[:, :3].copy()
+    best_centers, best_radii = centers.copy(), farthest(centers)[1]
+    for i in range(_SPHERE_ITERATIONS):
+        far_corners, _ = farthest(centers)
+        centers += (far_corners - centers) / (i + 2)
+        radii = farthest(centers)[1]
+        better = radii < best_radii
+        best_centers[better], best_radii[better] = centers[better], radii[better]
+    return np.hstack([best_centers, best_radii[:, np.newaxis]]).astype(np.float32)
+
+def normal_cones(triangles:np.ndarray, positions:np.ndarray, primitive_counts:np.ndarray, spheres:np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    (T, 3) triangles in meshlet order -> (axis (M, 3), cutoff (M,), apex (M, 3)) backface cones.
+    A meshlet faces away from a camera at position p when dot(normalize(apex - p), axis) >= cutoff.
+    Cutoff is 1 for meshlets whose normals spread too wide to ever cull, degenerate triangles are ignored.
+    '''
+    num_meshlets = len(primitive_counts)
+    if num_meshlets == 0:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros((0, 3), dtype=np.float32)
+    if spheres is None:
+        spheres = bounding_spheres(triangles, positions, primitive_counts)
+    corners = np.asarray(positions, dtype=np.float64)[triangles]
+    meshlet = _meshlet_ids(primitive_counts)
+
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, np.newaxis]
+
+    axis = np.stack([np.bincount(meshlet, weights=normals[:, i], minlength=num_meshlets) for i in range(3)], axis=1)
+    axis_lengths = np.linalg.norm(axis, axis=1)
+    np.divide(axis, axis_lengths[:, np.newaxis], out=axis, where=axis_lengths[:, np.newaxis] > 0)
+
+    # Least aligned normal of every meshlet, 1 where a meshlet has no valid triangle
+    dots = np.einsum('ij,ij->i', normals, axis[meshlet])
+    dots[~valid] = 1
+    spread = np.ones(num_meshlets)
+    np.minimum.at(spread, meshlet, dots)
+    usable = (spread > _MIN_CONE_SPREAD) & (axis_lengths > 0)
+
+    # Apex far enough behind the sphere center that every triangle's plane lies in front of it
+    centers = np.asarray(spheres[:, :3], dtype=np.float64)
+    offsets = np.einsum('ij,ij->i', centers[meshlet] - corners[:, 0], normals)
+    along = np.divide(offsets, dots, out=np.zeros_like(offsets), where=valid & usable[meshlet])
+    behind = np.zeros(num_meshlets)
+    np.maximum.at(behind, meshlet, along)
+    apex = centers - axis * behind[:, np.newaxis]
+
+    cutoff = np.where(usable, np.sqrt(np.clip(1 - spread ** 2, 0, 1)), 1.0)
+    return axis.astype(np.float32), cutoff.astype(np.float32), apex.astype(np.float32)
+
+def _view_positions(center:np.ndarray, radius:float, count:int) -> np.ndarray:
+    # Fibonacci sphere of cameras around the mesh
+    i = np.arange(count) + 0.5
+    z = 1 - 2 * i / count
+    angle = np.pi * (1 + 5 ** 0.5) * i
+    ring = np.sqrt(1 - z ** 2)
+    return center + radius * np.stack([ring * np.cos(angle), ring * np.sin(angle), z], axis=1)
+
+def meshlet_report(records:np.ndarray, cones:tuple[np.ndarray, np.ndarray, np.ndarray], spheres:np.ndarray, max_vertices:int = MAX_VERTICES, max_primitives:int = MAX_PRIMITIVES, num_views:int = 64) -> dict:
+    '''
+    Fill rates of the meshlets and how many of them, and of their triangles, the cones cull on average
+    for num_views cameras spread around the mesh at three times its radius.
+    '''
+    num_meshlets = len(records)
+    if num_meshlets == 0:
+        return {'meshlets': 0, 'vertex_fill': 0.0, 'primitive_fill': 0.0, 'cone_usable': 0.0, 'meshlets_culled': 0.0, 'triangles_culled': 0.0}
+    axis, cutoff, apex = (np.asarray(a, dtype=np.float64) for a in cones)
+    primitive_counts = records[:, 2].astype(np.float64)
+
+    centers = spheres[:, :3].astype(np.float64)
+    low = (centers - spheres[:, 3:]).min(axis=0)
+    high = (centers + spheres[:, 3:]).max(axis=0)
+    mesh_center = (low + high) / 2
+    mesh_radius = max(np.linalg.norm(high - low) / 2, 1e-6)
+    views = _view_positions(mesh_center, 3 * mesh_radius, num_views)
+
+    # (views, meshlets) test of every camera against every cone
+    directions = apex[np.newaxis] - views[:, np.newaxis]
+    lengths = np.linalg.norm(directions, axis=2)
+    facing = np.einsum('vmi,mi->vm', directions, axis) / np.maximum(lengths, 1e-30)
+    culled = (facing >= cutoff[np.newaxis]) & (cutoff < 1)[np.newaxis]
+
+    return {
+        'meshlets': num_meshlets,
+        'vertex_fill': float(records[:, 0].mean() / max_vertices),
+        'primitive_fill': float(primitive_counts.mean() / max_primitives),
+        'cone_usable': float(np.count_nonzero(cutoff < 1) / num_meshlets),
+        'meshlets_culled': float(culled.mean()),
+        'triangles_culled': float((culled * primitive_counts).sum() / (num_views * primitive_counts.sum())),
+    }
@@ -0,0 +1,130 @@
+'''
+Pure NumPy split normals.
+
+Computes the corner normals Mesh.calc_normals_split() gives for a set of vertex positions over a fixed
+topology: Newell face normals weighted by corner angle, summed over the smooth fan of every corner.
+With auto smooth, fans are split where Blender splits them: marked sharp edges, edges of flat faces,
+non manifold edges, edges between faces of opposite winding and edges whose faces meet at more than the
+auto smooth angle. Without auto smooth, smooth corners get the vertex normal and flat corners the face normal.
+Only array work happens per call, so shape keys can be evaluated on a thread pool.
+'''
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+class SplitNormalTopology():
+    '''
+    Everything split_normals() needs besides positions, built once per mesh.
+    '''
+    def __init__(self, loop_vertices:np.ndarray, loop_edges:np.ndarray, loop_totals:np.ndarray, polygon_smooth:np.ndarray, sharp_edges:np.ndarray, use_auto_smooth:bool = False, auto_smooth_angle:float = np.pi):
+        self.loop_vertices = np.asarray(loop_vertices, dtype=np.int64)
+        self.polygon_smooth = np.asarray(polygon_smooth, dtype=bool)
+        self.use_auto_smooth = use_auto_smooth
+        self.split_angle_cos = np.cos(auto_smooth_angle)
+
+        loop_totals = np.asarray(loop_totals, dtype=np.int64)
+        loop_starts = np.cumsum(loop_totals) - loop_totals
+        self.loop_polygons = np.repeat(np.arange(len(loop_totals)), loop_totals)
+        corner = np.arange(len(self.loop_vertices)) - loop_starts[self.loop_polygons]
+        totals = loop_totals[self.loop_polygons]
+        self.loop_next = loop_starts[self.loop_polygons] + (corner + 1) % totals
+        self.loop_prev = loop_starts[self.loop_polygons] + (corner - 1) % totals
+
+        # The two loops of every manifold edge, consistent winding runs them in opposite directions
+        loop_edges = np.asarray(loop_edges, dtype=np.int64)
+        sharp_edges = np.asarray(sharp_edges, dtype=bool)
+        counts = np.bincount(loop_edges, minlength=len(sharp_edges))
+        order = np.argsort(loop_edges, kind='stable')
+        starts = np.cumsum(counts) - counts
+        manifold = np.flatnonzero(counts == 2)
+        la = order[starts[manifold]]
+        lb = order[starts[manifold] + 1]
+
+        smooth = self.polygon_smooth[self.loop_polygons[la]] & self.polygon_smooth[self.loop_polygons[lb]]
+        keep = smooth & (self.loop_vertices[la] != self.loop_vertices[lb]) & ~sharp_edges[manifold]
+        la, lb = la[keep], lb[keep]
+
+        # Corners meeting across each smooth edge, one pair per end of the edge
+        self.fan_a = np.concatenate([la, self.loop_next[la]])
+        self.fan_b = np.concatenate([self.loop_next[lb], lb])
+
+    @classmethod
+    def from_mesh(cls, mesh) -> 'SplitNormalTopology':
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_vertices)
+        loop_edges = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('edge_index', loop_edges)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
+        polygon_smooth = np.empty(len(mesh.polygons), dtype=bool)
+        mesh.polygons.foreach_get('use_smooth', polygon_smooth)
+        sharp_edges = np.zeros(len(mesh.edges), dtype=bool)
+        if mesh.use_auto_smooth:
+            # Marked sharp edges only shade with auto smooth
+            mesh.edges.foreach_get('use_edge_sharp', sharp_edges)
+        return cls(loop_vertices, loop_edges, loop_totals, polygon_smooth, sharp_edges, mesh.use_auto_smooth, mesh.auto_smooth_angle)
+
+def _normalized(vectors:np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms != 0)
+
+def _sum_rows(index:np.ndarray, values:np.ndarray, length:int) -> np.ndarray:
+    return np.stack([np.bincount(index, weights=values[:, i], minlength=length) for i in range(3)], axis=1)
+
+def _fan_labels(num_loops:int, fan_a:np.ndarray, fan_b:np.ndarray) -> np.ndarray:
+    # Smallest loop id of every fan, spread along the connections until nothing changes, fans are only a few corners wide
+    labels = np.arange(num_loops)
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, fan_a, labels[fan_b])
+        np.minimum.at(new_labels, fan_b, labels[fan_a])
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+def split_normals(positions:np.ndarray, topology:SplitNormalTopology) -> np.ndarray:
+    '''
+    (V, 3) positions -> (L, 3) float32 corner normals, zero for corners of degenerate faces.
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    num_loops = len(topology.loop_vertices)
+    num_polygons = len(topology.polygon_smooth)
+
+    corner = positions[topology.loop_vertices]
+    next_corner = corner[topology.loop_next]
+    prev_corner = corner[topology.loop_prev]
+
+    face_normals = _normalized(_sum_rows(topology.loop_polygons, np.cross(corner, next_corner), num_polygons))
+
+    edge_next = _normalized(next_corner - corner)
+    edge_prev = _normalized(prev_corner - corner)
+    corner_angles = np.arccos(np.clip(np.einsum('ij,ij->i', edge_next, edge_prev), -1.0, 1.0))
+    weighted = face_normals[topology.loop_polygons] * corner_angles[:, np.newaxis]
+
+    if topology.use_auto_smooth:
+        fan_a, fan_b = topology.fan_a, topology.fan_b
+        # Faces folding sharper than the auto smooth angle split the fan too
+        face_a = face_normals[topology.loop_polygons[fan_a]]
+        face_b = face_normals[topology.loop_polygons[fan_b]]
+        smooth = np.einsum('ij,ij->i', face_a, face_b) >= topology.split_angle_cos
+        labels = _fan_labels(num_loops, fan_a[smooth], fan_b[smooth])
+        normals = _normalized(_sum_rows(labels, weighted, num_loops))[labels]
+    else:
+        vertex_normals = _normalized(_sum_rows(topology.loop_vertices, weighted, len(positions)))
+        normals = vertex_normals[topology.loop_vertices]
+
+    flat = ~topology.polygon_smooth[topology.loop_polygons]
+    normals[flat] = face_normals[topology.loop_polygons[flat]]
+    return normals.astype(np.float32)
+
+def split_normals_many(positions_list:list[np.ndarray], topology:SplitNormalTopology, max_workers:int | None = None) -> list[np.ndarray]:
+    '''
+    split_normals() for several position sets at once on a thread pool, results keep the input order.
+    '''
+    if len(positions_list) <= 1:
+        return [split_normals(positions, topology) for positions in positions_list]
+    if max_workers is None:
+        max_workers = min(len(positions_list), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda positions: split_normals(positions, topology), positions_list))
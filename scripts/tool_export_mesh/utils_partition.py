@@ -0,0 +1,194 @@
+'''
+Splitting of triangle sets that hold more atomic vertices than one .mesh can index.
+
+Triangles are clustered with a k-means on their centroids, then every cluster is grown from the triangle
+nearest its center over the edge adjacency of the mesh, one ring at a time and nearest triangles first,
+until the next triangle would push the partition past the vertex limit. Whatever a cluster could not take
+seeds new partitions, and small partitions are merged into a neighbour that still has room.
+Partitions are connected over mesh edges and each stays under the limit. Atomic vertices on the seam
+between two partitions are written into both.
+'''
+import numpy as np
+
+# Share of the vertex limit the k-means sizes clusters for, seams duplicate vertices and clusters are uneven
+_CLUSTER_FILL = 0.8
+_KMEANS_SAMPLES = 20000
+_KMEANS_ITERATIONS = 16
+_SMALL_PARTITION_FILL = 0.25
+
+def triangle_adjacency(triangle_vertices:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    (T, 3) mesh vertex ids -> CSR (indptr, neighbours) of triangles sharing an edge.
+    Vertex ids rather than atomic ids, so uv seams and sharp edges do not disconnect the mesh.
+    '''
+    num_triangles = len(triangle_vertices)
+    edges = np.stack([triangle_vertices, np.roll(triangle_vertices, -1, axis=1)], axis=2).reshape(-1, 2).astype(np.int64)
+    edges.sort(axis=1)
+    edge_keys = edges[:, 0] << 32 | edges[:, 1]
+    edge_triangles = np.repeat(np.arange(num_triangles), 3)
+
+    order = np.argsort(edge_keys, kind='stable')
+    edge_keys, edge_triangles = edge_keys[order], edge_triangles[order]
+    # Consecutive triangles around one edge are linked, enough to connect non manifold fans as well
+    same = np.flatnonzero(edge_keys[1:] == edge_keys[:-1])
+    a, b = edge_triangles[same], edge_triangles[same + 1]
+    a, b = np.concatenate([a, b]), np.concatenate([b, a])
+
+    order = np.argsort(a, kind='stable')
+    indptr = np.zeros(num_triangles + 1, dtype=np.int64)
+    np.cumsum(np.bincount(a, minlength=num_triangles), out=indptr[1:])
+    return indptr, b[order]
+
+def _neighbours(indptr:np.ndarray, neighbours:np.ndarray, triangles:np.ndarray) -> np.ndarray:
+    counts = indptr[triangles + 1] - indptr[triangles]
+    offsets = np.repeat(indptr[triangles] - np.cumsum(counts) + counts, counts)
+    return neighbours[offsets + np.arange(counts.sum())]
+
+def _nearest(points:np.ndarray, centers:np.ndarray, chunk:int = 1 << 16) -> np.ndarray:
+    # |p - c|^2 without the |p|^2 term, which is the same for every center
+    labels = np.empty(len(points), dtype=np.int64)
+    center_norms = (centers ** 2).sum(axis=1)
+    for start in range(0, len(points), chunk):
+        distances = center_norms - 2 * points[start:start + chunk] @ centers.T
+        labels[start:start + chunk] = np.argmin(distances, axis=1)
+    return labels
+
+def kmeans(points:np.ndarray, k:int, seed:int = 0) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Lloyd iterations on a subsample, seeded k-means++ style. Returns (centers, labels of every point).
+    '''
+    rng = np.random.default_rng(seed)
+    points = np.asarray(points, dtype=np.float64)
+    k = min(k, len(points))
+    samples = points[rng.choice(len(points), min(len(points), _KMEANS_SAMPLES), replace=False)]
+
+    centers = [samples[rng.integers(len(samples))]]
+    distances = ((samples - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        index = rng.choice(len(samples), p=distances / total) if total > 0 else rng.integers(len(samples))
+        centers.append(samples[index])
+        distances = np.minimum(distances, ((samples - samples[index]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    for _ in range(_KMEANS_ITERATIONS):
+        labels = _nearest(samples, centers)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=samples[:, i], minlength=k) for i in range(3)], axis=1)
+        moved = counts > 0
+        new_centers = centers.copy()
+        new_centers[moved] = sums[moved] / counts[moved, np.newaxis]
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+
+    return centers, _nearest(points, centers)
+
+class _RegionGrower():
+    def __init__(self, triangle_atomics:np.ndarray, centroids:np.ndarray, adjacency:tuple[np.ndarray, np.ndarray], max_vertices:int):
+        self.triangle_atomics = triangle_atomics
+        self.centroids = centroids
+        self.indptr, self.neighbours = adjacency
+        self.max_vertices = max_vertices
+        self.labels = np.full(len(triangle_atomics), -1, dtype=np.int64)
+        self.sizes = []
+        # Region id that last took each atomic vertex, regions grow one after another so this is their membership
+        self._stamp = np.full(triangle_atomics.max() + 1 if len(triangle_atomics) else 0, -1, dtype=np.int64)
+
+    def grow(self, seed:int, allowed:np.ndarray | None = None, center:np.ndarray | None = None) -> int:
+        region = len(self.sizes)
+        center = self.centroids[seed] if center is None else center
+        size = 0
+        frontier = np.array([seed])
+        while len(frontier) > 0:
+            frontier = np.unique(frontier)
+            frontier = frontier[self.labels[frontier] == -1]
+            if allowed is not None:
+                frontier = frontier[allowed[frontier]]
+            if len(frontier) == 0:
+                break
+            frontier = frontier[np.argsort(((self.centroids[frontier] - center) ** 2).sum(axis=1), kind='stable')]
+
+            # New atomic vertices every triangle brings, counted once at their first corner in frontier order
+            corners = self.triangle_atomics[frontier].ravel()
+            _, first = np.unique(corners, return_index=True)
+            is_new = np.zeros(len(corners), dtype=bool)
+            is_new[first] = True
+            is_new &= self._stamp[corners] != region
+            added = np.cumsum(is_new.reshape(-1, 3).sum(axis=1))
+            taken = np.searchsorted(added, self.max_vertices - size, side='right')
+
+            accepted = frontier[:taken]
+            self.labels[accepted] = region
+            self._stamp[self.triangle_atomics[accepted]] = region
+            size += int(added[taken - 1]) if taken > 0 else 0
+            if taken < len(frontier):
+                break
+            frontier = _neighbours(self.indptr, self.neighbours, accepted)
+
+        self.sizes.append(size)
+        return region
+
+def _merge_small_partitions(labels:np.ndarray, triangle_atomics:np.ndarray, adjacency:tuple[np.ndarray, np.ndarray], max_vertices:int) -> np.ndarray:
+    num_regions = labels.max() + 1
+    members = [np.unique(triangle_atomics[labels == r]) for r in range(num_regions)]
+
+    # Smallest first, a merged partition's label disappears so neighbours are always live partitions
+    for r in np.argsort([len(m) for m in members], kind='stable'):
+        if len(members[r]) > max_vertices * _SMALL_PARTITION_FILL:
+            continue
+        triangles = np.flatnonzero(labels == r)
+        touching = np.unique(labels[_neighbours(*adjacency, triangles)])
+        best = None
+        for other in touching:
+            if other == r:
+                continue
+            merged = np.union1d(members[other], members[r])
+            if len(merged) <= max_vertices and (best is None or len(merged) < len(best[1])):
+                best = (other, merged)
+        if best is not None:
+            other, merged = best
+            members[other], members[r] = merged, members[r][:0]
+            labels[triangles] = other
+
+    # Ids without gaps, in order of the first triangle of every partition
+    used, first = np.unique(labels, return_index=True)
+    used = used[np.argsort(first, kind='stable')]
+    remap = np.empty(num_regions, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return remap[labels]
+
+def partition_triangles(triangle_atomics:np.ndarray, triangle_vertices:np.ndarray, centroids:np.ndarray, max_vertices:int, seed:int = 0) -> np.ndarray:
+    '''
+    (T, 3) atomic vertex ids, (T, 3) mesh vertex ids and (T, 3) centroids -> (T,) partition id of every triangle.
+    Every partition references at most max_vertices distinct atomic vertices.
+    '''
+    if max_vertices < 3:
+        raise ValueError("partition_triangles() needs room for at least one triangle per partition")
+    num_triangles = len(triangle_atomics)
+    if num_triangles == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    adjacency = triangle_adjacency(triangle_vertices)
+    num_atomics = len(np.unique(triangle_atomics))
+    k = max(1, int(np.ceil(num_atomics / (max_vertices * _CLUSTER_FILL))))
+    centers, clusters = kmeans(centroids, k, seed)
+
+    grower = _RegionGrower(triangle_atomics, centroids, adjacency, max_vertices)
+    for c in range(len(centers)):
+        in_cluster = clusters == c
+        candidates = np.flatnonzero(in_cluster)
+        if len(candidates) == 0:
+            continue
+        seed_triangle = candidates[np.argmin(((centroids[candidates] - centers[c]) ** 2).sum(axis=1))]
+        grower.grow(seed_triangle, in_cluster, centers[c])
+
+    # Pieces a cluster could not reach or hold, grown over any unassigned triangle
+    while True:
+        unassigned = np.flatnonzero(grower.labels == -1)
+        if len(unassigned) == 0:
+            break
+        grower.grow(unassigned[0])
+        # Other disconnected leftovers of the same cluster follow in later rounds
+
+    return _merge_small_partitions(grower.labels, triangle_atomics, adjacency, max_vertices)
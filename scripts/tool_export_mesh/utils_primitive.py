@@ -1,13 +1,26 @@
 import bpy
 import numpy as np
-import bmesh
 import functools
+import copy
+import os
 import ctypes
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from enum import Enum, unique
 
 import utils_math
 import utils_morph_attrs
+import utils_weld
+import utils_normals
+import utils_partition
+import utils_vertex_cache
+import utils_meshlet
+import utils_simplify
+import MeshCodec
+import MorphCodec
 
 from utils_common import timer
 
@@ -61,10 +74,37 @@ class Primitive():
 
             # Less frequently changed options
             self.normal_tangent_round_precision = 3
+            # Welding tolerances for deduplicate_atomics, 0 welds only loops that are identical once stored in the .mesh
+            self.weld_uv_tolerance = 0.0
+            self.weld_normal_tolerance = 0.0
             self.atomic_max_number = 65535
+            # Gather meshes over atomic_max_number anyway, partitions then splits them into meshes under the limit
+            self.partition_oversized = False
+            # Post transform cache size optimize_vertex_order() reorders triangles for, 0 keeps Blender's triangle order
+            self.vertex_cache_size = 16
+            # Also sort triangle clusters against overdraw, clusters end once their ACMR is down to overdraw_threshold
+            self.optimize_overdraw = False
+            self.overdraw_threshold = 0.75
+            # Reorder triangles into meshlets the way MeshIO::GenerateMeshlets() does. The .mesh is then written by MeshCodec
+            # with these meshlets and their culling data instead of by MeshConverter.dll, which would build its own
+            self.gather_meshlets = False
+            self.meshlet_max_vertices = utils_meshlet.MAX_VERTICES
+            self.meshlet_max_primitives = utils_meshlet.MAX_PRIMITIVES
+            # Triangle ratios of generated LODs, e.g. [0.5, 0.25, 0.1], index lists over the same vertices
+            self.lod_ratios:list[float] = []
+            # Skin weight difference (L1) up to which generate_lods() still folds one vertex into another
+            self.lod_weight_tolerance = 0.1
             self.weight_cutoff_threshold = 0.0001
             self.max_weights_per_vertex = 8
             self.prune_empty_vertex_groups = True
+            # Shape keys per chunk for stream_morphs(), 0 gathers every shape key up front in gather()
+            self.morph_chunk_size = 0
+            # Keep gathered morphs only as the encoded .morph.dat records once gather() is done, see quantize_morphs().
+            # The float morph arrays are dropped, so snapping and other edits of them are not possible
+            self.quantize_morph_data = False
+            # Shape key normals from utils_normals on a thread pool instead of ShapeKey.normals_split_get(),
+            # meshes with custom normals always go through Blender
+            self.numpy_morph_normals = True
 
             self.vertex_group_merge_source:list[str] = []
             self.vertex_group_merge_target:str = ''
@@ -92,11 +132,17 @@ class Primitive():
             ('color_a', np.float32)
         ]
         self.vertex_weights_data = {
-            "vertex_weights": [],
+            "vertex_weight_bones": np.zeros((0, 0), dtype=np.uint16),
+            "vertex_weight_values": np.zeros((0, 0), dtype=np.uint16),
+            "vertex_weight_floats": np.zeros((0, 0), dtype=np.float32),
             "vertex_group_names": []
         }
         self.shapeKeys = []
         self.triangles = None
+        self.meshlets = None # (M, 4) uint32 VertCount, VertOffset, PrimCount, PrimOffset from build_meshlets()
+        self.culldata = None # (M, 6) float32 BSCullData center and expand from build_meshlets()
+        self.lods = [] # Flat index lists from generate_lods(), most detailed first
+        self.encoded_morphs:MorphCodec.EncodedMorphs = None # Set by quantize_morphs(), replaces the float morph arrays
 
         self.atomic_vertices = np.empty(len(self.blender_mesh.loops), dtype=self._atomic_attributes)
         self.atomic_to_loop_id = None # Mapping from atomic vertex id to loop id
@@ -161,11 +207,11 @@ class Primitive():
 
     @functools.cached_property
     def morph_normals(self):
-        return [raw_morph_normals[self.atomic_to_loop_id] for raw_morph_normals in self.raw_morph_normals]
+        return np.array([raw_morph_normals[self.atomic_to_loop_id] for raw_morph_normals in self.raw_morph_normals], dtype=np.float32).reshape(-1, len(self.atomic_vertices), 3)
     
     @functools.cached_property
     def morph_tangents(self):
-        return [raw_morph_tangents[self.atomic_to_loop_id] for raw_morph_tangents in self.raw_morph_tangents]
+        return np.array([raw_morph_tangents[self.atomic_to_loop_id] for raw_morph_tangents in self.raw_morph_tangents], dtype=np.float32).reshape(-1, len(self.atomic_vertices), 3)
     
     @functools.cached_property
     def morph_position_deltas(self):
@@ -183,18 +229,102 @@ class Primitive():
     def morph_tangent_deltas(self):
         return np.array([raw_morph_tangent_deltas[self.atomic_to_loop_id] for raw_morph_tangent_deltas in self.raw_morph_tangent_deltas], dtype=np.float32)
 
+    @property
+    def streams_morphs(self) -> bool:
+        return self.options.gather_morph_data and self.options.morph_chunk_size > 0
+
+    @functools.cached_property
+    def _loop_vertex_indices(self):
+        _loop_vertex_indices = np.empty(len(self.blender_mesh.loops), dtype=np.int32)
+        self.blender_mesh.loops.foreach_get('vertex_index', _loop_vertex_indices)
+        return _loop_vertex_indices
+
+    @functools.cached_property
+    def _loop_polygon_indices(self):
+        loop_totals = np.empty(len(self.blender_mesh.polygons), dtype=np.int32)
+        self.blender_mesh.polygons.foreach_get('loop_total', loop_totals)
+        return np.repeat(np.arange(len(loop_totals), dtype=np.int32), loop_totals)
+
+    @functools.cached_property
+    def _basis_coordinates(self):
+        _basis_coordinates = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        self.blender_mesh.vertices.foreach_get('co', _basis_coordinates)
+        return _basis_coordinates.reshape(-1, 3)
+
+    @functools.cached_property
+    def _split_normal_topology(self):
+        return utils_normals.SplitNormalTopology.from_mesh(self.blender_mesh)
+
+    @functools.cached_property
+    def _basis_split_normals(self):
+        # Blender's corner normals of the basis and what the NumPy kernel gives for the same positions
+        relative_key = self.key_blocks[0].relative_key
+        coordinates = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        relative_key.data.foreach_get('co', coordinates)
+        blender_normals = np.array(self._basis_corner_normals, dtype=np.float32).reshape(-1, 3)
+        return blender_normals, utils_normals.split_normals(coordinates, self._split_normal_topology)
+
     @functools.cached_property
     def KDTree(self):
         from scipy.spatial import cKDTree
         return cKDTree(self.positions)
 
+    @functools.cached_property
+    def partitions(self) -> list['Primitive']:
+        '''
+            The primitive itself if it fits in one .mesh, otherwise connected pieces of it under options.atomic_max_number.
+            Normals and tangents come from the whole mesh, so atomic vertices on a partition seam are identical on both sides.
+        '''
+        if len(self.atomic_vertices) <= self.options.atomic_max_number:
+            return [self]
+        if Primitive.GatheredData.TRIANGLES not in self.gathered:
+            raise UngatheredException("Primitive.partitions called before gather_triangles()")
+
+        triangle_atomics = self.triangles.reshape(-1, 3).astype(np.int64)
+        labels = utils_partition.partition_triangles(
+            triangle_atomics,
+            self.atomic_vertices['vertex_index'][triangle_atomics],
+            self.positions[triangle_atomics].mean(axis=1),
+            self.options.atomic_max_number
+        )
+        partitions = [self._partition(np.flatnonzero(labels == i)) for i in range(labels.max() + 1)]
+        print(f"Primitive.partitions split {len(self.atomic_vertices)} vertices into {len(partitions)} partitions: {[len(p.atomic_vertices) for p in partitions]}")
+        return partitions
+
+    def _partition(self, triangle_ids:np.ndarray) -> 'Primitive':
+        # Shares the gathered per loop and per vertex arrays, only the atomic vertex selection and triangles are its own
+        atomic_ids, triangles = np.unique(self.triangles.reshape(-1, 3)[triangle_ids], return_inverse=True)
+
+        partition = copy.copy(self)
+        partition._clear_cached_properties()
+
+        partition.atomic_vertices = self.atomic_vertices[atomic_ids]
+        partition.atomic_to_loop_id = self.atomic_to_loop_id[atomic_ids]
+        atomic_remap = np.full(len(self.atomic_vertices), -1, dtype=np.int64)
+        atomic_remap[atomic_ids] = np.arange(len(atomic_ids))
+        partition.loop_id_to_atomic = atomic_remap[self.loop_id_to_atomic]
+        partition.triangles = triangles.ravel().astype(self.triangles.dtype)
+
+        partition.vertex_weights_data = dict(self.vertex_weights_data)
+        for name in ("vertex_weight_bones", "vertex_weight_values", "vertex_weight_floats"):
+            if len(self.vertex_weights_data[name]) == len(self.atomic_vertices):
+                partition.vertex_weights_data[name] = self.vertex_weights_data[name][atomic_ids]
+
+        partition.gathered = set(self.gathered)
+        return partition
+
+    def _clear_cached_properties(self):
+        for name, attr in vars(Primitive).items():
+            if isinstance(attr, functools.cached_property):
+                self.__dict__.pop(name, None)
+
     def gather(self):
         if not self.scan_object_for_data():
             print("Primitive.gather() failed to scan object for data")
 
         self.gather_atomics()
 
-        self.deduplicate_atomics()
+        self.deduplicate_atomics(raise_exception = not self.options.partition_oversized)
 
         self.gather_positions()
 
@@ -206,7 +336,89 @@ class Primitive():
             self.gather_morphs()
 
         self.gather_triangles()
-    
+
+        self._post_gather()
+
+    def _post_gather(self):
+        if self.options.vertex_cache_size > 0:
+            self.optimize_vertex_order()
+
+        if self.options.lod_ratios or self.options.gather_meshlets:
+            for partition in self.partitions:
+                if self.options.lod_ratios:
+                    partition.generate_lods()
+                if self.options.gather_meshlets:
+                    partition.build_meshlets()
+
+        if self.options.quantize_morph_data and self.options.gather_morph_data and not self.streams_morphs:
+            self.quantize_morphs()
+
+    @staticmethod
+    @timer
+    def gather_many(objects:list[bpy.types.Object], options:'Primitive.Options | list[Primitive.Options]') -> list['Primitive | Exception']:
+        '''
+            gather() for several objects at once. Reading from Blender, normals and tangents stay per object, deduplication,
+            weights and triangles run once over the arrays of all objects concatenated, offset per object.
+            Returns one gathered Primitive per object, or the exception its gather raised in its place.
+        '''
+        if isinstance(options, Primitive.Options):
+            # scan_object_for_data() switches options off per object
+            options = [copy.deepcopy(options) for _ in objects]
+
+        results:list[Primitive | Exception] = [None] * len(objects)
+        live:dict[int, Primitive] = {}
+
+        def each(step):
+            # A failing object drops out of the batch, the others carry on
+            for i, primitive in list(live.items()):
+                try:
+                    step(i, primitive)
+                except Exception as e:
+                    results[i] = e
+                    del live[i]
+
+        for i, (blender_object, object_options) in enumerate(zip(objects, options)):
+            try:
+                live[i] = results[i] = Primitive(blender_object, object_options)
+            except Exception as e:
+                results[i] = e
+
+        def scan(i, primitive):
+            if not primitive.scan_object_for_data():
+                print("Primitive.gather_many() failed to scan object for data")
+            primitive.gather_atomics()
+        each(scan)
+
+        welds = dict(zip(live.keys(), Primitive._weld_many(list(live.values()))))
+        each(lambda i, primitive: primitive._apply_weld(*welds[i], raise_exception = not primitive.options.partition_oversized))
+
+        each(lambda i, primitive: primitive.gather_positions())
+
+        csrs = {}
+        def read_weights(i, primitive):
+            if primitive.options.gather_weights_data:
+                csrs[i] = primitive._weight_csr()
+        each(read_weights)
+        weighted = [i for i in live if i in csrs]
+        dense = Primitive._dense_weights_many([csrs[i] for i in weighted], [live[i].options.max_weights_per_vertex for i in weighted])
+        for i, (weight_bones, weight_floats) in zip(weighted, dense):
+            live[i]._set_dense_weights(weight_bones, weight_floats)
+
+        each(lambda i, primitive: primitive.gather_morphs() if primitive.options.gather_morph_data else None)
+
+        loop_triangles = {}
+        def read_triangles(i, primitive):
+            loop_triangles[i] = primitive._loop_triangles()
+        each(read_triangles)
+        atomic_triangles = Primitive._remap_many([loop_triangles[i] for i in live], [p.loop_id_to_atomic for p in live.values()])
+        for primitive, triangles in zip(live.values(), atomic_triangles):
+            primitive._set_triangles(triangles)
+
+        each(lambda i, primitive: primitive._post_gather())
+
+        print(f"Primitive.gather_many() gathered {len(live)} of {len(objects)} objects")
+        return results
+
     @timer
     def scan_object_for_data(self):
         # Check for UV data
@@ -358,7 +570,35 @@ class Primitive():
 
     @timer
     def deduplicate_atomics(self, raise_exception = True):
-        self.atomic_vertices, self.atomic_to_loop_id, self.loop_id_to_atomic = np.unique(self.atomic_vertices, return_index=True, return_inverse=True)
+        keys = utils_weld.atomic_keys(self.atomic_vertices, self.options.weld_uv_tolerance, self.options.weld_normal_tolerance)
+        return self._apply_weld(*utils_weld.weld(keys), raise_exception)
+
+    @staticmethod
+    @timer
+    def _weld_many(primitives:list['Primitive']) -> list[tuple[np.ndarray, np.ndarray]]:
+        # utils_weld.weld() of every primitive's atomic keys in one pass, (atomic_to_loop_id, loop_id_to_atomic) per primitive
+        if not primitives:
+            return []
+        keys = [utils_weld.atomic_keys(p.atomic_vertices, p.options.weld_uv_tolerance, p.options.weld_normal_tolerance) for p in primitives]
+        # Tolerances change the key width, zero padding evens it out and an object id column keeps objects apart
+        width = max(k.shape[1] for k in keys)
+        keys = np.vstack([
+            np.hstack([k, np.zeros((len(k), width - k.shape[1]), dtype=np.uint64), np.full((len(k), 1), i, dtype=np.uint64)])
+            for i, k in enumerate(keys)
+        ])
+        representatives, inverse = utils_weld.weld(keys)
+
+        # Loop order is kept, so every object's atomic vertices are one contiguous run
+        loop_offsets = np.cumsum([0] + [len(p.atomic_vertices) for p in primitives])
+        atomic_offsets = np.searchsorted(representatives, loop_offsets)
+        return [
+            (representatives[atomic_offsets[i]:atomic_offsets[i + 1]] - loop_offsets[i], inverse[loop_offsets[i]:loop_offsets[i + 1]] - atomic_offsets[i])
+            for i in range(len(primitives))
+        ]
+
+    def _apply_weld(self, atomic_to_loop_id:np.ndarray, loop_id_to_atomic:np.ndarray, raise_exception = True):
+        self.atomic_to_loop_id, self.loop_id_to_atomic = atomic_to_loop_id, loop_id_to_atomic
+        self.atomic_vertices = self.atomic_vertices[self.atomic_to_loop_id]
 
         print("Final vertices count: " + str(len(self.atomic_vertices)))
 
@@ -393,94 +633,109 @@ class Primitive():
 
         self.raw_morph_positions = []
         self.raw_morph_position_deltas = []
-        for key_block in self.key_blocks:
-            vs = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
-            key_block.data.foreach_get('co', vs)
-            vs = vs.reshape(len(self.blender_mesh.vertices), 3)
+        key_blocks = self.key_blocks if not self.streams_morphs else []
+        for key_block in key_blocks:
+            vs, deltas = self._gather_morph_positions(key_block)
+            self.raw_morph_positions.append(vs)
+            self.raw_morph_position_deltas.append(deltas)
 
-            self._post_vertex_transform(vs)
+    def _gather_morph_positions(self, key_block:bpy.types.ShapeKey) -> tuple[np.ndarray, np.ndarray]:
+        vs = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        key_block.data.foreach_get('co', vs)
+        vs = vs.reshape(len(self.blender_mesh.vertices), 3)
 
-            self.raw_morph_positions.append(vs)
-            self.raw_morph_position_deltas.append(vs - self.raw_positions)
+        self._post_vertex_transform(vs)
+
+        return vs, vs - self.raw_positions
 
     @timer
     def gather_weights(self):
-        vertex_groups = self.blender_object.vertex_groups
-        if self.options.prune_empty_vertex_groups:
-            vgrp_markers = [[vg.name, -1] for vg in vertex_groups]
-        else:
-            vgrp_markers = [[vg.name, i] for vg, i in zip(vertex_groups, range(len(vertex_groups)))]
-        new_id = 0
+        weight_bones, weight_floats = MeshCodec.dense_weights_from_csr(*self._weight_csr(), self.options.max_weights_per_vertex)
+        self._set_dense_weights(weight_bones, weight_floats)
 
-        bm = bmesh.new()
-        bm.from_mesh(self.blender_mesh)
-        bm.verts.layers.deform.verify()
-        deform = bm.verts.layers.deform.active
-        weight_data = []
-        _min_weight = self.options.weight_cutoff_threshold
+    def _weight_csr(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (indptr, bone, weight) per mesh vertex after cutoff, ignore, merge and pruning, fills vertex_group_names
+        vertex_groups = self.blender_object.vertex_groups
+        vertices = self.blender_mesh.vertices
+
+        # Flat (group, weight) entries in vertex order, the per vertex counts give the CSR row pointers
+        counts = np.fromiter((len(v.groups) for v in vertices), dtype=np.int64, count=len(vertices))
+        entries = np.fromiter(
+            ((g.group, g.weight) for v in vertices for g in v.groups),
+            dtype=[('group', np.int64), ('weight', np.float32)],
+            count=int(counts.sum())
+        )
+        rows = np.repeat(np.arange(len(vertices), dtype=np.int64), counts)
+        groups = entries['group']
+        weights = entries['weight']
+
+        keep = weights > self.options.weight_cutoff_threshold
+        if len(self.vertex_group_ignore_indices) > 0:
+            keep &= ~np.isin(groups, list(self.vertex_group_ignore_indices))
+        rows, groups, weights = rows[keep], groups[keep], weights[keep]
 
         if self.options.vertex_group_merge_source and self.options.vertex_group_merge_target != '':
-            for v in bm.verts:
-                g = v[deform]
-                
-                vertex_weight_data = []
-                for bone_id, weight in g.items():
-                    if bone_id in self.vertex_group_ignore_indices:
-                        continue
-                    bone_id = self.vertex_group_indices_mapping[bone_id]
-                    if weight > _min_weight:
-                        if vgrp_markers[bone_id][1] == -1:
-                            vgrp_markers[bone_id][1] = new_id
-                            new_id += 1
-                        vertex_weight_data.append([vgrp_markers[bone_id][1], weight])
-
-                # Deduplicate the list by the first element
-                for i in range(len(vertex_weight_data)):
-                    for j in range(i+1, len(vertex_weight_data)):
-                        if vertex_weight_data[i][0] == vertex_weight_data[j][0]:
-                            vertex_weight_data[i][1] += vertex_weight_data[j][1]
-                            vertex_weight_data[j][1] = 0
-
-                # Remove the elements with 0 weight
-                vertex_weight_data = [x for x in vertex_weight_data if x[1] != 0]
-                
-                if len(vertex_weight_data) > self.options.max_weights_per_vertex:
-                    vertex_weight_data = sorted(vertex_weight_data, key=lambda x: x[1], reverse=True)[:self.options.max_weights_per_vertex]
-                elif len(vertex_weight_data) == 0:
-                    vertex_weight_data.append([0, 0])
-
-                weight_data.append(vertex_weight_data)
+            groups = self.vertex_group_indices_mapping[groups]
 
+        if self.options.prune_empty_vertex_groups:
+            # Ids are handed out in order of first use, as walking the vertices one by one would
+            used, first_use = np.unique(groups, return_index=True)
+            used = used[np.argsort(first_use, kind='stable')]
+            remap = np.full(max(len(vertex_groups), 1), -1, dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            bones = remap[groups]
+            self.vertex_weights_data['vertex_group_names'] = [vertex_groups[int(i)].name for i in used]
         else:
-            for v in bm.verts:
-                g = v[deform]
-                
-                vertex_weight_data = []
-                for bone_id, weight in g.items():
-                    if bone_id in self.vertex_group_ignore_indices:
-                        continue
-                    if weight > _min_weight:
-                        if vgrp_markers[bone_id][1] == -1:
-                            vgrp_markers[bone_id][1] = new_id
-                            new_id += 1
-                        vertex_weight_data.append([vgrp_markers[bone_id][1], weight])
-                
-                if len(vertex_weight_data) > self.options.max_weights_per_vertex:
-                    vertex_weight_data = sorted(vertex_weight_data, key=lambda x: x[1], reverse=True)[:self.options.max_weights_per_vertex]
-                elif len(vertex_weight_data) == 0:
-                    vertex_weight_data.append([0, 0])
-
-                weight_data.append(vertex_weight_data)
-
-        self.vertex_weights_data["vertex_weights"] = [weight_data[i] for i in self.atomic_vertices['vertex_index']]
-        vgrp_markers = sorted(vgrp_markers, key=lambda x: x[1])
-        self.vertex_weights_data['vertex_group_names'] = [vg[0] for vg in vgrp_markers if vg[1] != -1]
-
-        bm.free()
+            bones = groups
+            self.vertex_weights_data['vertex_group_names'] = [vg.name for vg in vertex_groups]
+
+        indptr = np.zeros(len(vertices) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(vertices)), out=indptr[1:])
+        return indptr, bones, weights
+
+    @staticmethod
+    @timer
+    def _dense_weights_many(csrs:list[tuple[np.ndarray, np.ndarray, np.ndarray]], max_weights:list[int]) -> list[tuple[np.ndarray, np.ndarray]]:
+        # MeshCodec.dense_weights_from_csr() over the stacked rows of all CSRs that share a max_weights
+        dense = [None] * len(csrs)
+        for k in set(max_weights):
+            group = [i for i in range(len(csrs)) if max_weights[i] == k]
+            row_offsets = np.cumsum([0] + [len(csrs[i][0]) - 1 for i in group])
+            entry_offsets = np.cumsum([0] + [csrs[i][0][-1] for i in group])
+            indptr = np.concatenate([[0]] + [csrs[i][0][1:] + offset for i, offset in zip(group, entry_offsets)])
+            bones = np.concatenate([csrs[i][1] for i in group])
+            weights = np.concatenate([csrs[i][2] for i in group])
+            weight_bones, weight_floats = MeshCodec.dense_weights_from_csr(indptr, bones, weights, k)
+
+            for j, i in enumerate(group):
+                rows = slice(row_offsets[j], row_offsets[j + 1])
+                # Columns beyond the object's own most weighted vertex are padding from the others
+                width = max(int(np.count_nonzero((weight_floats[rows] > 0).any(axis=0))), 1)
+                dense[i] = (weight_bones[rows, :width], weight_floats[rows, :width])
+        return dense
+
+    def _set_dense_weights(self, weight_bones:np.ndarray, weight_floats:np.ndarray):
+        weight_values = MeshCodec.quantize_weights(weight_floats)
+
+        atomic_vertex_ids = self.atomic_vertices['vertex_index']
+        self.vertex_weights_data["vertex_weight_bones"] = weight_bones[atomic_vertex_ids]
+        self.vertex_weights_data["vertex_weight_values"] = weight_values[atomic_vertex_ids]
+        self.vertex_weights_data["vertex_weight_floats"] = weight_floats[atomic_vertex_ids].astype(np.float32)
         
         self.gathered.add(Primitive.GatheredData.WEIGHTS)
 
-        print("Final vertex weights count: " + str(len(self.vertex_weights_data["vertex_weights"])))
+        print("Final vertex weights count: " + str(len(self.vertex_weights_data["vertex_weight_bones"])))
+
+    def vertex_weight_lists(self) -> list:
+        '''
+            [vertex: [[bone, weight], ...]] as the json paths expect, built from the dense arrays on demand
+        '''
+        bones = self.vertex_weights_data["vertex_weight_bones"].tolist()
+        weights = self.vertex_weights_data["vertex_weight_floats"].tolist()
+        return [
+            [[b, w] for i, (b, w) in enumerate(zip(row_bones, row_weights)) if i == 0 or w > 0]
+            for row_bones, row_weights in zip(bones, weights)
+        ]
 
     @timer
     def gather_morphs(self):
@@ -490,44 +745,186 @@ class Primitive():
 
         morph_target_colors = utils_morph_attrs.MorphTargetColors()
 
-        key_blocks = self.key_blocks if self.options.gather_morph_data else []
+        key_blocks = self.key_blocks if self.options.gather_morph_data and not self.streams_morphs else []
 
         for key_block in key_blocks:
-            col_attr = None
+            self.raw_morph_target_colors.append(self._gather_morph_target_colors(key_block, morph_target_colors))
 
-            if self.options.use_morph_color_attrs:
-                col_attr = morph_target_colors.validate(self.blender_mesh, key_block.name, remove_invalid=False, create_if_invalid=False)
+        if not self.streams_morphs:
+            self.gathered.add(Primitive.GatheredData.MORPHCOLORS)
 
-            if col_attr is None:
-                raw_morph_target_colors = np.ones((len(self.blender_mesh.loops), 3), dtype=np.float32)
-            else:
-                print(f"Primitive.gather_morphs() found valid color attribute for shape key: {key_block.name}")
-                raw_morph_target_colors = morph_target_colors.gather(self.blender_mesh, key_block.name).reshape(-1, 4)[:, :3]
-                
-            self.raw_morph_target_colors.append(raw_morph_target_colors)
+    def _gather_morph_target_colors(self, key_block:bpy.types.ShapeKey, morph_target_colors:utils_morph_attrs.MorphTargetColors) -> np.ndarray:
+        col_attr = None
+
+        if self.options.use_morph_color_attrs:
+            col_attr = morph_target_colors.validate(self.blender_mesh, key_block.name, remove_invalid=False, create_if_invalid=False)
 
-        self.gathered.add(Primitive.GatheredData.MORPHCOLORS)
+        if col_attr is None:
+            return np.ones((len(self.blender_mesh.loops), 3), dtype=np.float32)
+
+        print(f"Primitive.gather_morphs() found valid color attribute for shape key: {key_block.name}")
+        return morph_target_colors.gather(self.blender_mesh, key_block.name).reshape(-1, 4)[:, :3]
 
     @timer
     def gather_triangles(self):
+        # For each loop id in triangles, replace it with the corresponding atomic vertex id
+        self._set_triangles(self.loop_id_to_atomic[self._loop_triangles()])
+
+    def _loop_triangles(self) -> np.ndarray:
         self.blender_mesh.calc_loop_triangles()
-        self.triangles = np.empty(len(self.blender_mesh.loop_triangles) * 3, dtype=np.uint32)
-        self.blender_mesh.loop_triangles.foreach_get('loops', self.triangles)
+        loops = np.empty(len(self.blender_mesh.loop_triangles) * 3, dtype=np.uint32)
+        self.blender_mesh.loop_triangles.foreach_get('loops', loops)
+        return loops
 
-        # For each loop id in triangles, replace it with the corresponding atomic vertex id
-        self.triangles = self.loop_id_to_atomic[self.triangles]
+    @staticmethod
+    @timer
+    def _remap_many(loop_triangles:list[np.ndarray], loop_id_to_atomic:list[np.ndarray]) -> list[np.ndarray]:
+        # Loop ids to atomic ids for every object in one lookup, through the concatenated mappings
+        if not loop_triangles:
+            return []
+        loop_offsets = np.cumsum([0] + [len(m) for m in loop_id_to_atomic])
+        atomic_offsets = np.cumsum([0] + [int(m.max()) + 1 if len(m) else 0 for m in loop_id_to_atomic])
+        triangle_offsets = np.cumsum([0] + [len(t) for t in loop_triangles])
+        mapping = np.concatenate([m + offset for m, offset in zip(loop_id_to_atomic, atomic_offsets)])
+        triangles = mapping[np.concatenate([t.astype(np.int64) + offset for t, offset in zip(loop_triangles, loop_offsets)])]
+        return [triangles[triangle_offsets[i]:triangle_offsets[i + 1]] - atomic_offsets[i] for i in range(len(loop_triangles))]
+
+    def _set_triangles(self, triangles:np.ndarray):
+        self.triangles = triangles
 
         self.gathered.add(Primitive.GatheredData.TRIANGLES)
 
         print("Final triangles count: " + str(len(self.triangles)))
 
+    @timer
+    def optimize_vertex_order(self):
+        '''
+            Reorders the triangles for the post transform vertex cache, then the atomic vertices in order of first use
+            so vertex fetches walk the buffers forwards. Prints ACMR/ATVR of options.vertex_cache_size before and after.
+        '''
+        if Primitive.GatheredData.TRIANGLES not in self.gathered:
+            raise UngatheredException("Primitive.optimize_vertex_order() called before gather_triangles()")
+
+        cache_size = self.options.vertex_cache_size
+        num_verts = len(self.atomic_vertices)
+        triangles = self.triangles.reshape(-1, 3)
+        acmr, atvr = utils_vertex_cache.cache_statistics(triangles, num_verts, cache_size)
+
+        order, boundaries = utils_vertex_cache.tipsify(triangles, num_verts, cache_size)
+        if self.options.optimize_overdraw:
+            order = utils_vertex_cache.overdraw_order(triangles, order, boundaries, self.positions, cache_size, self.options.overdraw_threshold)
+        triangles = triangles[order]
+
+        # Renumber so atomic vertex i is the i-th one the triangles use
+        vertex_order = utils_vertex_cache.fetch_order(triangles, num_verts)
+        remap = np.empty(num_verts, dtype=self.triangles.dtype)
+        remap[vertex_order] = np.arange(num_verts)
+
+        self.atomic_vertices = self.atomic_vertices[vertex_order]
+        self.atomic_to_loop_id = self.atomic_to_loop_id[vertex_order]
+        self.loop_id_to_atomic = remap[self.loop_id_to_atomic]
+        self.triangles = remap[triangles].ravel()
+        for name in ("vertex_weight_bones", "vertex_weight_values", "vertex_weight_floats"):
+            if len(self.vertex_weights_data[name]) == num_verts:
+                self.vertex_weights_data[name] = self.vertex_weights_data[name][vertex_order]
+        self._clear_cached_properties()
+
+        new_acmr, new_atvr = utils_vertex_cache.cache_statistics(self.triangles.reshape(-1, 3), num_verts, cache_size)
+        print(f"Primitive.optimize_vertex_order() cache size {cache_size}: ACMR {acmr:.3f} -> {new_acmr:.3f}, ATVR {atvr:.3f} -> {new_atvr:.3f}")
+
+    @timer
+    def generate_lods(self):
+        '''
+            Fills lods with one index list per options.lod_ratios, simplified by utils_simplify over the same atomic vertices.
+            uv and normal seams, vertices moved by shape keys and collapses across differing skin weights are left alone.
+        '''
+        if Primitive.GatheredData.TRIANGLES not in self.gathered:
+            raise UngatheredException("Primitive.generate_lods() called before gather_triangles()")
+
+        vertex_ids = self.atomic_vertices['vertex_index']
+        # Atomic vertices sharing a mesh vertex sit on a seam
+        locked = np.bincount(vertex_ids, minlength=len(self.blender_mesh.vertices))[vertex_ids] > 1
+        locked |= self._morph_moved_vertices()[vertex_ids]
+
+        weights = None
+        if Primitive.GatheredData.WEIGHTS in self.gathered and self.vertex_weights_data["vertex_weight_bones"].size > 0:
+            weights = (self.vertex_weights_data["vertex_weight_bones"], self.vertex_weights_data["vertex_weight_floats"])
+
+        lods = utils_simplify.lod_chain(self.triangles.reshape(-1, 3), self.positions, self.options.lod_ratios, locked, weights, self.options.lod_weight_tolerance)
+        if self.options.vertex_cache_size > 0:
+            lods = [lod[utils_vertex_cache.tipsify(lod, len(self.atomic_vertices), self.options.vertex_cache_size)[0]] for lod in lods]
+        self.lods = [lod.ravel().astype(self.triangles.dtype) for lod in lods]
+
+        print(f"Primitive.generate_lods() {len(self.triangles) // 3} triangles -> {[len(lod) // 3 for lod in self.lods]}")
+
+    @timer
+    def quantize_morphs(self):
+        '''
+            Encodes the gathered morphs into the records the .morph.dat stores, half float position deltas and DEC3N normal
+            and tangent deltas, and drops the float morph arrays. Exports then write the records as they are.
+            Prints the largest error of every shape key against the float data.
+        '''
+        if Primitive.GatheredData.MORPHTANGENTS not in self.gathered:
+            print("Primitive.quantize_morphs() needs morph tangents, morphs are kept as floats")
+            return
+
+        self.encoded_morphs = MorphCodec.EncodedMorphs.from_sparse(self.to_sparse_morphs())
+        for name in ('raw_morph_positions', 'raw_morph_position_deltas', 'raw_morph_normals', 'raw_morph_normal_deltas',
+                     'raw_morph_tangents', 'raw_morph_tangent_deltas', 'raw_morph_target_colors'):
+            self.__dict__.pop(name, None)
+        for name in ('morph_positions', 'morph_normals', 'morph_tangents', 'morph_position_deltas', 'morph_target_colors', 'morph_normal_deltas', 'morph_tangent_deltas'):
+            self.__dict__.pop(name, None)
+
+        for name, (position_error, normal_error, tangent_error) in zip(self.encoded_morphs.shape_keys, self.encoded_morphs.errors.tolist()):
+            print(f"Primitive.quantize_morphs() {name}: max error position {position_error:.2e}, normal {normal_error:.2e}, tangent {tangent_error:.2e}")
+        print(f"Primitive.quantize_morphs() {self.encoded_morphs.nnz} entries in {_nbytes(self.encoded_morphs.records)} bytes")
+
+    def _morph_moved_vertices(self) -> np.ndarray:
+        # Mesh vertices any unmuted shape key moves, whether or not morphs are gathered, LODs share the morph data
+        moved = np.zeros(len(self.blender_mesh.vertices), dtype=bool)
+        if not self.blender_mesh.shape_keys:
+            return moved
+        coordinates = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        relative = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        for key_block in self.blender_mesh.shape_keys.key_blocks:
+            if key_block == key_block.relative_key or key_block.mute:
+                continue
+            key_block.data.foreach_get('co', coordinates)
+            key_block.relative_key.data.foreach_get('co', relative)
+            moved |= np.any(coordinates.reshape(-1, 3) != relative.reshape(-1, 3), axis=1)
+        return moved
+
+    @timer
+    def build_meshlets(self):
+        '''
+            Reorders the triangles into meshlets under options.meshlet_max_vertices and options.meshlet_max_primitives,
+            the order the .mesh index buffer ends up in, and fills meshlets and culldata with the records the .mesh stores.
+            Prints fill rates and how much normal cone culling would save, the .mesh itself keeps no cones.
+        '''
+        if Primitive.GatheredData.TRIANGLES not in self.gathered:
+            raise UngatheredException("Primitive.build_meshlets() called before gather_triangles()")
+
+        triangles = self.triangles.reshape(-1, 3)
+        order, primitive_counts = utils_meshlet.build_meshlets(triangles, self.positions, self.options.meshlet_max_vertices, self.options.meshlet_max_primitives)
+        triangles = triangles[order]
+        self.triangles = triangles.ravel()
+
+        self.meshlets = utils_meshlet.meshlet_records(triangles, primitive_counts)
+        self.culldata = utils_meshlet.cull_data(triangles, self.positions, primitive_counts)
+        spheres = utils_meshlet.bounding_spheres(triangles, self.positions, primitive_counts)
+        cones = utils_meshlet.normal_cones(triangles, self.positions, primitive_counts, spheres)
+
+        report = utils_meshlet.meshlet_report(self.meshlets, cones, spheres, self.options.meshlet_max_vertices, self.options.meshlet_max_primitives)
+        print(f"Primitive.build_meshlets() {report['meshlets']} meshlets: vertex fill {report['vertex_fill']:.1%}, primitive fill {report['primitive_fill']:.1%}, "
+              f"usable cones {report['cone_usable']:.1%}, cone culled meshlets {report['meshlets_culled']:.1%}, triangles {report['triangles_culled']:.1%}")
+
     def _calculate_normals(self):
         '''
             Inspired from glTF 2.0 exporter for Blender
         '''
         key_blocks = self.key_blocks if self.options.gather_morph_data else []
         if key_blocks:
-            self.raw_normals = raw_corner_normals = key_blocks[0].relative_key.normals_split_get()
+            self.raw_normals = self._basis_corner_normals = key_blocks[0].relative_key.normals_split_get()
             self.raw_normals = np.array(self.raw_normals, dtype=np.float32)
         else:
             self.raw_normals = np.empty(len(self.blender_mesh.loops) * 3, dtype=np.float32)
@@ -547,47 +944,86 @@ class Primitive():
 
         self.raw_morph_normals = []
         self.raw_morph_normal_deltas = []
-        if self.options.gather_morph_data:
+        if self.options.gather_morph_data and not self.streams_morphs:
 
-            for key_block in key_blocks:
-                
-                # If attribute is found, use it.
-                attr:bpy.types.Attribute|None = None
+            for key_block, raw_split_normals in zip(key_blocks, self._morph_split_normals(key_blocks)):
+                raw_morph_normals, raw_morph_normal_deltas = self._gather_morph_normals(key_block, raw_split_normals)
+                self.raw_morph_normals.append(raw_morph_normals)
+                self.raw_morph_normal_deltas.append(raw_morph_normal_deltas)
 
-                if self.options.use_morph_normal_attrs:
-                    attr = utils_morph_attrs.MorphNormals().validate(self.blender_mesh, key_block.name, remove_invalid=False, create_if_invalid=False)
+            self.gathered.add(Primitive.GatheredData.MORPHNORMALS)
 
-                if attr is not None:
-                    raw_morph_normal_deltas = utils_morph_attrs.MorphNormals().gather(self.blender_mesh, key_block.name)
+    def _morph_normal_attr(self, key_block:bpy.types.ShapeKey) -> bpy.types.Attribute|None:
+        if not self.options.use_morph_normal_attrs:
+            return None
+        return utils_morph_attrs.MorphNormals().validate(self.blender_mesh, key_block.name, remove_invalid=False, create_if_invalid=False)
 
-                    # Sum normals deltas + raw corner normals of the basis
-                    raw_morph_normals = np.array(raw_corner_normals + raw_morph_normal_deltas, dtype=np.float32)
-                else:
-                    raw_morph_normals = np.array(key_block.normals_split_get(), dtype=np.float32)
+    def _morph_split_normals(self, key_blocks:list[bpy.types.ShapeKey]) -> list[np.ndarray|None]:
+        '''
+            Raw corner normals of the shape keys as ShapeKey.normals_split_get() would return them, computed by utils_normals
+            across keys on a thread pool. None for keys left to Blender or read from morph normal attributes.
+            The kernel is only trusted for what a shape key changes: its result on the basis is subtracted and the
+            difference added onto Blender's basis normals, so loops the key does not bend keep Blender's normal exactly.
+        '''
+        if not self.options.numpy_morph_normals or self.blender_mesh.has_custom_normals:
+            return [None] * len(key_blocks)
+
+        indices = [i for i, key_block in enumerate(key_blocks) if self._morph_normal_attr(key_block) is None]
+        coordinates = []
+        for i in indices:
+            # bpy is only touched from this thread, the pool only sees arrays
+            co = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+            key_blocks[i].data.foreach_get('co', co)
+            coordinates.append(co)
+
+        blender_normals, kernel_basis = self._basis_split_normals
+        result = [None] * len(key_blocks)
+        for i, kernel_normals in zip(indices, utils_normals.split_normals_many(coordinates, self._split_normal_topology)):
+            delta = kernel_normals - kernel_basis
+            bent = delta.any(axis=1)
+            bent_normals = blender_normals[bent] + delta[bent]
+            utils_math.NormalizeRows(bent_normals)
+            raw_split_normals = blender_normals.copy()
+            raw_split_normals[bent] = bent_normals
+            result[i] = raw_split_normals
+        return result
+
+    def _gather_morph_normals(self, key_block:bpy.types.ShapeKey, raw_split_normals:np.ndarray|None = None) -> tuple[np.ndarray, np.ndarray]:
+        # If attribute is found, use it.
+        attr = self._morph_normal_attr(key_block)
+
+        if attr is not None:
+            raw_morph_normal_deltas = utils_morph_attrs.MorphNormals().gather(self.blender_mesh, key_block.name)
+
+            # Sum normals deltas + raw corner normals of the basis
+            raw_morph_normals = np.array(self._basis_corner_normals + raw_morph_normal_deltas, dtype=np.float32)
+        else:
+            if raw_split_normals is None:
+                raw_split_normals = key_block.normals_split_get()
+            raw_morph_normals = np.array(raw_split_normals, dtype=np.float32)
+            affected = self._morph_affected_loops(key_block)
+            if not np.all(affected):
+                return self._sparse_morph_normals(raw_morph_normals.reshape(-1, 3), affected)
 
-                raw_morph_normals = raw_morph_normals.reshape(len(self.blender_mesh.loops), 3)
-                raw_morph_normals = np.round(raw_morph_normals, self.options.normal_tangent_round_precision)
+        raw_morph_normals = raw_morph_normals.reshape(len(self.blender_mesh.loops), 3)
+        raw_morph_normals = np.round(raw_morph_normals, self.options.normal_tangent_round_precision)
 
-                # Handle degenrated normals
-                is_zero = ~raw_morph_normals.any(axis=1)
-                raw_morph_normals[is_zero, 2] = 1
+        # Handle degenrated normals
+        is_zero = ~raw_morph_normals.any(axis=1)
+        raw_morph_normals[is_zero, 2] = 1
 
-                self._post_normal_transform(raw_morph_normals)
+        self._post_normal_transform(raw_morph_normals)
 
-                self.raw_morph_normals.append(raw_morph_normals)
-                
-                # For DirectX compression format
-                
-                # Raw morph normal deltas are already got using normal attributes,
-                # no need to get it twice.
-                if attr is not None:
-                    raw_morph_normal_deltas = np.reshape(raw_morph_normal_deltas, (-1, 3))
-                else:
-                    raw_morph_normal_deltas = utils_math.bounded_vector_substraction(self.raw_normals, raw_morph_normals)
+        # For DirectX compression format
 
-                self.raw_morph_normal_deltas.append(raw_morph_normal_deltas)
+        # Raw morph normal deltas are already got using normal attributes,
+        # no need to get it twice.
+        if attr is not None:
+            raw_morph_normal_deltas = np.reshape(raw_morph_normal_deltas, (-1, 3))
+        else:
+            raw_morph_normal_deltas = utils_math.bounded_vector_substraction(self.raw_normals, raw_morph_normals)
 
-            self.gathered.add(Primitive.GatheredData.MORPHNORMALS)
+        return raw_morph_normals, raw_morph_normal_deltas
 
     def _calculate_tangents(self):
         self.blender_mesh.calc_tangents()
@@ -604,6 +1040,8 @@ class Primitive():
         _temp_arr = np.empty(len(self.blender_mesh.loops), dtype = np.int32)
         self.blender_mesh.loops.foreach_get('bitangent_sign', _temp_arr)
         self.raw_bitangent_signs = _temp_arr
+        # The mesh may be the user's own, leave no tangent layer behind
+        self.blender_mesh.free_tangents()
         self._post_bitangent_transform()
 
         self.gathered.add(Primitive.GatheredData.BITANGENTS)
@@ -612,20 +1050,107 @@ class Primitive():
         # Calculate morph tangents from morph normals, basis normals and basis tangents (64k verts 77 SK, 160 ms)
         self.raw_morph_tangents = []
         self.raw_morph_tangent_deltas = []
-        if self.options.gather_morph_data:
-            for raw_morph_normals in self.raw_morph_normals:
-                batch_rot = utils_math.batch_rotation_matrices(self.raw_normals, raw_morph_normals)
+        if self.options.gather_morph_data and not self.streams_morphs:
+            for raw_morph_tangents, morph_tangent_deltas in self._calculate_morph_tangents_many(self.raw_morph_normals):
+                self.raw_morph_tangents.append(raw_morph_tangents)
+                self.raw_morph_tangent_deltas.append(morph_tangent_deltas)
 
-                raw_morph_tangents = np.einsum('ijk,ik->ij', batch_rot, self.raw_tangents)
+            self.gathered.add(Primitive.GatheredData.MORPHTANGENTS)
 
-                self.raw_morph_tangents.append(raw_morph_tangents)
+    def _morph_affected_loops(self, key_block:bpy.types.ShapeKey) -> np.ndarray:
+        '''
+            Loops whose split normal can differ from the basis: every loop of a vertex sharing a face with a vertex the shape key moves
+        '''
+        coordinates = np.empty(len(self.blender_mesh.vertices) * 3, dtype=np.float32)
+        key_block.data.foreach_get('co', coordinates)
+        moved = np.any(coordinates.reshape(-1, 3) != self._basis_coordinates, axis=1)
 
-                # For DirectX compression format
-                morph_tangent_deltas = self.raw_bitangent_signs[:, np.newaxis] * utils_math.bounded_vector_substraction(self.raw_tangents, raw_morph_tangents)
+        touched_polygons = np.zeros(len(self.blender_mesh.polygons), dtype=bool)
+        touched_polygons[self._loop_polygon_indices[moved[self._loop_vertex_indices]]] = True
+        one_ring = np.zeros(len(self.blender_mesh.vertices), dtype=bool)
+        one_ring[self._loop_vertex_indices[touched_polygons[self._loop_polygon_indices]]] = True
+        return one_ring[self._loop_vertex_indices]
 
-                self.raw_morph_tangent_deltas.append(morph_tangent_deltas)
+    def _sparse_morph_normals(self, raw_morph_normals:np.ndarray, affected:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Loops outside the moved region keep the basis normal, only the affected ones go through rounding and the transforms
+        affected_normals = np.round(raw_morph_normals[affected], self.options.normal_tangent_round_precision)
+        is_zero = ~affected_normals.any(axis=1)
+        affected_normals[is_zero, 2] = 1
+        self._post_normal_transform(affected_normals)
 
-            self.gathered.add(Primitive.GatheredData.MORPHTANGENTS)
+        morph_normals = self.raw_normals.copy()
+        morph_normals[affected] = affected_normals
+
+        morph_normal_deltas = np.zeros(morph_normals.shape)
+        morph_normal_deltas[affected] = utils_math.bounded_vector_substraction(self.raw_normals[affected], affected_normals)
+        return morph_normals, morph_normal_deltas
+
+    def _calculate_morph_tangents(self, raw_morph_normals:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Tangents only turn where the normal did, an unchanged normal gives an identity rotation and a zero delta
+        changed = np.any(raw_morph_normals != self.raw_normals, axis=1)
+
+        rotated = self.raw_tangents[changed]
+        utils_math.rotate_tangents(self.raw_normals[changed], raw_morph_normals[changed], rotated, out=rotated)
+
+        raw_morph_tangents = self.raw_tangents.copy()
+        raw_morph_tangents[changed] = rotated
+
+        # For DirectX compression format
+        morph_tangent_deltas = np.zeros(raw_morph_tangents.shape)
+        morph_tangent_deltas[changed] = self.raw_bitangent_signs[changed, np.newaxis] * utils_math.bounded_vector_substraction(self.raw_tangents[changed], raw_morph_tangents[changed])
+
+        return raw_morph_tangents, morph_tangent_deltas
+
+    def _calculate_morph_tangents_many(self, raw_morph_normals_list:list[np.ndarray]) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Array work only, safe to spread over threads
+        if len(raw_morph_normals_list) <= 1:
+            return [self._calculate_morph_tangents(raw_morph_normals) for raw_morph_normals in raw_morph_normals_list]
+        with ThreadPoolExecutor(max_workers=min(len(raw_morph_normals_list), os.cpu_count() or 1)) as executor:
+            return list(executor.map(self._calculate_morph_tangents, raw_morph_normals_list))
+
+    @timer
+    def stream_morphs(self, output, chunk_size:int = 0):
+        '''
+            Gathers the shape keys chunk_size at a time (options.morph_chunk_size by default) and hands every chunk over
+            once converted to atomic vertices, so only one chunk of keys is held instead of every key at once.
+            output is either a MorphCodec.MorphWriter or a dict of preallocated (num shape keys, num atomic vertices, 3)
+            float32 arrays for 'deltaPositions', 'targetColors', 'deltaNormals' and 'deltaTangents'.
+        '''
+        if not self.options.gather_morph_data:
+            raise MorphUncalculatedException("Primitive.stream_morphs() called without gather_morph_data option set to True")
+        if Primitive.GatheredData.TANGENTS not in self.gathered:
+            raise UngatheredException("Primitive.stream_morphs() called without gather_tangents option set to True")
+
+        chunk_size = chunk_size or self.options.morph_chunk_size or len(self.key_blocks)
+        num_verts = len(self.atomic_vertices)
+        vertex_ids = self.atomic_vertices['vertex_index']
+        morph_target_colors = utils_morph_attrs.MorphTargetColors()
+
+        for start in range(0, len(self.key_blocks), chunk_size):
+            key_blocks = self.key_blocks[start:start + chunk_size]
+            if isinstance(output, dict):
+                chunk = {name: output[name][start:start + len(key_blocks)] for name in _morph_streams}
+            else:
+                chunk = {name: np.empty((len(key_blocks), num_verts, 3), dtype=np.float32) for name in _morph_streams}
+
+            chunk_morph_normals = []
+            for i, (key_block, raw_split_normals) in enumerate(zip(key_blocks, self._morph_split_normals(key_blocks))):
+                _, raw_morph_position_deltas = self._gather_morph_positions(key_block)
+                chunk['deltaPositions'][i] = raw_morph_position_deltas[vertex_ids]
+
+                raw_morph_normals, raw_morph_normal_deltas = self._gather_morph_normals(key_block, raw_split_normals)
+                chunk['deltaNormals'][i] = raw_morph_normal_deltas[self.atomic_to_loop_id]
+                chunk_morph_normals.append(raw_morph_normals)
+
+                chunk['targetColors'][i] = self._gather_morph_target_colors(key_block, morph_target_colors)[self.atomic_to_loop_id] * 192
+
+            for i, (_, morph_tangent_deltas) in enumerate(self._calculate_morph_tangents_many(chunk_morph_normals)):
+                chunk['deltaTangents'][i] = morph_tangent_deltas[self.atomic_to_loop_id]
+
+            if not isinstance(output, dict):
+                output.write_keys(chunk['deltaPositions'], chunk['targetColors'], chunk['deltaNormals'], chunk['deltaTangents'])
+
+            print(f"Primitive.stream_morphs() {start + len(key_blocks)}/{len(self.key_blocks)} shape keys written")
 
     def _post_vertex_transform(self, vertices:np.ndarray) -> None:
         # Potentially rotations and flips
@@ -677,17 +1202,18 @@ class Primitive():
         self.normals[mask] = new_normals
 
         # Correct tangent vectors
-        batch_rot = utils_math.batch_rotation_matrices(old_normals, new_normals)
-        self.tangents[mask] = np.einsum('ijk,ik->ij', batch_rot, self.tangents[mask])
+        self.tangents[mask] = utils_math.rotate_tangents(old_normals, new_normals, self.tangents[mask])
     
     def post_change_morph_normals(self, new_morph_normals, morph_index, mask):
-        old_normals = self.morph_normals[morph_index][mask]
-        self.morph_normals[morph_index][mask] = new_morph_normals
-        self.morph_normal_deltas[morph_index][mask] = utils_math.bounded_vector_substraction(self.normals[mask], new_morph_normals)
+        '''
+            morph_index and mask are either one shape key and a vertex mask, or equally long (shape key, vertex) index pairs
+        '''
+        old_normals = self.morph_normals[morph_index, mask]
+        self.morph_normals[morph_index, mask] = new_morph_normals
+        self.morph_normal_deltas[morph_index, mask] = utils_math.bounded_vector_substraction(self.normals[mask], new_morph_normals)
         # Correct tangent vecto
-        batch_rot = utils_math.batch_rotation_matrices(old_normals, new_morph_normals)
-        self.morph_tangents[morph_index][mask] = np.einsum('ijk,ik->ij', batch_rot, self.morph_tangents[morph_index][mask])
-        self.morph_tangent_deltas[morph_index][mask] = self.bitangent_sign[mask, np.newaxis] * utils_math.bounded_vector_substraction(self.tangents[mask], self.morph_tangents[morph_index][mask])
+        self.morph_tangents[morph_index, mask] = utils_math.rotate_tangents(old_normals, new_morph_normals, self.morph_tangents[morph_index, mask])
+        self.morph_tangent_deltas[morph_index, mask] = self.bitangent_sign[mask, np.newaxis] * utils_math.bounded_vector_substraction(self.tangents[mask], self.morph_tangents[morph_index, mask])
 
     @timer
     def to_mesh_json_dict(self):
@@ -705,7 +1231,7 @@ class Primitive():
             "uv_coords": self.uv.tolist(),
             "vertex_color": self.colors.tolist() if self.gather_color_data else [],
             "vertex_group_names": self.vertex_weights_data["vertex_group_names"],
-            "vertex_weights": self.vertex_weights_data["vertex_weights"],
+            "vertex_weights": self.vertex_weight_lists(),
             "smooth_group": [],
             "tangents": [list(t) + [3 if f < 0 else 0] for t, f in zip(self.tangents.tolist(), self.bitangent_sign.tolist())],
         }
@@ -720,6 +1246,13 @@ class Primitive():
             raise UngatheredException("Primitive.to_mesh_numpy_dict() called without gather_tangents option set to True")
             return None
 
+        weight_bones = self.vertex_weights_data["vertex_weight_bones"]
+        weight_values = self.vertex_weights_data["vertex_weight_values"]
+        if weight_bones.size == 0:
+            weight_bones = weight_values = None
+        else:
+            weight_bones = np.ascontiguousarray(weight_bones)
+            weight_values = np.ascontiguousarray(weight_values)
 
         data_matrices = {
             "positions_raw": self.positions,# np.float32
@@ -729,14 +1262,19 @@ class Primitive():
             "vertex_color": self.colors if self.gather_color_data else None, # np.float32
             "tangents": self.tangents, # np.float32
             "bitangent_signs": self.bitangent_sign, # np.int32
-            "uv_coords_2": self.uv_2 if self.options.secondary_uv_layer_index != -1 else None # np.float32
+            "uv_coords_2": self.uv_2 if self.options.secondary_uv_layer_index != -1 else None, # np.float32
+            "vertex_weight_bones": weight_bones, # np.uint16
+            "vertex_weight_values": weight_values, # np.uint16
+            "lods": self.lods, # [np.int64], written by MeshCodec.write_lods()
+            "meshlets": self.meshlets, # np.uint32, from build_meshlets()
+            "culldata": self.culldata, # np.float32, from build_meshlets()
         }
         data = {
             "max_border": self.options.max_border,
             "num_verts": len(self.atomic_vertices),
             "num_indices": len(self.triangles),
+            "num_weightsPerVertex": weight_bones.shape[1] if weight_bones is not None else 0,
             "vertex_group_names": self.vertex_weights_data["vertex_group_names"],
-            "vertex_weights": self.vertex_weights_data["vertex_weights"],
             "ptr_positions": ctypes.addressof(self.positions.ctypes.data_as(ctypes.POINTER(ctypes.c_float)).contents), # np.float32
             "ptr_indices": ctypes.addressof(self.triangles.ctypes.data_as(ctypes.POINTER(ctypes.c_int64)).contents), # np.int64
             "ptr_normals": ctypes.addressof(self.normals.ctypes.data_as(ctypes.POINTER(ctypes.c_float)).contents), # np.float32
@@ -745,6 +1283,8 @@ class Primitive():
             "ptr_color": ctypes.addressof(self.colors.ctypes.data_as(ctypes.POINTER(ctypes.c_float)).contents) if self.gather_color_data else 0, # np.float32
             "ptr_tangents": ctypes.addressof(self.tangents.ctypes.data_as(ctypes.POINTER(ctypes.c_float)).contents), # np.float32
             "ptr_bitangent_signs": ctypes.addressof(self.bitangent_sign.ctypes.data_as(ctypes.POINTER(ctypes.c_int32)).contents), # np.int32
+            "ptr_weight_bones": ctypes.addressof(weight_bones.ctypes.data_as(ctypes.POINTER(ctypes.c_uint16)).contents) if weight_bones is not None else 0, # np.uint16
+            "ptr_weight_values": ctypes.addressof(weight_values.ctypes.data_as(ctypes.POINTER(ctypes.c_uint16)).contents) if weight_values is not None else 0, # np.uint16
         }
 
         print("ptr_positions", data["ptr_positions"])
@@ -766,6 +1306,36 @@ class Primitive():
         }
         return data
     
+    @timer
+    def to_sparse_morphs(self, epsilon:float = MorphCodec.DELTA_THRESHOLD) -> MorphCodec.SparseMorphs | MorphCodec.EncodedMorphs:
+        '''
+            Morph data of the atomic vertices each shape key moves by more than epsilon, without building the dense morph arrays.
+            Reads the gathered raw data, edits made through post_change_morph_normals() are not seen.
+            Quantized primitives return their EncodedMorphs instead.
+        '''
+        if self.encoded_morphs is not None:
+            return self.encoded_morphs
+        if not self.options.gather_morph_data:
+            raise MorphUncalculatedException("Primitive.to_sparse_morphs() called without gather_morph_data option set to True")
+        if Primitive.GatheredData.MORPHTANGENTS not in self.gathered:
+            raise UngatheredException("Primitive.to_sparse_morphs() called without gather_tangents option set to True")
+
+        vertex_ids = self.atomic_vertices['vertex_index']
+        indices, delta_positions, target_colors, delta_normals, delta_tangents = [], [], [], [], []
+        for k in range(len(self.shapeKeys)):
+            # Which vertices move is decided per mesh vertex, then spread to the atomic vertices sharing it
+            moved = np.any(np.abs(self.raw_morph_position_deltas[k]) > epsilon, axis=1)
+            ids = np.flatnonzero(moved[vertex_ids])
+            loops = self.atomic_to_loop_id[ids]
+
+            indices.append(ids)
+            delta_positions.append(self.raw_morph_position_deltas[k][vertex_ids[ids]].astype(np.float32))
+            target_colors.append(np.asarray(self.raw_morph_target_colors[k][loops], dtype=np.float32) * 192)
+            delta_normals.append(np.asarray(self.raw_morph_normal_deltas[k][loops], dtype=np.float32))
+            delta_tangents.append(np.asarray(self.raw_morph_tangent_deltas[k][loops], dtype=np.float32))
+
+        return MorphCodec.SparseMorphs(len(self.atomic_vertices), self.shapeKeys, indices, delta_positions, target_colors, delta_normals, delta_tangents)
+
     @timer
     def to_morph_numpy_dict(self):
         if not self.options.gather_morph_data:
@@ -775,6 +1345,9 @@ class Primitive():
             raise UngatheredException("Primitive.to_morph_numpy_dict() called without gather_tangents option set to True")
             return None
 
+        if self.encoded_morphs is not None:
+            return self.encoded_morphs.to_sparse().to_dense()
+
         data = {
             "numVertices": len(self.atomic_vertices),
             "shapeKeys": self.shapeKeys,
@@ -785,6 +1358,201 @@ class Primitive():
         }
         return data
 
+# Arrays stream_morphs() fills, named as in to_morph_numpy_dict()
+_morph_streams = ('deltaPositions', 'targetColors', 'deltaNormals', 'deltaTangents')
+
+# data_type: (foreach_get property, components, dtype), attributes of any other type make a mesh uncacheable
+_attribute_layouts = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, np.bool_),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'INT16_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+def _hash_foreach(h, collection, prop:str, components:int, dtype) -> None:
+    buffer = np.empty(len(collection) * components, dtype=dtype)
+    collection.foreach_get(prop, buffer)
+    h.update(buffer.tobytes())
+
+def MeshContentHash(blender_object:bpy.types.Object) -> bytes | None:
+    '''
+        Hash of every buffer Primitive.gather() reads from the object, None if the mesh holds data that cannot be hashed
+    '''
+    mesh:bpy.types.Mesh = blender_object.data
+    h = hashlib.blake2b(digest_size=16)
+
+    h.update(np.array(blender_object.matrix_world, dtype=np.float32).tobytes())
+    for m in blender_object.modifiers:
+        h.update(f"{m.type}:{m.name}:{m.object.name if m.type == 'ARMATURE' and m.object else ''}".encode('utf-8'))
+        if m.type == 'ARMATURE' and m.object is not None:
+            h.update(np.array(m.object.matrix_world, dtype=np.float32).tobytes())
+
+    _hash_foreach(h, mesh.vertices, 'co', 3, np.float32)
+    _hash_foreach(h, mesh.edges, 'vertices', 2, np.int32)
+    _hash_foreach(h, mesh.loops, 'vertex_index', 1, np.int32)
+    _hash_foreach(h, mesh.polygons, 'loop_start', 1, np.int32)
+    _hash_foreach(h, mesh.polygons, 'loop_total', 1, np.int32)
+    _hash_foreach(h, mesh.polygons, 'use_smooth', 1, np.bool_)
+    # Auto smooth and sharp edges decide the split normals, and with them the atomics and tangents
+    _hash_foreach(h, mesh.edges, 'use_edge_sharp', 1, np.bool_)
+    h.update(f"auto_smooth:{mesh.use_auto_smooth}:{mesh.auto_smooth_angle}".encode('utf-8'))
+    # Split normals cover custom normals and auto smooth, loop normals are only valid once computed
+    mesh.calc_normals_split()
+    _hash_foreach(h, mesh.loops, 'normal', 3, np.float32)
+
+    h.update(f"uv:{mesh.uv_layers.active_index}:color:{mesh.color_attributes.render_color_index}".encode('utf-8'))
+    for uv_layer in mesh.uv_layers:
+        h.update(uv_layer.name.encode('utf-8'))
+        _hash_foreach(h, uv_layer.data, 'uv', 2, np.float32)
+
+    for attribute in mesh.attributes:
+        layout = _attribute_layouts.get(attribute.data_type)
+        if layout is None:
+            return None
+        h.update(f"{attribute.name}:{attribute.domain}:{attribute.data_type}".encode('utf-8'))
+        _hash_foreach(h, attribute.data, *layout)
+
+    if mesh.shape_keys:
+        for key_block in mesh.shape_keys.key_blocks:
+            h.update(f"{key_block.name}:{key_block.mute}:{key_block.relative_key.name}".encode('utf-8'))
+            _hash_foreach(h, key_block.data, 'co', 3, np.float32)
+
+    h.update("\0".join(vg.name for vg in blender_object.vertex_groups).encode('utf-8'))
+    if blender_object.vertex_groups:
+        vertices = mesh.vertices
+        counts = np.fromiter((len(v.groups) for v in vertices), dtype=np.int64, count=len(vertices))
+        entries = np.fromiter(
+            ((g.group, g.weight) for v in vertices for g in v.groups),
+            dtype=[('group', np.int64), ('weight', np.float32)],
+            count=int(counts.sum())
+        )
+        h.update(counts.tobytes())
+        h.update(entries.tobytes())
+
+    return h.digest()
+
+# Only written by the morph export, a primitive gathered with or without them serves every mesh export
+_morph_options = ('gather_morph_data', 'morph_chunk_size', 'quantize_morph_data')
+# Only change what the mesh export writes, the atomics, triangles and morphs gathered are the same for any value
+_mesh_options = (
+    'max_border', 'gather_weights_data', 'weight_cutoff_threshold', 'max_weights_per_vertex', 'prune_empty_vertex_groups',
+    'vertex_group_merge_source', 'vertex_group_merge_target', 'vertex_group_ignore',
+    'partition_oversized', 'lod_ratios', 'lod_weight_tolerance'
+)
+
+def _options_key(options:Primitive.Options, names = None, excluded = ()) -> tuple:
+    return tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(vars(options).items())
+        if (names is None or name in names) and name not in excluded
+    )
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, MorphCodec.EncodedMorphs):
+        return _nbytes(vars(value))
+    return 0
+
+class PrimitiveCache():
+    '''
+        LRU cache of gathered primitives keyed by MeshContentHash and the gather options, capped by the bytes of their arrays.
+        Cached primitives are shared, callers must not modify them in place.
+    '''
+    def __init__(self, max_bytes:int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries:OrderedDict[tuple, tuple[Primitive, bool, tuple | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, blender_object:bpy.types.Object, options:Primitive.Options) -> tuple | None:
+        '''
+            Returns (content hash, gather options, mesh options). Entries are stored under the first two,
+            the mesh options are taken before gather() can change them and only compared by mesh exports.
+        '''
+        content_hash = MeshContentHash(blender_object)
+        if content_hash is None:
+            return None
+        return (content_hash, _options_key(options, excluded=_morph_options + _mesh_options), _options_key(options, names=_mesh_options))
+
+    def get(self, key:tuple | None, with_morphs:bool = False, mesh_export:bool = True) -> Primitive | None:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key[:2])
+            if entry is None or (with_morphs and not entry[1]):
+                return None
+            # Morph exports take any entry of the same geometry
+            if mesh_export and entry[2] != key[2]:
+                return None
+            self._entries.move_to_end(key[:2])
+            return entry[0]
+
+    def put(self, key:tuple | None, primitive:Primitive, with_morphs:bool = False, mesh_export:bool = True) -> None:
+        if key is None:
+            return
+        # The triangulated copy it was gathered from is deleted by the caller, only the arrays stay valid
+        primitive.blender_object = None
+        primitive.blender_mesh = None
+        primitive.key_blocks = []
+        primitive.uv_layer = None
+        primitive.second_uv_layer = None
+        primitive.armature = None
+        with self._lock:
+            # A morph export gathers with default mesh options, its entry must not serve mesh exports
+            self._entries[key[:2]] = (primitive, with_morphs, key[2] if mesh_export else None)
+            self._entries.move_to_end(key[:2])
+            self._evict()
+
+    def _evict(self) -> None:
+        # Arrays are measured on every eviction pass, cached properties grow primitives after they are stored
+        sizes = {key: _nbytes(vars(primitive)) for key, (primitive, _, _) in self._entries.items()}
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            total -= sizes[key]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(_nbytes(vars(primitive)) for primitive, _, _ in self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+primitive_cache = PrimitiveCache()
+
+def NeedsTriangulatedCopy(blender_object:bpy.types.Object, options:Primitive.Options) -> bool:
+    '''
+        Primitives read triangles from loop_triangles, so the source mesh can be gathered as is.
+        Only Mesh.calc_tangents() is limited to tris and quads, meshes with ngons still need a triangulated copy for it.
+    '''
+    if not options.gather_tangents:
+        return False
+    mesh:bpy.types.Mesh = blender_object.data
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    return bool(np.any(loop_totals > 4))
+
+def SecondaryUVLayerIndex(blender_object:bpy.types.Object) -> int:
+    # The first uv layer that is not the active one, mesh and morph exports must pick the same to get the same atomics
+    uv_layers = blender_object.data.uv_layers
+    for i, uv_layer in enumerate(uv_layers):
+        if uv_layer != uv_layers.active:
+            return i
+    return -1
+
 def CheckForPrimitive(blender_object:bpy.types.Object, gather_tangents = True):
     # Mesh type
     if blender_object.type != 'MESH':
@@ -800,6 +1568,104 @@ def CheckForPrimitive(blender_object:bpy.types.Object, gather_tangents = True):
     
     return True, ""
 
+class SeamStitcher():
+    '''
+        Snaps primitives onto the open borders of reference primitives. One cKDTree holds the boundary vertices of all
+        references, so every stitch is a single distance gated query and one fancy indexed assignment per array.
+    '''
+    def __init__(self, references:list[Primitive], copy_range = 0.005):
+        for reference in references:
+            if Primitive.GatheredData.POSITION not in reference.gathered or Primitive.GatheredData.TRIANGLES not in reference.gathered:
+                raise UngatheredException("SeamStitcher() called with ungathered reference positions or triangles")
+
+        from scipy.spatial import cKDTree
+
+        self.references = references
+        self.copy_range = copy_range
+        boundaries = [_boundary_atomics(reference) for reference in references]
+        self.owners = np.repeat(np.arange(len(references)), [len(b) for b in boundaries])
+        self.atomic_ids = np.concatenate([np.zeros(0, dtype=np.int64)] + boundaries)
+        self.positions = self._boundary_values('positions')
+        self.tree = cKDTree(self.positions) if len(self.atomic_ids) > 0 else None
+        print(f"SeamStitcher() {len(self.atomic_ids)} boundary vertices from {len(references)} references")
+
+    def _boundary_values(self, name:str) -> np.ndarray:
+        # (B, 3) per atomic vertex array of every boundary vertex, taken from its own reference
+        result = np.zeros((len(self.atomic_ids), 3), dtype=np.float32)
+        for r, reference in enumerate(self.references):
+            rows = np.flatnonzero(self.owners == r)
+            result[rows] = getattr(reference, name)[self.atomic_ids[rows]]
+        return result
+
+    def query(self, primitive:Primitive) -> tuple[np.ndarray, np.ndarray]:
+        '''
+            (mask of the primitive's atomic vertices within copy_range of a boundary vertex, boundary vertex of each)
+        '''
+        if Primitive.GatheredData.POSITION not in primitive.gathered:
+            raise UngatheredException("SeamStitcher.query() called with ungathered positions")
+        if self.tree is None:
+            return np.zeros(len(primitive.atomic_vertices), dtype=bool), np.zeros(0, dtype=np.int64)
+        dists, hits = self.tree.query(primitive.positions, k=1, distance_upper_bound=self.copy_range, workers=-1)
+        mask = dists < self.copy_range
+        print("Snapped verts: ", np.count_nonzero(mask))
+        return mask, hits[mask]
+
+    def snap_positions(self, primitive:Primitive, lerp_coeff = 1.0):
+        mask, hits = self.query(primitive)
+        primitive.positions[mask] = self.positions[hits] * lerp_coeff + primitive.positions[mask] * (1 - lerp_coeff)
+
+    def copy_normals(self, primitive:Primitive, lerp_coeff = 1.0):
+        if Primitive.GatheredData.NORMALS not in primitive.gathered or any(Primitive.GatheredData.NORMALS not in r.gathered for r in self.references):
+            raise UngatheredException("SeamStitcher.copy_normals() called with ungathered normals")
+        mask, hits = self.query(primitive)
+        primitive.post_change_normals(self._boundary_values('normals')[hits] * lerp_coeff + primitive.normals[mask] * (1 - lerp_coeff), mask)
+
+    def copy_morph_normals(self, primitive:Primitive, snap_delta_positions = False, lerp_coeff = 1.0, lerp_coeff_delta_pos = 1.0):
+        '''
+            Copies the morph normals, and optionally position deltas, of every shape key the hit reference has under the same name.
+        '''
+        if Primitive.GatheredData.MORPHNORMALS not in primitive.gathered or any(Primitive.GatheredData.MORPHNORMALS not in r.gathered for r in self.references):
+            raise UngatheredException("SeamStitcher.copy_morph_normals() called with ungathered morph data")
+        if primitive.encoded_morphs is not None:
+            raise MorphUncalculatedException("SeamStitcher.copy_morph_normals() called on a primitive with quantized morph data")
+        mask, hits = self.query(primitive)
+        rows = np.flatnonzero(mask)
+        num_keys = len(primitive.shapeKeys)
+
+        # (key, boundary vertex) tables over the primitive's shape keys, filled from every reference that has the key
+        target_normals = np.zeros((num_keys, len(self.atomic_ids), 3), dtype=np.float32)
+        target_deltas = np.zeros((num_keys, len(self.atomic_ids), 3), dtype=np.float32)
+        available = np.zeros((num_keys, len(self.atomic_ids)), dtype=bool)
+        for r, reference in enumerate(self.references):
+            common = [(k, reference.shapeKeys.index(name)) for k, name in enumerate(primitive.shapeKeys) if name in reference.shapeKeys]
+            if not common:
+                continue
+            keys, reference_keys = np.array(common).T
+            boundary = np.flatnonzero(self.owners == r)
+            atomic_ids = self.atomic_ids[boundary]
+            target_normals[keys[:, np.newaxis], boundary] = reference.morph_normals[reference_keys[:, np.newaxis], atomic_ids]
+            if snap_delta_positions:
+                target_deltas[keys[:, np.newaxis], boundary] = reference.morph_position_deltas[reference_keys[:, np.newaxis], atomic_ids]
+            available[keys[:, np.newaxis], boundary] = True
+
+        # Every (shape key, snapped vertex) pair at once
+        keys, pairs = np.nonzero(available[:, hits])
+        vertices, pair_hits = rows[pairs], hits[pairs]
+        print("Snapped morph normals: ", len(keys))
+
+        new_normals = target_normals[keys, pair_hits] * lerp_coeff + primitive.morph_normals[keys, vertices] * (1 - lerp_coeff)
+        primitive.post_change_morph_normals(new_normals, keys, vertices)
+        if snap_delta_positions:
+            primitive.morph_position_deltas[keys, vertices] = target_deltas[keys, pair_hits] * lerp_coeff_delta_pos + primitive.morph_position_deltas[keys, vertices] * (1 - lerp_coeff_delta_pos)
+
+def _boundary_atomics(primitive:Primitive) -> np.ndarray:
+    # Atomic vertices on an open border of the mesh, uv seams and sharp edges do not count
+    vertex_ids = primitive.atomic_vertices['vertex_index'].astype(np.int64)
+    if len(primitive.triangles) == 0:
+        return np.zeros(0, dtype=np.int64)
+    boundary = utils_simplify.boundary_vertices(vertex_ids[primitive.triangles.reshape(-1, 3)], int(vertex_ids.max()) + 1)
+    return np.flatnonzero(boundary[vertex_ids])
+
 @timer
 def SnapPositions(src_primitive:Primitive, tar_primitive:Primitive, copy_range = 0.005, lerp_coeff = 1.0):
     '''
@@ -808,71 +1674,15 @@ def SnapPositions(src_primitive:Primitive, tar_primitive:Primitive, copy_range =
         copy_range: Maximum distance to snap
         lerp_coeff: Coefficient for linear interpolation
     '''
-    if Primitive.GatheredData.POSITION not in src_primitive.gathered or Primitive.GatheredData.POSITION not in tar_primitive.gathered:
-        raise UngatheredException("SnapPositions() called with ungathered positions")
-
-    from scipy.spatial import cKDTree
-    
-    tar_kdtree: cKDTree = tar_primitive.KDTree
-
-    dists, indices = tar_kdtree.query(src_primitive.positions, k=1)
-    mask = dists < copy_range
-    indices = indices[mask]
-
-    print("Snapped verts: ", len(indices))
-
-    src_primitive.positions[mask] = tar_primitive.positions[indices] * lerp_coeff + src_primitive.positions[mask] * (1 - lerp_coeff)
+    SeamStitcher([tar_primitive], copy_range).snap_positions(src_primitive, lerp_coeff)
 
 @timer
 def CopyNormalsAtSeam(src_primitive:Primitive, tar_primitive:Primitive, copy_range = 0.005, lerp_coeff = 1.0):
-    if Primitive.GatheredData.POSITION not in src_primitive.gathered or Primitive.GatheredData.POSITION not in tar_primitive.gathered:
-        raise UngatheredException("CopyNormalsAtSeam() called with ungathered positions")
-    if Primitive.GatheredData.NORMALS not in src_primitive.gathered or Primitive.GatheredData.NORMALS not in tar_primitive.gathered:
-        raise UngatheredException("CopyNormalsAtSeam() called with ungathered normals")
-
-    from scipy.spatial import cKDTree
-
-    tar_kdtree: cKDTree = tar_primitive.KDTree
-
-    dists, indices = tar_kdtree.query(src_primitive.positions, k=1)
-    mask = dists < copy_range
-    indices = indices[mask]
-
-    print("Snapped verts: ", len(indices))
-
-    src_primitive.post_change_normals(tar_primitive.normals[indices] * lerp_coeff + src_primitive.normals[mask] * (1 - lerp_coeff), mask)
+    SeamStitcher([tar_primitive], copy_range).copy_normals(src_primitive, lerp_coeff)
 
 @timer
 def CopyMorphNormalsAtSeam(src_primitive:Primitive, tar_primitive:Primitive, copy_range = 0.005, snap_delta_positions = False, lerp_coeff = 1.0, lerp_coeff_delta_pos = 1.0):
-    if Primitive.GatheredData.POSITION not in src_primitive.gathered or Primitive.GatheredData.POSITION not in tar_primitive.gathered:
-        raise UngatheredException("CopyMorphNormalsAtSeam() called with ungathered positions")
-    if Primitive.GatheredData.MORPHNORMALS not in src_primitive.gathered or Primitive.GatheredData.MORPHNORMALS not in tar_primitive.gathered:
-        raise UngatheredException("CopyMorphNormalsAtSeam() called with ungathered morph data")
-    
-    from scipy.spatial import cKDTree
-
-    tar_kdtree: cKDTree = tar_primitive.KDTree
-
-    dists, indices = tar_kdtree.query(src_primitive.positions, k=1)
-    mask = dists < copy_range
-    indices = indices[mask]
-
-    print("Snapped verts: ", len(indices))
-
-    src_morphs = src_primitive.shapeKeys
-    tar_morphs = tar_primitive.shapeKeys
-
-    common_morphs = list(set(src_morphs) & set(tar_morphs))
-
-    print("Common morphs: ", common_morphs)
-
-    src_indices = [src_morphs.index(morph) for morph in common_morphs]
-    tar_indices = [tar_morphs.index(morph) for morph in common_morphs]
-
-    for s_m_id, t_m_id in zip(src_indices, tar_indices):
-        src_primitive.post_change_morph_normals(tar_primitive.morph_normals[t_m_id][indices] * lerp_coeff + src_primitive.morph_normals[s_m_id][mask] * (1 - lerp_coeff), s_m_id, mask)
-        if snap_delta_positions:
-            src_primitive.morph_position_deltas[s_m_id][mask] = tar_primitive.morph_position_deltas[t_m_id][indices] * lerp_coeff_delta_pos + src_primitive.morph_position_deltas[s_m_id][mask] * (1 - lerp_coeff_delta_pos)
+    SeamStitcher([tar_primitive], copy_range).copy_morph_normals(src_primitive, snap_delta_positions, lerp_coeff, lerp_coeff_delta_pos)
 
 if __name__ == "__main__":
     import time
@@ -0,0 +1,198 @@
+'''
+Quadric error simplification for LOD index lists that share the vertex buffer of the full mesh.
+
+Every LOD is a triangle list over the existing vertices, so only half edge collapses are possible: a vertex u
+is folded into a neighbour v that keeps its position, at the cost of the summed quadrics of both evaluated at v
+(Garland and Heckbert, Surface Simplification Using Quadric Error Metrics, 1997).
+Collapses run in rounds: the removable vertices with the cheapest collapses pick their cheapest valid one, then an
+independent set of them, no two neighbours, collapses at once. Those collapses touch disjoint triangles,
+so they are checked against normal flips and non manifold folds independently.
+Locked vertices are never removed, only collapsed into. Boundary edges lock their vertices, which keeps uv and
+normal seams (edges where atomic vertices split) and open borders in place.
+'''
+import numpy as np
+
+# Faces turning further than this (cosine between old and new normal) reject the collapse
+_MAX_FLIP_COS = 0.2
+# Share of the removable vertices, cheapest first, that competes for collapses in one round
+_ROUND_SHARE = 0.25
+
+def _face_quadrics(positions:np.ndarray, triangles:np.ndarray) -> np.ndarray:
+    # Area weighted plane quadrics, (T, 4, 4)
+    corners = positions[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(normals, axis=1)
+    np.divide(normals, areas[:, np.newaxis], out=normals, where=areas[:, np.newaxis] > 0)
+    planes = np.hstack([normals, -np.einsum('ij,ij->i', normals, corners[:, 0])[:, np.newaxis]])
+    return planes[:, :, np.newaxis] * planes[:, np.newaxis, :] * (areas / 2)[:, np.newaxis, np.newaxis]
+
+def vertex_quadrics(positions:np.ndarray, triangles:np.ndarray) -> np.ndarray:
+    '''
+    (V, 3) positions and (T, 3) triangles -> (V, 4, 4) sum of the plane quadrics of every vertex's triangles.
+    '''
+    positions = np.asarray(positions, dtype=np.float64)
+    face = _face_quadrics(positions, triangles).reshape(-1, 16)
+    corners = triangles.ravel()
+    quadrics = np.stack([np.bincount(corners, weights=np.repeat(face[:, i], 3), minlength=len(positions)) for i in range(16)], axis=1)
+    return quadrics.reshape(-1, 4, 4)
+
+def boundary_vertices(triangles:np.ndarray, num_vertices:int) -> np.ndarray:
+    '''
+    (V,) mask of vertices on an edge that does not have exactly two triangles.
+    '''
+    edges = np.sort(np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2), axis=1).astype(np.int64)
+    keys, counts = np.unique(edges[:, 0] * num_vertices + edges[:, 1], return_counts=True)
+    odd = keys[counts != 2]
+    mask = np.zeros(num_vertices, dtype=bool)
+    mask[odd // num_vertices] = True
+    mask[odd % num_vertices] = True
+    return mask
+
+def weight_distance(bones:np.ndarray, weights:np.ndarray, a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    '''
+    L1 distance between the skin weights of vertices a and b, (V, K) bone ids and float weights, bones of either side
+    that the other lacks count in full.
+    '''
+    k = bones.shape[1]
+    pair_bones = np.hstack([bones[a], bones[b]]).astype(np.int64)
+    pair_weights = np.hstack([weights[a], -weights[b]]).astype(np.float64)
+    order = np.argsort(pair_bones, axis=1, kind='stable')
+    pair_bones = np.take_along_axis(pair_bones, order, axis=1).ravel()
+    pair_weights = np.take_along_axis(pair_weights, order, axis=1).ravel()
+
+    # Sum every run of one bone inside a row, then add up the absolute sums of the row
+    rows = np.repeat(np.arange(len(a)), 2 * k)
+    starts = np.flatnonzero(np.r_[True, (pair_bones[1:] != pair_bones[:-1]) | (rows[1:] != rows[:-1])])
+    sums = np.add.reduceat(pair_weights, starts) if len(starts) else np.zeros(0)
+    return np.bincount(rows[starts], weights=np.abs(sums), minlength=len(a))
+
+def _vertex_triangles(triangles:np.ndarray, num_vertices:int) -> tuple[np.ndarray, np.ndarray]:
+    corners = triangles.ravel()
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corners, minlength=num_vertices), out=indptr[1:])
+    return indptr, np.argsort(corners, kind='stable') // 3
+
+def _expand(indptr:np.ndarray, values:np.ndarray, rows:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # (owner index into rows, value) of every CSR entry of the given rows
+    counts = indptr[rows + 1] - indptr[rows]
+    owners = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, values[indptr[rows][owners] + offsets]
+
+def _valid_collapses(triangles:np.ndarray, positions:np.ndarray, u:np.ndarray, v:np.ndarray, edge_keys:np.ndarray, num_vertices:int) -> tuple[np.ndarray, np.ndarray]:
+    # (valid mask, triangles removed) of every half edge collapse u -> v
+    indptr, incident = _vertex_triangles(triangles, num_vertices)
+    owners, faces = _expand(indptr, incident, u)
+    corners = triangles[faces]
+    has_v = (corners == v[owners, np.newaxis]).any(axis=1)
+    removed = np.bincount(owners, weights=has_v, minlength=len(u)).astype(np.int64)
+
+    # Triangles that stay must not turn over once u moves onto v
+    kept = ~has_v
+    kept_owners, kept_corners = owners[kept], corners[kept]
+    moved = np.where(kept_corners == u[kept_owners, np.newaxis], v[kept_owners, np.newaxis], kept_corners)
+    before = positions[kept_corners]
+    after = positions[moved]
+    n0 = np.cross(before[:, 1] - before[:, 0], before[:, 2] - before[:, 0])
+    n1 = np.cross(after[:, 1] - after[:, 0], after[:, 2] - after[:, 0])
+    length_before = np.linalg.norm(n0, axis=1)
+    # Already degenerate triangles have no facing to keep
+    flipped = (np.einsum('ij,ij->i', n0, n1) <= _MAX_FLIP_COS * length_before * np.linalg.norm(n1, axis=1)) & (length_before > 0)
+    bad = np.bincount(kept_owners, weights=flipped, minlength=len(u)) > 0
+
+    # Link condition: u and v may only share the neighbours opposite the edge, one per removed triangle.
+    # u is never on a boundary, so the corner after u in each of its triangles lists every neighbour once
+    after_u = corners[np.arange(len(faces)), (np.argmax(corners == u[owners, np.newaxis], axis=1) + 1) % 3]
+    others = after_u != v[owners]
+    a, b = np.minimum(after_u, v[owners]), np.maximum(after_u, v[owners])
+    probe = a * num_vertices + b
+    found = np.searchsorted(edge_keys, probe)
+    shared = (edge_keys[np.minimum(found, len(edge_keys) - 1)] == probe) & others
+    common = np.bincount(owners, weights=shared, minlength=len(u)).astype(np.int64)
+
+    return ~bad & (common == removed) & (removed > 0), removed
+
+def simplify(triangles:np.ndarray, positions:np.ndarray, target_triangles:int, locked:np.ndarray | None = None, quadrics:np.ndarray | None = None, weights:tuple[np.ndarray, np.ndarray] | None = None, weight_tolerance:float = 0.1) -> np.ndarray:
+    '''
+    (T, 3) triangles -> (T', 3) triangles over the same vertices, T' <= target_triangles unless no valid collapse is left.
+    locked vertices stay, collapses between vertices whose skin weights differ by more than weight_tolerance (L1)
+    are skipped. Quadrics, if given, are updated in place, so a chain of LODs can continue from the previous one.
+    '''
+    positions = np.asarray(positions, dtype=np.float64)
+    num_vertices = len(positions)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if quadrics is None:
+        quadrics = vertex_quadrics(positions, triangles)
+    locked = boundary_vertices(triangles, num_vertices) | (np.zeros(num_vertices, dtype=bool) if locked is None else locked)
+    homogeneous = np.hstack([positions, np.ones((num_vertices, 1))])
+
+    rng = np.random.default_rng(0)
+    share = _ROUND_SHARE
+    while len(triangles) > target_triangles:
+        edges = np.sort(np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+        edge_keys = np.unique(edges[:, 0] * num_vertices + edges[:, 1])
+        edges = np.stack([edge_keys // num_vertices, edge_keys % num_vertices], axis=1)
+        u = np.concatenate([edges[:, 0], edges[:, 1]])
+        v = np.concatenate([edges[:, 1], edges[:, 0]])
+        keep = ~locked[u]
+        if weights is not None:
+            keep[keep] = weight_distance(*weights, u[keep], v[keep]) <= weight_tolerance
+        u, v = u[keep], v[keep]
+        if len(u) == 0:
+            break
+
+        # Only the vertices with the cheapest collapses take part in a round, greedy order at round granularity
+        cost = np.einsum('ij,ijk,ik->i', homogeneous[v], quadrics[u] + quadrics[v], homogeneous[v])
+        cheapest = np.full(num_vertices, np.inf)
+        np.minimum.at(cheapest, u, cost)
+        eligible = cheapest[u] <= np.quantile(cheapest[np.isfinite(cheapest)], share)
+        u, v, cost = u[eligible], v[eligible], cost[eligible]
+        valid, removed = _valid_collapses(triangles, positions, u, v, edge_keys, num_vertices)
+        u, v, cost, removed = u[valid], v[valid], cost[valid], removed[valid]
+
+        # Cheapest valid collapse of every vertex
+        order = np.lexsort((cost, u))
+        best = order[np.r_[True, u[order][1:] != u[order][:-1]]] if len(u) else order
+        u, v, cost, removed = u[best], v[best], cost[best], removed[best]
+
+        # Independent set: random priorities, every collapse outranking all its neighbours goes
+        priority = np.full(num_vertices, -1.0)
+        priority[u] = rng.random(len(u))
+        neighbour_priority = np.full(num_vertices, -1.0)
+        np.maximum.at(neighbour_priority, edges[:, 0], priority[edges[:, 1]])
+        np.maximum.at(neighbour_priority, edges[:, 1], priority[edges[:, 0]])
+        selected = np.flatnonzero(priority[u] > neighbour_priority[u])
+        if len(selected) == 0:
+            if share >= 1:
+                break
+            share = min(1.0, share * 2)
+            continue
+        share = _ROUND_SHARE
+
+        # No more than the target needs, cheapest first
+        selected = selected[np.argsort(cost[selected], kind='stable')]
+        enough = np.searchsorted(np.cumsum(removed[selected]), len(triangles) - target_triangles) + 1
+        selected = selected[:enough]
+
+        np.add.at(quadrics, v[selected], quadrics[u[selected]])
+        remap = np.arange(num_vertices)
+        remap[u[selected]] = v[selected]
+        triangles = remap[triangles]
+        triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 2] != triangles[:, 0])]
+
+    return triangles
+
+def lod_chain(triangles:np.ndarray, positions:np.ndarray, ratios:list[float], locked:np.ndarray | None = None, weights:tuple[np.ndarray, np.ndarray] | None = None, weight_tolerance:float = 0.1) -> list[np.ndarray]:
+    '''
+    One (T_i, 3) triangle list per ratio of the original triangle count, each simplified from the previous one.
+    '''
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    quadrics = vertex_quadrics(positions, triangles)
+    # Borders of the full mesh stay locked in every LOD, whatever the collapses do to the triangles
+    locked = boundary_vertices(triangles, len(positions)) | (np.zeros(len(positions), dtype=bool) if locked is None else locked)
+    lods = []
+    current = triangles
+    for ratio in sorted(ratios, reverse=True):
+        current = simplify(current, positions, int(len(triangles) * ratio), locked, quadrics, weights, weight_tolerance)
+        lods.append(current)
+    return lods
@@ -0,0 +1,156 @@
+'''
+Triangle and vertex reordering for the post transform vertex cache.
+
+tipsify() is the linear time reorder of Sander, Nehab and Barczak (Fast Triangle Reordering for Vertex
+Locality and Reduced Overdraw, 2007): fan out around one vertex at a time and move on to the most recently
+cached neighbour that still has triangles left. The points where it had to jump elsewhere split the order
+into clusters, overdraw_order() sorts those clusters so outward facing ones are drawn first.
+fetch_order() then renumbers vertices in order of first use, so vertex fetches walk memory forwards.
+cache_statistics() simulates a FIFO cache to report ACMR (misses per triangle) and ATVR (misses per vertex).
+'''
+import numpy as np
+
+def _vertex_triangles(triangles:np.ndarray, num_vertices:int) -> tuple[np.ndarray, np.ndarray]:
+    # CSR of the triangles around every vertex
+    corners = triangles.ravel()
+    counts = np.bincount(corners, minlength=num_vertices)
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, np.argsort(corners, kind='stable') // 3
+
+def cache_statistics(triangles:np.ndarray, num_vertices:int, cache_size:int = 16) -> tuple[float, float]:
+    '''
+    (T, 3) triangles -> (ACMR, ATVR) for a FIFO cache of cache_size entries.
+    '''
+    if len(triangles) == 0:
+        return 0.0, 0.0
+    # A vertex is cached while fewer than cache_size misses happened since it was loaded
+    loaded_at = [-cache_size - 1] * num_vertices
+    misses = 0
+    for v in triangles.ravel().tolist():
+        if misses - loaded_at[v] > cache_size:
+            loaded_at[v] = misses
+            misses += 1
+    used = np.count_nonzero(np.bincount(triangles.ravel(), minlength=num_vertices))
+    return float(misses / len(triangles)), float(misses / used)
+
+def tipsify(triangles:np.ndarray, num_vertices:int, cache_size:int = 16) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    (T, 3) triangles -> (triangle order, positions in that order where a new cluster starts).
+    '''
+    num_triangles = len(triangles)
+    if num_triangles == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    indptr, adjacency = _vertex_triangles(triangles, num_vertices)
+    indptr, adjacency = indptr.tolist(), adjacency.tolist()
+    corners = triangles.tolist()
+    live = np.diff(indptr).tolist()
+    cache_time = [0] * num_vertices
+    emitted = [False] * num_triangles
+    dead_end = []
+    order = []
+    boundaries = [0]
+
+    fanning = next((v for v in range(num_vertices) if live[v] > 0), -1)
+    timestamp = cache_size + 1
+    cursor = 0
+    while fanning >= 0:
+        candidates = []
+        for t in adjacency[indptr[fanning]:indptr[fanning + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(t)
+            for v in corners[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - cache_time[v] > cache_size:
+                    cache_time[v] = timestamp
+                    timestamp += 1
+
+        # Next fanning vertex: a candidate still in the cache after its remaining triangles are emitted, the oldest first
+        fanning, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = timestamp - cache_time[v] if timestamp - cache_time[v] + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    fanning, best = v, priority
+        if fanning >= 0:
+            continue
+
+        # Dead end, fall back to recently used vertices, then to the lowest vertex with triangles left
+        while dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fanning = v
+                break
+        else:
+            while cursor < num_vertices and live[cursor] == 0:
+                cursor += 1
+            fanning = cursor if cursor < num_vertices else -1
+        if fanning >= 0:
+            boundaries.append(len(order))
+
+    return np.array(order, dtype=np.int64), np.array(boundaries, dtype=np.int64)
+
+def _soft_boundaries(triangles:np.ndarray, boundaries:np.ndarray, num_vertices:int, cache_size:int, threshold:float) -> np.ndarray:
+    # Extra cluster splits wherever the current cluster, drawn from a cold cache, is already down to threshold ACMR.
+    # Clusters get reordered, so a cold cache is all one can count on at their start.
+    loaded_at = [-cache_size - 1] * num_vertices
+    hard = set(boundaries.tolist())
+    result = []
+    misses = cluster_start = 0
+    cluster_triangles = 0
+    for i, triangle in enumerate(triangles.tolist()):
+        if i in hard or (cluster_triangles > 0 and misses - cluster_start <= threshold * cluster_triangles):
+            result.append(i)
+            cluster_start, cluster_triangles = misses, 0
+        for v in triangle:
+            if loaded_at[v] < cluster_start or misses - loaded_at[v] > cache_size:
+                loaded_at[v] = misses
+                misses += 1
+        cluster_triangles += 1
+    return np.array(result, dtype=np.int64)
+
+def overdraw_order(triangles:np.ndarray, order:np.ndarray, boundaries:np.ndarray, positions:np.ndarray, cache_size:int = 16, threshold:float = 0.75) -> np.ndarray:
+    '''
+    Reorders the clusters of a tipsify() order so clusters facing away from the mesh center are drawn first,
+    they are the likeliest to occlude the rest. Clusters are split further where their ACMR falls under threshold,
+    lower thresholds keep longer clusters and more of the cache locality.
+    '''
+    if len(order) == 0:
+        return order
+    ordered = triangles[order]
+    starts = _soft_boundaries(ordered, boundaries, len(positions), cache_size, threshold)
+    cluster = np.zeros(len(order), dtype=np.int64)
+    cluster[starts[1:]] = 1
+    cluster = np.cumsum(cluster)
+    num_clusters = len(starts)
+
+    corners = np.asarray(positions, dtype=np.float64)[ordered]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(face_normals, axis=1)
+    centroids = corners.mean(axis=1)
+
+    def cluster_sum(values):
+        return np.stack([np.bincount(cluster, weights=values[:, i], minlength=num_clusters) for i in range(3)], axis=1)
+
+    weights = np.bincount(cluster, weights=areas, minlength=num_clusters)
+    cluster_centroids = cluster_sum(centroids * areas[:, np.newaxis]) / np.maximum(weights, 1e-30)[:, np.newaxis]
+    mesh_centroid = (centroids * areas[:, np.newaxis]).sum(axis=0) / max(areas.sum(), 1e-30)
+    # Area weighted sum of unit normals is the plain sum of the cross products
+    facing = np.einsum('ij,ij->i', cluster_centroids - mesh_centroid, cluster_sum(face_normals))
+
+    cluster_order = np.argsort(-facing, kind='stable')
+    return order[np.argsort(np.argsort(cluster_order)[cluster], kind='stable')]
+
+def fetch_order(triangles:np.ndarray, num_vertices:int) -> np.ndarray:
+    '''
+    New vertex order: vertices by first use in triangles, unreferenced vertices last in their old order.
+    '''
+    used, first = np.unique(triangles.ravel(), return_index=True)
+    used = used[np.argsort(first, kind='stable')]
+    unused = np.setdiff1d(np.arange(num_vertices), used, assume_unique=True)
+    return np.concatenate([used, unused]).astype(np.int64)
@@ -0,0 +1,91 @@
+'''
+Hash based welding of per loop attribute records.
+
+Every attribute is quantized to what the .mesh format keeps of it (uv as half floats, normals as DEC3N,
+colors as uint8, positions through the exact vertex index), packed into fixed width integer keys and
+deduplicated by a 64-bit hash of the key rows. Loops that only differ below the stored precision end up
+as one atomic vertex, which is what the file would contain anyway.
+With a tolerance, uvs and normals are snapped to a coarser grid first so near identical loops weld too.
+'''
+import numpy as np
+
+import MeshCodec
+
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_HASH_MIX = np.uint64(0xBF58476D1CE4E5B9)
+
+def _half_bits(values: np.ndarray) -> np.ndarray:
+    # + 0.0 folds -0.0 into 0.0 so both produce the same key, truncated like the writers store uvs
+    return MeshCodec.float_to_half(np.asarray(values, dtype=np.float32) + np.float32(0.0)).astype(np.uint32)
+
+def _grid_cells(values: np.ndarray, tolerance: float) -> np.ndarray:
+    return np.floor(np.asarray(values, dtype=np.float64) / tolerance + 0.5).astype(np.int64).astype(np.uint32)
+
+def atomic_keys(atomics: np.ndarray, uv_tolerance: float = 0.0, normal_tolerance: float = 0.0) -> np.ndarray:
+    '''
+    Structured atomic records (see Primitive._atomic_attributes) -> (N, W) uint64 key rows.
+    A tolerance of 0 keys uvs and normals at stored precision.
+    '''
+    columns = [atomics['vertex_index'].astype(np.uint32)]
+
+    for u, v in (('uv_x', 'uv_y'), ('uv_x_2', 'uv_y_2')):
+        if uv_tolerance > 0:
+            columns += [_grid_cells(atomics[u], uv_tolerance), _grid_cells(atomics[v], uv_tolerance)]
+        else:
+            columns.append(_half_bits(atomics[u]) | (_half_bits(atomics[v]) << 16))
+
+    normals = np.stack([atomics['normal_x'], atomics['normal_y'], atomics['normal_z']], axis=1).astype(np.float32)
+    # The exporter normalizes before encoding, key on what it will write
+    norms = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, norms, out=normals, where=norms != 0)
+    if normal_tolerance > 0:
+        columns += [_grid_cells(normals[:, i], normal_tolerance) for i in range(3)]
+    else:
+        columns.append(MeshCodec.encode_dec3n(normals, 0).astype(np.uint32))
+
+    colors = np.stack([atomics['color_r'], atomics['color_g'], atomics['color_b'], atomics['color_a']], axis=1)
+    colors = (np.clip(colors, 0, 1) * 255).astype(np.uint8)
+    columns.append(np.ascontiguousarray(colors).view(np.uint32).ravel())
+
+    if len(columns) % 2 == 1:
+        columns.append(np.zeros(len(atomics), dtype=np.uint32))
+    return np.ascontiguousarray(np.stack(columns, axis=1)).view(np.uint64)
+
+def hash_rows(keys: np.ndarray) -> np.ndarray:
+    '''
+    (N, W) uint64 -> (N,) uint64 hashes.
+    '''
+    hashes = np.full(len(keys), 0x243F6A8885A308D3, dtype=np.uint64)
+    for i in range(keys.shape[1]):
+        hashes ^= keys[:, i]
+        hashes *= _HASH_MULTIPLIER
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= _HASH_MIX
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+def weld(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    (N, W) uint64 key rows -> (representatives, inverse).
+    representatives holds the first row of every distinct key in order of first appearance,
+    inverse maps every row to its position in representatives.
+    '''
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    hashes = hash_rows(keys)
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+
+    # Distinct keys sharing a hash would be merged, fall back to comparing full rows in that case
+    if np.any(keys != keys[first[inverse]]):
+        print("utils_weld.weld() hash collision detected, deduplicating on full keys.")
+        rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+
+    # Keep loop order instead of hash order, neighbouring loops stay neighbouring vertices
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse]
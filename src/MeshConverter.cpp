@@ -38,7 +38,9 @@ uint32_t ExportMeshNumpy(const char* json_data,
 	const float* ptr_uv2,
 	const float* ptr_color,
 	const float* ptr_tangents,
-	const int32_t* ptr_bitangent_signs
+	const int32_t* ptr_bitangent_signs,
+	const uint16_t* ptr_weight_bones,
+	const uint16_t* ptr_weight_values
 ){
 	mesh::MeshIO reader;
 
@@ -54,6 +56,52 @@ uint32_t ExportMeshNumpy(const char* json_data,
 		ptr_color,
 		ptr_tangents,
 		ptr_bitangent_signs,
+		ptr_weight_bones,
+		ptr_weight_values,
+		opt
+	)) {
+		std::cerr << "Failed to load mesh from blender." << std::endl;
+		return 2; // Return an error code
+	}
+
+	if (!reader.Serialize(output_file)) {
+		std::cerr << "Failed to save mesh to file." << std::endl;
+		return 3; // Return an error code
+	}
+	std::cout << "Mesh loaded from blender and serialized to " << output_file << std::endl;
+
+	return 0;
+}
+
+uint32_t ExportMeshNumpyEx(const mesh::mesh_export_header* header,
+	const char* output_file,
+	const float* ptr_positions,
+	const int64_t* ptr_indices,
+	const float* ptr_normals,
+	const float* ptr_uv1,
+	const float* ptr_uv2,
+	const float* ptr_color,
+	const float* ptr_tangents,
+	const int32_t* ptr_bitangent_signs,
+	const uint16_t* ptr_weight_bones,
+	const uint16_t* ptr_weight_values
+) {
+	mesh::MeshIO reader;
+
+	uint32_t opt = mesh::MeshIO::Options::GenerateTangentIfNA;
+	opt |= mesh::MeshIO::Options::NormalizeWeight;
+
+	if (!reader.LoadFromNumpy(*header,
+		ptr_positions,
+		ptr_indices,
+		ptr_normals,
+		ptr_uv1,
+		ptr_uv2,
+		ptr_color,
+		ptr_tangents,
+		ptr_bitangent_signs,
+		ptr_weight_bones,
+		ptr_weight_values,
 		opt
 	)) {
 		std::cerr << "Failed to load mesh from blender." << std::endl;
@@ -121,6 +169,43 @@ uint32_t ExportMorphNumpy(const char* json_data,
 	return 0;
 }
 
+uint32_t ExportMorphNumpyEx(const morph::morph_header* header,
+	const char* names,
+	const char* output_file,
+	const float* delta_positions,
+	const float* target_colors,
+	const float* delta_normals,
+	const float* delta_tangents
+)
+{
+	// Name table holds num_shape_keys null terminated names back to back
+	std::vector<std::string> morph_names;
+	const char* name = names;
+	for (uint32_t i = 0; i < header->num_shape_keys; i++) {
+		morph_names.emplace_back(name);
+		name += morph_names.back().size() + 1;
+	}
+
+	morph::MorphIO morphReader;
+
+	auto start_time = clock();
+	if (!morphReader.LoadFromNumpy(header->num_vertices, morph_names, delta_positions, target_colors, delta_normals, delta_tangents, morph::MorphIO::Options::None)) {
+		std::cerr << "Failed to load morph from blender." << std::endl;
+		return 8; // Return an error code
+	}
+	auto end_time = clock();
+	std::cout << "Morph loaded from blender in " << (end_time - start_time) << "ms" << std::endl;
+
+	if (!morphReader.Serialize(output_file)) {
+		std::cerr << "Failed to save morph to file." << std::endl;
+		return 9; // Return an error code
+	}
+	auto end_time2 = clock();
+	std::cout << "Morph serialized to " << output_file << " in " << (end_time2 - end_time) << "ms" << std::endl;
+
+	return 0;
+}
+
 uint32_t ExportEmptyMorph(uint32_t n_verts, const char* output_file)
 {
 	// Equivalent to blenderToMorph
@@ -176,6 +261,17 @@ const char* ImportMeshHeader(const char* input_file) {
 	return utils::make_copy(json_header);
 }
 
+uint32_t ImportMeshHeaderEx(const char* input_file, mesh::mesh_header* header) {
+	std::string inputMesh(input_file);
+
+	if (!mesh::MeshIO::read_header(inputMesh, *header)) {
+		std::cerr << "Failed to load mesh from " << inputMesh << std::endl;
+		return 18; // Return an error code
+	}
+
+	return 0;
+}
+
 uint32_t ImportMeshNumpy(const char* input_file,
 	float* positions,
 	int64_t* indices,
@@ -205,6 +301,34 @@ uint32_t ImportMeshNumpy(const char* input_file,
 	return 0;
 }
 
+uint32_t ImportMeshNumpyEx(const char* input_file,
+	float* positions,
+	void* indices,
+	uint32_t index_byte_size,
+	float* normals,
+	float* uv1,
+	float* uv2,
+	float* colors,
+	float* tangents,
+	int32_t* bitangent_signs
+) {
+	std::string inputMesh(input_file);
+
+	mesh::MeshIO meshReader;
+
+	if (!meshReader.Deserialize(inputMesh)) {
+		std::cerr << "Failed to load mesh from " << inputMesh << std::endl;
+		return 18; // Return an error code
+	}
+
+	if (!meshReader.LoadToNumpy(positions, indices, index_byte_size, normals, uv1, uv2, colors, tangents, bitangent_signs)) {
+		std::cerr << "Failed to copy mesh into numpy buffers" << std::endl;
+		return 99;
+	}
+
+	return 0;
+}
+
 const char* ImportMorph(const char* input_file)
 {
 	std::string inputMorph(input_file);
@@ -240,6 +364,27 @@ const char* ImportMorphHeader(const char* input_file) {
 	return utils::make_copy(json_header);
 }
 
+const uint8_t* ImportMorphHeaderEx(const char* input_file, morph::morph_header* header) {
+	std::string inputMorph(input_file);
+
+	std::vector<std::string> morph_names;
+	if (!morph::MorphIO::read_header(inputMorph, *header, morph_names)) {
+		std::cerr << "Failed to load morph from " << inputMorph << std::endl;
+		return nullptr;
+	}
+
+	// Released by the caller through FreeBuffer
+	uint8_t* names = new uint8_t[header->names_size + 1];
+	size_t offset = 0;
+	for (auto& name : morph_names) {
+		std::memcpy(names + offset, name.c_str(), name.size() + 1);
+		offset += name.size() + 1;
+	}
+	names[offset] = 0;
+
+	return names;
+}
+
 uint32_t ImportMorphNumpy(const char* input_file,
 	float* delta_positions,
 	float* target_colors,
@@ -345,20 +490,20 @@ uint32_t EditNifBSGeometries(const char* base_nif_path, const char* json_data, c
 	return 0;
 }
 
-const char* ImportNif(const char* input_file, bool export_havok_readable, const char* readable_filepath)
+static bool LoadNifAsJson(const char* input_file, bool export_havok_readable, const char* readable_filepath, nlohmann::json& jsondata)
 {
 	nif::NifIO nif;
 
 	if (!nif.Deserialize(input_file)) {
 		std::cerr << "Failed to load nif from " << input_file << std::endl;
-		return "";
+		return false;
 	}
 
 	auto t_ptr = nif.ToTemplate<nif::ni_template::NiSkinInstanceTemplate>();
 
 	if (t_ptr == nullptr) {
 		std::cerr << "Failed to convert nif to template" << std::endl;
-		return "";
+		return false;
 	}
 	else {
 		std::cout << "Nif converted to template RTTI: " << (uint32_t)t_ptr->GetRTTI() << std::endl;
@@ -368,7 +513,7 @@ const char* ImportNif(const char* input_file, bool export_havok_readable, const
 		dynamic_cast<nif::ni_template::NiArmatureTemplate*>(t_ptr)->skeleton_mode = true;
 	}*/
 
-	auto jsondata = t_ptr->Serialize();
+	jsondata = t_ptr->Serialize();
 
 	jsondata["TEMPLATE_RTTI"] = (uint32_t)t_ptr->GetRTTI();
 
@@ -387,9 +532,242 @@ const char* ImportNif(const char* input_file, bool export_havok_readable, const
 		}
 	}
 	
+	return true;
+}
+
+const char* ImportNif(const char* input_file, bool export_havok_readable, const char* readable_filepath)
+{
+	nlohmann::json jsondata;
+	if (!LoadNifAsJson(input_file, export_havok_readable, readable_filepath, jsondata)) {
+		return "";
+	}
+
 	return utils::make_copy(jsondata.dump());
 }
 
+namespace {
+	// Binary scene channel for ImportNifBinary. Bulk per vertex/per triangle arrays are moved out of the json
+	// into typed blobs, the json header keeps a {"__blob__": i} or {"__ragged__": [counts, values]} stub in their place.
+	enum BlobType : uint32_t {
+		Float32 = 0,
+		UInt32 = 1,
+		Int32 = 2,
+	};
+
+	struct BlobDesc {
+		uint32_t dtype;
+		uint32_t ndim;
+		uint64_t rows;
+		uint64_t cols;
+		uint64_t offset;
+	};
+
+	const std::unordered_set<std::string> _blob_keys = {
+		"positions", "normals", "triangleIndices", "boneWeights",
+		"uv_coords2", "tangents", "vertex_color", "vertex_weights", "meshlets", "culldata",
+	};
+
+	const size_t _min_blob_elements = 64;
+
+	class BinarySceneWriter {
+	public:
+		std::vector<BlobDesc> blobs;
+		std::vector<uint8_t> payload;
+
+		void Extract(nlohmann::json& node) {
+			if (node.is_object()) {
+				for (auto& [key, value] : node.items()) {
+					if (value.is_array() && _blob_keys.contains(key)) {
+						if (ToMatrix(value) || ToRagged(value))
+							continue;
+					}
+					Extract(value);
+				}
+			}
+			else if (node.is_array()) {
+				for (auto& value : node) {
+					Extract(value);
+				}
+			}
+		}
+
+		std::vector<uint8_t> Pack(const nlohmann::json& header) const {
+			std::string header_str = header.dump();
+			auto align = [](size_t v, size_t a) { return (v + a - 1) / a * a; };
+
+			size_t header_offset = 16;
+			size_t table_offset = align(header_offset + header_str.size(), 16);
+			size_t payload_offset = align(table_offset + blobs.size() * sizeof(BlobDesc), 16);
+
+			std::vector<uint8_t> buffer(payload_offset + payload.size(), 0);
+			const uint32_t version = 1;
+			const uint32_t header_size = (uint32_t)header_str.size();
+			const uint32_t num_blobs = (uint32_t)blobs.size();
+			std::memcpy(buffer.data(), "NIFB", 4);
+			std::memcpy(buffer.data() + 4, &version, 4);
+			std::memcpy(buffer.data() + 8, &header_size, 4);
+			std::memcpy(buffer.data() + 12, &num_blobs, 4);
+			std::memcpy(buffer.data() + header_offset, header_str.data(), header_str.size());
+
+			for (size_t i = 0; i < blobs.size(); ++i) {
+				BlobDesc desc = blobs[i];
+				desc.offset += payload_offset;
+				std::memcpy(buffer.data() + table_offset + i * sizeof(BlobDesc), &desc, sizeof(BlobDesc));
+			}
+			if (!payload.empty())
+				std::memcpy(buffer.data() + payload_offset, payload.data(), payload.size());
+			return buffer;
+		}
+
+	private:
+		static bool IsNumberRow(const nlohmann::json& row, size_t cols) {
+			if (!row.is_array() || row.size() != cols)
+				return false;
+			for (auto& v : row) {
+				if (!v.is_number())
+					return false;
+			}
+			return true;
+		}
+
+		static BlobType InferType(const nlohmann::json& value, size_t depth) {
+			bool is_signed = false;
+			std::vector<const nlohmann::json*> stack = { &value };
+			for (size_t d = 0; d < depth; ++d) {
+				std::vector<const nlohmann::json*> next;
+				for (auto v : stack)
+					for (auto& e : *v)
+						next.push_back(&e);
+				stack.swap(next);
+			}
+			for (auto v : stack) {
+				if (v->is_number_float())
+					return BlobType::Float32;
+				if (v->is_number_integer() && v->get<int64_t>() < 0)
+					is_signed = true;
+			}
+			return is_signed ? BlobType::Int32 : BlobType::UInt32;
+		}
+
+		size_t AddBlob(BlobType dtype, uint32_t ndim, size_t rows, size_t cols) {
+			size_t offset = (payload.size() + 15) / 16 * 16;
+			payload.resize(offset + rows * std::max<size_t>(cols, 1) * 4, 0);
+			blobs.push_back({ dtype, ndim, rows, cols, offset });
+			return blobs.size() - 1;
+		}
+
+		void Write(size_t blob, size_t index, const nlohmann::json& v) {
+			uint8_t* dst = payload.data() + blobs[blob].offset + index * 4;
+			switch (blobs[blob].dtype) {
+			case BlobType::Float32: { float f = v.get<float>(); std::memcpy(dst, &f, 4); break; }
+			case BlobType::UInt32: { uint32_t u = v.get<uint32_t>(); std::memcpy(dst, &u, 4); break; }
+			case BlobType::Int32: { int32_t i = v.get<int32_t>(); std::memcpy(dst, &i, 4); break; }
+			}
+		}
+
+		// [n] numbers or [n][k] numbers
+		bool ToMatrix(nlohmann::json& value) {
+			size_t rows = value.size();
+			if (rows == 0)
+				return false;
+
+			size_t cols = 0;
+			if (value[0].is_array()) {
+				cols = value[0].size();
+				if (cols == 0)
+					return false;
+				for (auto& row : value) {
+					if (!IsNumberRow(row, cols))
+						return false;
+				}
+			}
+			else {
+				for (auto& v : value) {
+					if (!v.is_number())
+						return false;
+				}
+			}
+			if (rows * std::max<size_t>(cols, 1) < _min_blob_elements)
+				return false;
+
+			size_t blob = AddBlob(InferType(value, cols ? 2 : 1), cols ? 2 : 1, rows, cols);
+			size_t i = 0;
+			for (auto& row : value) {
+				if (cols == 0) {
+					Write(blob, i++, row);
+				}
+				else {
+					for (auto& v : row)
+						Write(blob, i++, v);
+				}
+			}
+			value = nlohmann::json{ {"__blob__", blob} };
+			return true;
+		}
+
+		// [n][variable][k] numbers, e.g. per vertex lists of [bone, weight]
+		bool ToRagged(nlohmann::json& value) {
+			size_t rows = value.size();
+			if (rows < _min_blob_elements)
+				return false;
+
+			size_t cols = 0;
+			size_t total = 0;
+			for (auto& row : value) {
+				if (!row.is_array())
+					return false;
+				for (auto& entry : row) {
+					if (cols == 0 && entry.is_array())
+						cols = entry.size();
+					if (cols == 0 || !IsNumberRow(entry, cols))
+						return false;
+				}
+				total += row.size();
+			}
+			if (cols == 0)
+				return false;
+
+			size_t counts = AddBlob(BlobType::UInt32, 1, rows, 0);
+			size_t values = AddBlob(InferType(value, 3), 2, total, cols);
+			size_t r = 0, i = 0;
+			for (auto& row : value) {
+				Write(counts, r++, row.size());
+				for (auto& entry : row)
+					for (auto& v : entry)
+						Write(values, i++, v);
+			}
+			value = nlohmann::json{ {"__ragged__", {counts, values}} };
+			return true;
+		}
+	};
+}
+
+const uint8_t* ImportNifBinary(const char* input_file, bool export_havok_readable, const char* readable_filepath, uint64_t* out_size)
+{
+	*out_size = 0;
+
+	nlohmann::json jsondata;
+	if (!LoadNifAsJson(input_file, export_havok_readable, readable_filepath, jsondata)) {
+		return nullptr;
+	}
+
+	BinarySceneWriter writer;
+	writer.Extract(jsondata);
+	auto buffer = writer.Pack(jsondata);
+
+	std::cout << "Nif packed to binary scene with " << writer.blobs.size() << " blobs" << std::endl;
+
+	uint8_t* out = new uint8_t[buffer.size()];
+	std::memcpy(out, buffer.data(), buffer.size());
+	*out_size = buffer.size();
+	return out;
+}
+
+void FreeBuffer(const uint8_t* buffer)
+{
+	delete[] buffer;
+}
+
 uint32_t ComposePhysicsData(const char* json_data, uint32_t platform, const char* transcript_path, const char* output_file, bool export_readable)
 {
 	nlohmann::json jsonData = nlohmann::json::parse(json_data);
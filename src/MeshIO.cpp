@@ -618,16 +618,18 @@ bool MeshIO::LoadFromNumpy(
 	const float* ptr_color,
 	const float* ptr_tangents,
 	const int32_t* ptr_bitangent_signs,
+	const uint16_t* ptr_weight_bones,
+	const uint16_t* ptr_weight_values,
 	const uint32_t options
 ) {
 	this->Clear();
 
 	json jsonData = json::parse(json_header);
 
-	return this->LoadFromNumpyJson(jsonData, ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs, options);
+	return this->LoadFromNumpyJson(jsonData, ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs, ptr_weight_bones, ptr_weight_values, options);
 }
 
-bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
+bool MeshIO::LoadFromNumpy(const mesh_export_header& header,
 	const float* ptr_positions,
 	const int64_t* ptr_indices,
 	const float* ptr_normals,
@@ -636,14 +638,71 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	const float* ptr_color,
 	const float* ptr_tangents,
 	const int32_t* ptr_bitangent_signs,
+	const uint16_t* ptr_weight_bones,
+	const uint16_t* ptr_weight_values,
 	const uint32_t options
 ) {
 	this->Clear();
 
+	if (!this->LoadNumpyStreams(header, ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs)) {
+		return false;
+	}
+
+	if (ptr_weight_bones != nullptr && ptr_weight_values != nullptr) {
+		// Dense (num_verts, num_weightsPerVertex) arrays, weights are already quantized and normalized to 65535
+		this->num_weightsPerVertex = header.num_weightsPerVertex;
+		if (this->num_weightsPerVertex == 0) {
+			std::cout << "Error: 'num_weightsPerVertex' is 0 while weight buffers are given." << std::endl;
+			return false;
+		}
+
+		this->num_weights = this->num_vertices * this->num_weightsPerVertex;
+
+		size_t num_bones = 0;
+		for (size_t i = 0; i < this->num_weights; ++i) {
+			if (ptr_weight_bones[i] > num_bones) {
+				num_bones = ptr_weight_bones[i];
+			}
+		}
+		num_bones += 1;
+		this->weight_indices.resize(num_bones);
+
+		for (uint32_t vertex_index = 0; vertex_index < this->num_vertices; ++vertex_index) {
+			vertex_weight vw_l = new bone_binding[this->num_weightsPerVertex];
+
+			for (uint32_t _i = 0; _i < this->num_weightsPerVertex; ++_i) {
+				size_t offset = size_t(vertex_index) * this->num_weightsPerVertex + _i;
+				vw_l[_i].bone = ptr_weight_bones[offset];
+				vw_l[_i].weight = ptr_weight_values[offset];
+
+				// Padding slots carry zero weight, the first slot is always kept to match the json path
+				if (_i == 0 || vw_l[_i].weight != 0)
+					this->weight_indices[vw_l[_i].bone].push_back(vertex_index);
+			}
+
+			this->weights.push_back(vw_l);
+		}
+	}
+
+	std::cout << "Done loading mesh from numpy." << std::endl;
+
+	return this->PostProcess(options);
+}
+
+bool MeshIO::LoadNumpyStreams(const mesh_export_header& header,
+	const float* ptr_positions,
+	const int64_t* ptr_indices,
+	const float* ptr_normals,
+	const float* ptr_uv1,
+	const float* ptr_uv2,
+	const float* ptr_color,
+	const float* ptr_tangents,
+	const int32_t* ptr_bitangent_signs
+) {
 	std::cout << "Loading mesh from numpy..." << std::endl;
 
-	this->num_positions = jsonData["num_verts"] * 3;
-	this->num_vertices = jsonData["num_verts"];
+	this->num_positions = header.num_verts * 3;
+	this->num_vertices = header.num_verts;
 
 	if (this->num_vertices > uint16_t(-1)) {
 		std::cout << "Error: Number of vertices has exceeded the maximum amount of 65535. Please split the mesh into smaller pieces before encoding." << std::endl;
@@ -653,14 +712,8 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	float pos_max = 0;
 
 	if (ptr_positions == nullptr) {
-		if (jsonData.contains("ptr_positions")) {
-			ptr_positions = (float*)static_cast<uintptr_t>(jsonData["ptr_positions"]);
-			std::cout << "ptr_positions: " << (uintptr_t)ptr_positions << std::endl;
-		}
-		else {
-			std::cout << "Error: 'positions' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'positions' is null." << std::endl;
+		return false;
 	}
 
 	for (size_t i = 0; i < this->num_vertices; ++i) {
@@ -675,7 +728,7 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	// To prevent overflow
 	this->max_border = pos_max + 0.1;
 
-	float settings_max_border = jsonData["max_border"];
+	float settings_max_border = header.max_border;
 	if (settings_max_border > pos_max) {
 		this->max_border = settings_max_border;
 	}
@@ -684,18 +737,12 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 			std::cout << "Warning: Max border too low." << std::endl;
 	}
 
-	this->indices_size = jsonData["num_indices"];
+	this->indices_size = header.num_indices;
 	this->num_triangles = this->indices_size / 3;
 
 	if (ptr_indices == nullptr) {
-		if (jsonData.contains("ptr_indices")) {
-			ptr_indices = (int64_t*)static_cast<uintptr_t>(jsonData["ptr_indices"]);
-			std::cout << "ptr_indices: " << (uintptr_t)ptr_indices << std::endl;
-		}
-		else {
-			std::cout << "Error: 'indices' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'indices' is null." << std::endl;
+		return false;
 	}
 
 	for (size_t i = 0; i < this->indices_size; ++i) {
@@ -703,14 +750,8 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	}
 
 	if (ptr_uv1 == nullptr) {
-		if (jsonData.contains("ptr_uv1")) {
-			ptr_uv1 = (float*)static_cast<uintptr_t>(jsonData["ptr_uv1"]);
-			std::cout << "ptr_uv1: " << (uintptr_t)ptr_uv1 << std::endl;
-		}
-		else {
-			std::cout << "Error: 'uv1' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'uv1' is null." << std::endl;
+		return false;
 	}
 
 	this->num_uv1 = this->num_vertices;
@@ -719,12 +760,6 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 		this->UV_list1.emplace_back(uv);
 	}
 
-	if (ptr_uv2 == nullptr) {
-		if (jsonData.contains("ptr_uv2")) {
-			ptr_uv2 = (float*)static_cast<uintptr_t>(jsonData["ptr_uv2"]);
-			std::cout << "ptr_uv2: " << (uintptr_t)ptr_uv2 << std::endl;
-		}
-	}
 	if (ptr_uv2 != nullptr) {
 		this->num_uv2 = this->num_vertices;
 		for (size_t i = 0; i < this->num_uv2; ++i) {
@@ -734,14 +769,8 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	}
 
 	if (ptr_normals == nullptr) {
-		if (jsonData.contains("ptr_normals")) {
-			ptr_normals = (float*)static_cast<uintptr_t>(jsonData["ptr_normals"]);
-			std::cout << "ptr_normals: " << (uintptr_t)ptr_normals << std::endl;
-		}
-		else {
-			std::cout << "Error: 'normals' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'normals' is null." << std::endl;
+		return false;
 	}
 
 	this->num_normals = this->num_vertices;
@@ -753,25 +782,13 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 	}
 
 	if (ptr_tangents == nullptr) {
-		if (jsonData.contains("ptr_tangents")) {
-			ptr_tangents = (float*)static_cast<uintptr_t>(jsonData["ptr_tangents"]);
-			std::cout << "ptr_tangents: " << (uintptr_t)ptr_tangents << std::endl;
-		}
-		else {
-			std::cout << "Error: 'tangents' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'tangents' is null." << std::endl;
+		return false;
 	}
 
 	if (ptr_bitangent_signs == nullptr) {
-		if (jsonData.contains("ptr_bitangent_signs")) {
-			ptr_bitangent_signs = (int32_t*)static_cast<uintptr_t>(jsonData["ptr_bitangent_signs"]);
-			std::cout << "ptr_bitangent_signs: " << (uintptr_t)ptr_bitangent_signs << std::endl;
-		}
-		else {
-			std::cout << "Error: 'bitangent_signs' is null." << std::endl;
-			return false;
-		}
+		std::cout << "Error: 'bitangent_signs' is null." << std::endl;
+		return false;
 	}
 
 	this->num_tangents = this->num_vertices;
@@ -781,12 +798,6 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 		this->tangent_signs.emplace_back(ptr_bitangent_signs[i] < 0 ? 3 : 0);
 	}
 
-	if (ptr_color == nullptr) {
-		if (jsonData.contains("ptr_color")) {
-			ptr_color = (float*)static_cast<uintptr_t>(jsonData["ptr_color"]);
-			std::cout << "ptr_color: " << (uintptr_t)ptr_color << std::endl;
-		}
-	}
 	if (ptr_color != nullptr) {
 		this->num_vert_colors = this->num_vertices;
 		for (size_t i = 0; i < this->num_vert_colors; ++i) {
@@ -799,6 +810,56 @@ bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
 		}
 	}
 
+	return true;
+}
+
+bool MeshIO::LoadFromNumpyJson(const nlohmann::json& jsonData,
+	const float* ptr_positions,
+	const int64_t* ptr_indices,
+	const float* ptr_normals,
+	const float* ptr_uv1,
+	const float* ptr_uv2,
+	const float* ptr_color,
+	const float* ptr_tangents,
+	const int32_t* ptr_bitangent_signs,
+	const uint16_t* ptr_weight_bones,
+	const uint16_t* ptr_weight_values,
+	const uint32_t options
+) {
+	this->Clear();
+
+	// Buffers that are not passed directly may be given as raw addresses in the json
+	auto resolve = [&jsonData]<typename T>(const T*& ptr, const char* key) {
+		if (ptr == nullptr && jsonData.contains(key)) {
+			ptr = (const T*)static_cast<uintptr_t>(jsonData[key]);
+			std::cout << key << ": " << (uintptr_t)ptr << std::endl;
+		}
+	};
+	resolve(ptr_positions, "ptr_positions");
+	resolve(ptr_indices, "ptr_indices");
+	resolve(ptr_normals, "ptr_normals");
+	resolve(ptr_uv1, "ptr_uv1");
+	resolve(ptr_uv2, "ptr_uv2");
+	resolve(ptr_color, "ptr_color");
+	resolve(ptr_tangents, "ptr_tangents");
+	resolve(ptr_bitangent_signs, "ptr_bitangent_signs");
+	resolve(ptr_weight_bones, "ptr_weight_bones");
+	resolve(ptr_weight_values, "ptr_weight_values");
+
+	mesh_export_header header{};
+	header.num_verts = jsonData["num_verts"];
+	header.num_indices = jsonData["num_indices"];
+	header.num_weightsPerVertex = jsonData.value("num_weightsPerVertex", 0u);
+	header.max_border = jsonData["max_border"];
+
+	if ((ptr_weight_bones != nullptr && ptr_weight_values != nullptr) || !jsonData.contains("vertex_weights")) {
+		return this->LoadFromNumpy(header, ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs, ptr_weight_bones, ptr_weight_values, options);
+	}
+
+	if (!this->LoadNumpyStreams(header, ptr_positions, ptr_indices, ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs)) {
+		return false;
+	}
+
 	const json& weightData = jsonData["vertex_weights"];
 
 	if (weightData.is_array()) {
@@ -1114,6 +1175,28 @@ bool mesh::MeshIO::LoadToNumpy(
 	float* ptr_color, 
 	float* ptr_tangents, 
 	int32_t* ptr_bitangent_signs
+) {
+	return this->LoadToNumpy(ptr_positions, ptr_indices, sizeof(int64_t), ptr_normals, ptr_uv1, ptr_uv2, ptr_color, ptr_tangents, ptr_bitangent_signs);
+}
+
+template<typename T>
+inline void _copy_indices(const std::vector<uint16_t>& src, void* dst) {
+	T* _dst = reinterpret_cast<T*>(dst);
+	for (size_t i = 0; i < src.size(); ++i) {
+		_dst[i] = static_cast<T>(src[i]);
+	}
+}
+
+bool mesh::MeshIO::LoadToNumpy(
+	float* ptr_positions,
+	void* ptr_indices,
+	const uint32_t index_byte_size,
+	float* ptr_normals,
+	float* ptr_uv1,
+	float* ptr_uv2,
+	float* ptr_color,
+	float* ptr_tangents,
+	int32_t* ptr_bitangent_signs
 ) {
 	if (ptr_positions != nullptr) {
 		for (size_t i = 0; i < this->num_vertices; ++i) {
@@ -1124,8 +1207,19 @@ bool mesh::MeshIO::LoadToNumpy(
 	}
 
 	if (ptr_indices != nullptr) {
-		for (size_t i = 0; i < this->indices_size; ++i) {
-			ptr_indices[i] = this->indices[i];
+		switch (index_byte_size) {
+		case sizeof(uint16_t):
+			std::memcpy(ptr_indices, this->indices.data(), this->indices_size * sizeof(uint16_t));
+			break;
+		case sizeof(uint32_t):
+			_copy_indices<uint32_t>(this->indices, ptr_indices);
+			break;
+		case sizeof(int64_t):
+			_copy_indices<int64_t>(this->indices, ptr_indices);
+			break;
+		default:
+			std::cout << "Error: Unsupported index size " << index_byte_size << std::endl;
+			return false;
 		}
 	}
 
@@ -1153,7 +1247,10 @@ bool mesh::MeshIO::LoadToNumpy(
 
 	if (ptr_color != nullptr) {
 		for (size_t i = 0; i < this->num_vert_colors; ++i) {
-			ptr_color[i * 4 + 0] = this->vert_colors[i].r / 255;
+			ptr_color[i * 4 + 0] = this->vert_colors[i].r / 255.f;
+			ptr_color[i * 4 + 1] = this->vert_colors[i].g / 255.f;
+			ptr_color[i * 4 + 2] = this->vert_colors[i].b / 255.f;
+			ptr_color[i * 4 + 3] = this->vert_colors[i].a / 255.f;
 		}
 	}
 
@@ -1818,6 +1915,34 @@ size_t mesh::MeshIO::NaiveEdgeSmooth()
 }
 
 bool mesh::MeshIO::read_header(const std::string filename, std::string& header_str)
+{
+	mesh_header header{};
+	if (!read_header(filename, header)) {
+		return false;
+	}
+
+	nlohmann::json json_data;
+
+	json_data["indices_size"] = header.indices_size;
+	json_data["num_triangles"] = header.num_triangles;
+	json_data["max_border"] = header.max_border;
+	json_data["num_weightsPerVertex"] = header.num_weightsPerVertex;
+	json_data["num_vertices"] = header.num_vertices;
+	json_data["num_uv1"] = header.num_uv1;
+	json_data["num_uv2"] = header.num_uv2;
+	json_data["num_vert_colors"] = header.num_vert_colors;
+	json_data["num_normals"] = header.num_normals;
+	json_data["num_tangents"] = header.num_tangents;
+	json_data["num_weights"] = header.num_weights;
+	json_data["num_lods"] = header.num_lods;
+	json_data["num_meshlets"] = header.num_meshlets;
+
+	header_str = json_data.dump();
+
+	return true;
+}
+
+bool mesh::MeshIO::read_header(const std::string filename, mesh_header& header)
 {
 	// Check file extension, return false if extension is not .mesh
 	std::string extension = filename.substr(filename.find_last_of(".") + 1);
@@ -1853,15 +1978,50 @@ bool mesh::MeshIO::read_header(const std::string filename, std::string& header_s
 
 	auto num_vertices = utils::read<uint32_t>(file)[0];
 
-	nlohmann::json json_data;
+	// Walk the remaining section counters so the caller knows which streams exist
+	file.seekg(num_vertices * 3 * sizeof(int16_t), std::ios::cur);
 
-	json_data["indices_size"] = indices_size;
-	json_data["num_triangles"] = num_triangles;
-	json_data["max_border"] = max_border;
-	json_data["num_weightsPerVertex"] = num_weightsPerVertex;
-	json_data["num_vertices"] = num_vertices;
+	auto num_uv1 = utils::read<uint32_t>(file)[0];
+	file.seekg(num_uv1 * 2 * sizeof(uint16_t), std::ios::cur);
 
-	header_str = json_data.dump();
+	auto num_uv2 = utils::read<uint32_t>(file)[0];
+	file.seekg(num_uv2 * 2 * sizeof(uint16_t), std::ios::cur);
+
+	auto num_vert_colors = utils::read<uint32_t>(file)[0];
+	file.seekg(num_vert_colors * sizeof(vertex_color), std::ios::cur);
+
+	auto num_normals = utils::read<uint32_t>(file)[0];
+	file.seekg(num_normals * sizeof(uint32_t), std::ios::cur);
+
+	auto num_tangents = utils::read<uint32_t>(file)[0];
+	file.seekg(num_tangents * sizeof(uint32_t), std::ios::cur);
+
+	auto num_weights = utils::read<uint32_t>(file)[0];
+	if (num_weights != 0) {
+		file.seekg(num_vertices * num_weightsPerVertex * sizeof(bone_binding), std::ios::cur);
+	}
+
+	auto num_lods = utils::read<uint32_t>(file)[0];
+	for (uint32_t i = 0; i < num_lods; i++) {
+		auto num_lod = utils::read<uint32_t>(file)[0];
+		file.seekg(num_lod * sizeof(uint16_t), std::ios::cur);
+	}
+
+	auto num_meshlets = utils::read<uint32_t>(file)[0];
+
+	header.indices_size = indices_size;
+	header.num_triangles = num_triangles;
+	header.max_border = max_border;
+	header.num_weightsPerVertex = num_weightsPerVertex;
+	header.num_vertices = num_vertices;
+	header.num_uv1 = num_uv1;
+	header.num_uv2 = num_uv2;
+	header.num_vert_colors = num_vert_colors;
+	header.num_normals = num_normals;
+	header.num_tangents = num_tangents;
+	header.num_weights = num_weights;
+	header.num_lods = num_lods;
+	header.num_meshlets = num_meshlets;
 	
 	return true;
 }
@@ -322,15 +322,29 @@ bool morph::MorphIO::LoadFromNumpy(const std::string json_header_data, const flo
 
 	std::cout << "Morph data JSON parsing in " << (end_time - start_time) << "ms" << std::endl;
 
-	// Read shape key names
-	this->num_shape_keys = jsonData["shapeKeys"].size();
+	std::vector<std::string> names;
 	for (auto& shapeKey : jsonData["shapeKeys"]) {
+		names.push_back(shapeKey);
+	}
+
+	return this->LoadFromNumpy(jsonData["numVertices"].get<uint32_t>(), names, a_delta_positions, a_target_colors, a_delta_normals, a_delta_tangents, options);
+}
+
+bool morph::MorphIO::LoadFromNumpy(const uint32_t num_vertices, const std::vector<std::string>& names, const float* a_delta_positions, const float* a_target_colors, const float* a_delta_normals, const float* a_delta_tangents, const uint32_t options)
+{
+	this->Clear();
+
+	auto start_time = clock();
+
+	// Read shape key names
+	this->num_shape_keys = names.size();
+	for (auto& shapeKey : names) {
 		this->morph_names.push_back(shapeKey);
 	}
 
 	// Read morph data
 	this->num_morph_data = 0;
-	this->num_vertices = jsonData["numVertices"];
+	this->num_vertices = num_vertices;
 	for (int i = 0; i < this->num_vertices; i++) {
 		std::vector<morph_data> _morph_data;
 		std::vector<uint32_t> _morph_key_selection;
@@ -381,7 +395,7 @@ bool morph::MorphIO::LoadFromNumpy(const std::string json_header_data, const flo
 	}
 
 	auto end_time2 = clock();
-	std::cout << "Morph loaded from JSON in " << (end_time2 - start_time) << "ms" << std::endl;
+	std::cout << "Morph loaded from numpy in " << (end_time2 - start_time) << "ms" << std::endl;
 
 	return this->PostProcess(options);
 }
@@ -561,6 +575,29 @@ void MorphIO::FakeEmpty(const uint32_t n_verts, const uint8_t n_morphs)
 }
 
 bool morph::MorphIO::read_header(const std::string filename, std::string& header_str)
+{
+	morph_header header{};
+	std::vector<std::string> morph_names;
+	if (!read_header(filename, header, morph_names)) {
+		return false;
+	}
+
+	json jsonData;
+	// Save vertex count
+	jsonData["numVertices"] = header.num_vertices;
+
+	// Save shape key names
+	jsonData["shapeKeys"] = json::array();
+	for (auto& shapeKey : morph_names) {
+		jsonData["shapeKeys"].push_back(shapeKey);
+	}
+
+	header_str = jsonData.dump();
+
+	return true;
+}
+
+bool morph::MorphIO::read_header(const std::string filename, morph_header& header, std::vector<std::string>& morph_names)
 {
 	std::string extension = filename.substr(filename.find_last_of(".") + 1);
 	if (extension != "dat")
@@ -598,25 +635,18 @@ bool morph::MorphIO::read_header(const std::string filename, std::string& header
 	auto num_shape_keys = utils::read<uint32_t>(file)[0];
 
 
-	std::vector<std::string> morph_names;
+	morph_names.clear();
+	header.names_size = 0;
 
 	for (int i = 0; i < num_shape_keys; i++) {
 		uint32_t length_of_name = utils::read<uint32_t>(file)[0];
 		std::string name = utils::readString(file, length_of_name);
+		header.names_size += name.size() + 1;
 		morph_names.push_back(name);
 	}
 
-	json jsonData;
-	// Save vertex count
-	jsonData["numVertices"] = num_vertices;
-
-	// Save shape key names
-	jsonData["shapeKeys"] = json::array();
-	for (auto& shapeKey : morph_names) {
-		jsonData["shapeKeys"].push_back(shapeKey);
-	}
-
-	header_str = jsonData.dump();
+	header.num_vertices = num_vertices;
+	header.num_shape_keys = num_shape_keys;
 
 	return true;
 }
@@ -0,0 +1,39 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+# The add-on modules import each other flat, as Blender loads them from the add-on folder
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'tool_export_mesh'))
+
+# Outside Blender, modules that only name bpy and mathutils types in annotations import against empty stand ins
+try:
+    import bpy
+except ImportError:
+    for name in ('bpy', 'bmesh', 'mathutils'):
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules['bpy'].types = types.SimpleNamespace(Object=object, Mesh=object, ShapeKey=object, Attribute=object)
+    sys.modules['mathutils'].Vector = sys.modules['mathutils'].Matrix = sys.modules['mathutils'].Quaternion = sys.modules['mathutils'].Color = object
+
+def grid_mesh(n:int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    n x n vertex grid on the z = 0 plane -> (n * n, 3) float32 positions and (2 * (n - 1)^2, 3) int64 triangles.
+    '''
+    y, x = np.divmod(np.arange(n * n), n)
+    positions = np.stack([x, y, np.zeros(n * n)], axis=1).astype(np.float32)
+    corner = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    triangles = np.concatenate([
+        np.stack([corner, corner + 1, corner + n], axis=1),
+        np.stack([corner + 1, corner + n + 1, corner + n], axis=1),
+    ])
+    return positions, triangles.astype(np.int64)
+
+@pytest.fixture
+def grid():
+    return grid_mesh
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import utils_math
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _reference(normals_before, normals_after, tangents):
+    rotations = utils_math.batch_rotation_matrices(_unit(normals_before.astype(np.float64)), _unit(normals_after.astype(np.float64)))
+    return np.einsum('nij,nj->ni', rotations, tangents.astype(np.float64))
+
+def _tangents(rng, normals):
+    return _unit(np.cross(normals, rng.normal(size=normals.shape))).astype(np.float32)
+
+def test_rotate_tangents_matches_rotation_matrices(rng):
+    normals_before = _unit(rng.normal(size=(5000, 3))).astype(np.float32)
+    normals_after = _unit(rng.normal(size=(5000, 3))).astype(np.float32)
+    tangents = _tangents(rng, normals_before)
+    rotated = utils_math.rotate_tangents(normals_before, normals_after, tangents)
+    assert rotated.dtype == np.float32
+    np.testing.assert_allclose(rotated, _reference(normals_before, normals_after, tangents), atol=1e-5)
+
+@pytest.mark.parametrize('one_plus_c', [1e-3, 1e-4, 1e-5, 3e-6])
+def test_rotate_tangents_nearly_antiparallel(rng, one_plus_c):
+    normals_before = _unit(rng.normal(size=(2000, 3)))
+    perpendicular = _unit(np.cross(normals_before, rng.normal(size=normals_before.shape)))
+    c = one_plus_c - 1
+    normals_after = (normals_before * c + perpendicular * np.sqrt(1 - c * c)).astype(np.float32)
+    normals_before = normals_before.astype(np.float32)
+    tangents = _tangents(rng, normals_before)
+
+    rotated = utils_math.rotate_tangents(normals_before, normals_after, tangents)
+    np.testing.assert_allclose(rotated, _reference(normals_before, normals_after, tangents), atol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(rotated, axis=1), 1, atol=1e-6)
+
+def test_rotate_tangents_edge_cases(rng):
+    normals = _unit(rng.normal(size=(4, 3))).astype(np.float32)
+    tangents = _tangents(rng, normals)
+    # Unchanged normals keep the tangent, zero normals leave it untouched
+    np.testing.assert_allclose(utils_math.rotate_tangents(normals, normals, tangents), tangents, atol=1e-6)
+    np.testing.assert_array_equal(utils_math.rotate_tangents(np.zeros_like(normals), normals, tangents), tangents)
+    # Flipped normals turn an in-plane tangent half way around itself, it keeps its direction
+    np.testing.assert_allclose(utils_math.rotate_tangents(normals, -normals, tangents), tangents, atol=1e-6)
+
+def test_rotate_tangents_in_place(rng):
+    normals_before = _unit(rng.normal(size=(100, 3))).astype(np.float32)
+    normals_after = _unit(rng.normal(size=(100, 3))).astype(np.float32)
+    tangents = _tangents(rng, normals_before)
+    expected = utils_math.rotate_tangents(normals_before, normals_after, tangents)
+    assert utils_math.rotate_tangents(normals_before, normals_after, tangents, out=tangents) is tangents
+    np.testing.assert_array_equal(tangents, expected)
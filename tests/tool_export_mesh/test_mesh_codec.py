@@ -0,0 +1,133 @@
+import struct
+
+import numpy as np
+import pytest
+
+import MeshCodec
+import utils_meshlet
+
+def _triangle_dict() -> dict:
+    return {
+        'num_verts': 3,
+        'num_indices': 3,
+        'max_border': 2.0,
+        'positions_raw': np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32),
+        'vertex_indices_raw': np.array([0, 1, 2], dtype=np.int64),
+        'normals': np.array([[0, 0, 1]] * 3, dtype=np.float32),
+        'uv_coords': np.array([[0, 0], [1, 0], [0, 0.5]], dtype=np.float32),
+        'uv_coords_2': None,
+        'vertex_color': np.array([[1, 0, 0, 1]] * 3, dtype=np.float32),
+        'tangents': np.array([[1, 0, 0]] * 3, dtype=np.float32),
+        'bitangent_signs': np.array([1, 1, -1], dtype=np.int32),
+        'vertex_weight_bones': np.array([[0, 1], [1, 0], [2, 0]], dtype=np.uint16),
+        'vertex_weight_values': np.array([[65535, 0], [32768, 32767], [65535, 0]], dtype=np.uint16),
+        'lods': [],
+        'meshlets': np.array([[3, 0, 1, 0]], dtype=np.uint32),
+        'culldata': np.array([[0.5, 0.5, 0, 0.5, 0.5, 0]], dtype=np.float32),
+    }
+
+def _serialized_triangle() -> bytes:
+    '''
+    The bytes MeshIO::Serialize writes for _triangle_dict(), field by field with the values worked out by hand:
+    snorm 1 / 2 * 32767 rounds to 16384, halves of 0.5 and 1 are 0x3800 and 0x3C00, DEC3N (0, 0, 1) packs
+    511 | 511 << 10 | 1023 << 20 with w = 1 and tangent (1, 0, 0) packs 1023 | 511 << 10 | 511 << 20 with w = 0 or 3.
+    '''
+    u32 = lambda *v: struct.pack(f'<{len(v)}I', *v)
+    normal = 511 | 511 << 10 | 1023 << 20 | 1 << 30
+    tangent = 1023 | 511 << 10 | 511 << 20
+    return b''.join([
+        u32(2),
+        u32(3), struct.pack('<3H', 0, 1, 2),
+        struct.pack('<f', 2.0),
+        u32(2),
+        u32(3), struct.pack('<9h', 0, 0, 0, 16384, 0, 0, 0, 16384, 0),
+        u32(3), struct.pack('<6H', 0, 0, 0x3C00, 0, 0, 0x3800),
+        u32(0),
+        u32(3), bytes([255, 0, 0, 255] * 3),
+        u32(3), u32(normal, normal, normal),
+        u32(3), u32(tangent, tangent, tangent | 3 << 30),
+        u32(6), struct.pack('<12H', 0, 65535, 1, 0, 1, 32768, 0, 32767, 2, 65535, 0, 0),
+        u32(0),
+        u32(1), u32(3, 0, 1, 0),
+        u32(1), struct.pack('<6f', 0.5, 0.5, 0, 0.5, 0.5, 0),
+    ])
+
+def test_export_matches_the_serialize_layout(tmp_path):
+    # No MeshConverter.dll written file is checked in, the dll only runs on Windows. The expected bytes are
+    # assembled from MeshIO::Serialize instead, independent of the MeshCodec helpers.
+    path = tmp_path / 'triangle.mesh'
+    assert MeshCodec.ExportMeshFromNumpy(_triangle_dict(), str(path))
+    assert path.read_bytes() == _serialized_triangle()
+
+def test_import_of_the_serialize_layout(tmp_path):
+    path = tmp_path / 'triangle.mesh'
+    path.write_bytes(_serialized_triangle())
+    data = MeshCodec.ImportMeshAsNumpy(str(path))
+    source = _triangle_dict()
+
+    assert data['num_verts'] == 3 and data['num_indices'] == 3 and data['num_weightsPerVertex'] == 2
+    assert np.array_equal(data['vertex_indices_raw'].ravel(), source['vertex_indices_raw'])
+    np.testing.assert_allclose(data['positions_raw'], source['positions_raw'], atol=1e-4)
+    np.testing.assert_array_equal(data['uv_coords'], source['uv_coords'])
+    np.testing.assert_allclose(data['normals'], source['normals'], atol=2e-3)
+    np.testing.assert_array_equal(data['vertex_weight_bones'], source['vertex_weight_bones'])
+    np.testing.assert_array_equal(data['vertex_weight_values'], source['vertex_weight_values'])
+    assert np.array_equal(data['bitangent_signs'], [0, 0, 3])
+
+def test_round_trip(tmp_path, grid, rng):
+    positions, triangles = grid(20)
+    positions = positions / 19 - 0.5 + rng.normal(scale=0.01, size=positions.shape).astype(np.float32)
+    num_verts = len(positions)
+    normals = rng.normal(size=(num_verts, 3)).astype(np.float32)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    order, primitive_counts = utils_meshlet.build_meshlets(triangles, positions)
+    triangles = triangles[order]
+    source = {
+        'num_verts': num_verts,
+        'num_indices': triangles.size,
+        'max_border': 0.0,
+        'positions_raw': positions,
+        'vertex_indices_raw': triangles.ravel(),
+        'normals': normals,
+        'uv_coords': rng.random((num_verts, 2), dtype=np.float32),
+        'uv_coords_2': rng.random((num_verts, 2), dtype=np.float32),
+        'vertex_color': rng.random((num_verts, 4), dtype=np.float32),
+        'tangents': np.tile(np.float32([1, 0, 0]), (num_verts, 1)),
+        'bitangent_signs': np.where(rng.random(num_verts) < 0.5, 1, -1).astype(np.int32),
+        'vertex_weight_bones': rng.integers(0, 40, (num_verts, 4), dtype=np.uint16),
+        'vertex_weight_values': rng.integers(0, 65535, (num_verts, 4), dtype=np.uint16),
+        'lods': [triangles[:40].ravel(), triangles[:10].ravel()],
+        'meshlets': utils_meshlet.meshlet_records(triangles, primitive_counts),
+        'culldata': utils_meshlet.cull_data(triangles, positions, primitive_counts),
+    }
+    path = tmp_path / 'grid.mesh'
+    assert MeshCodec.ExportMeshFromNumpy(source, str(path))
+    data = MeshCodec.ImportMeshAsNumpy(str(path))
+
+    max_border = data['max_border']
+    assert max_border == pytest.approx(np.abs(positions).max() + 0.1)
+    np.testing.assert_allclose(data['positions_raw'], positions, atol=max_border / 32767)
+    np.testing.assert_array_equal(data['vertex_indices_raw'], triangles)
+    np.testing.assert_allclose(data['normals'], normals, atol=2 / 1023 + 1e-6)
+    np.testing.assert_allclose(data['uv_coords'], source['uv_coords'], atol=1e-3)
+    np.testing.assert_allclose(data['uv_coords_2'], source['uv_coords_2'], atol=1e-3)
+    np.testing.assert_allclose(data['vertex_color'], np.floor(source['vertex_color'] * 255) / 255, atol=1e-6)
+    assert np.array_equal(data['bitangent_signs'] == 3, source['bitangent_signs'] < 0)
+    np.testing.assert_array_equal(data['vertex_weight_bones'], source['vertex_weight_bones'])
+    np.testing.assert_array_equal(data['vertex_weight_values'], source['vertex_weight_values'])
+    assert [lod.tolist() for lod in data['lods']] == [lod.tolist() for lod in source['lods']]
+    assert np.array_equal(MeshCodec._as_records(data['meshlets'], MeshCodec.MESHLET_DTYPE), MeshCodec._as_records(source['meshlets'], MeshCodec.MESHLET_DTYPE))
+    assert np.array_equal(MeshCodec._as_records(data['culldata'], MeshCodec.CULLDATA_DTYPE), MeshCodec._as_records(source['culldata'], MeshCodec.CULLDATA_DTYPE))
+
+def test_write_lods_replaces_the_lod_section(tmp_path):
+    path = tmp_path / 'triangle.mesh'
+    path.write_bytes(_serialized_triangle())
+    assert MeshCodec.write_lods(str(path), [np.array([0, 1, 2])])
+    data = MeshCodec.ImportMeshAsNumpy(str(path))
+    assert [lod.tolist() for lod in data['lods']] == [[0, 1, 2]]
+    assert data['meshlets'].size == 1 and data['culldata'].size == 1
+
+def test_float_to_half_truncates():
+    values = np.array([0.0, 0.5, 1.0, -2.0, 1 + 2 ** -11, 1e-9, 70000.0], dtype=np.float32)
+    # 1 + 2^-11 sits halfway between two halves, rounding goes up, utils::floatToHalf keeps 1
+    assert MeshCodec.float_to_half(values).tolist() == [0, 0x3800, 0x3C00, 0xC000, 0x3C00, 0, 0x7C00]
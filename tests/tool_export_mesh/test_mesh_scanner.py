@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+import MeshCodec
+import MeshScanner
+
+def _write_mesh(path, grid, n):
+    positions, triangles = grid(n)
+    num_verts = len(positions)
+    assert MeshCodec.ExportMeshFromNumpy({
+        'max_border': 0.0,
+        'positions_raw': positions,
+        'vertex_indices_raw': triangles.ravel(),
+        'normals': np.tile(np.float32([0, 0, 1]), (num_verts, 1)),
+        'uv_coords': positions[:, :2] / n,
+        'tangents': np.tile(np.float32([1, 0, 0]), (num_verts, 1)),
+        'bitangent_signs': np.ones(num_verts, dtype=np.int32),
+    }, str(path))
+
+@pytest.fixture
+def mesh_folder(tmp_path, grid):
+    root = tmp_path / 'meshes'
+    (root / 'sub').mkdir(parents=True)
+    _write_mesh(root / 'a.mesh', grid, 3)
+    _write_mesh(root / 'sub' / 'b.mesh', grid, 4)
+    (root / 'sub' / 'broken.mesh').write_bytes(b'\x02\x00\x00\x00')
+    (root / 'notes.txt').write_text('not a mesh')
+    return root
+
+def _rows(columns):
+    return {os.path.basename(path): i for i, path in enumerate(columns['path'])}
+
+@pytest.mark.parametrize('extension', ['.npz', '.sqlite'])
+def test_scan_reads_headers(tmp_path, mesh_folder, extension):
+    output = str(tmp_path / f'index{extension}')
+    columns = MeshScanner.ScanMeshHeaders(str(mesh_folder), output, max_workers=1)
+    rows = _rows(columns)
+
+    assert sorted(rows) == ['a.mesh', 'b.mesh', 'broken.mesh']
+    assert columns['num_vertices'][rows['a.mesh']] == 9 and columns['num_triangles'][rows['a.mesh']] == 8
+    assert columns['num_vertices'][rows['b.mesh']] == 16 and columns['num_triangles'][rows['b.mesh']] == 18
+    assert columns['num_vertices'][rows['broken.mesh']] == -1 and columns['error'][rows['broken.mesh']] != ''
+    assert sorted(row[0] for row in MeshScanner.load_scan(output)) == sorted(columns['path'])
+
+def test_scan_skips_unchanged_and_resumes(tmp_path, mesh_folder, grid):
+    output = str(tmp_path / 'index.npz')
+    a, b = str(mesh_folder / 'a.mesh'), str(mesh_folder / 'sub' / 'b.mesh')
+    # A checkpoint holding a as scanned with a marker count, and b as it was before it changed
+    stat_a, stat_b = os.stat(a), os.stat(b)
+    MeshScanner.write_scan([
+        (a, stat_a.st_size, stat_a.st_mtime_ns, 12345, 1, 0, 1.0, 0, 0, ''),
+        (b, stat_b.st_size, stat_b.st_mtime_ns - 1, 12345, 1, 0, 1.0, 0, 0, ''),
+    ], output)
+
+    columns = MeshScanner.ScanMeshHeaders(str(mesh_folder), output, max_workers=1)
+    rows = _rows(columns)
+    # Same size and mtime is taken from the table, a changed mtime and files missing from it are read
+    assert columns['num_vertices'][rows['a.mesh']] == 12345
+    assert columns['num_vertices'][rows['b.mesh']] == 16
+    assert 'broken.mesh' in rows
+
+    _write_mesh(a, grid, 5)
+    os.utime(a, ns=(stat_a.st_atime_ns, stat_a.st_mtime_ns + 10 ** 9))
+    columns = MeshScanner.ScanMeshHeaders(str(mesh_folder), output, max_workers=1)
+    assert columns['num_vertices'][_rows(columns)['a.mesh']] == 25
+
+def test_scan_mesh_header_of_a_vanished_file(tmp_path):
+    row = MeshScanner.scan_mesh_header(str(tmp_path / 'gone.mesh'))
+    assert row[0] == str(tmp_path / 'gone.mesh')
+    assert row[1:4] == (-1, -1, -1) and row[-1] != ''
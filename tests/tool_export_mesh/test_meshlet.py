@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import utils_meshlet
+
+@pytest.mark.parametrize('max_vertices, max_primitives', [(utils_meshlet.MAX_VERTICES, utils_meshlet.MAX_PRIMITIVES), (16, 8)])
+def test_build_meshlets_covers_every_triangle_within_limits(grid, rng, max_vertices, max_primitives):
+    positions, triangles = grid(50)
+    triangles = triangles[rng.permutation(len(triangles))]
+    order, primitive_counts = utils_meshlet.build_meshlets(triangles, positions, max_vertices, max_primitives)
+
+    assert np.array_equal(np.sort(order), np.arange(len(triangles)))
+    assert primitive_counts.sum() == len(triangles)
+    assert np.all(primitive_counts >= 1) and np.all(primitive_counts <= max_primitives)
+
+    ordered = triangles[order]
+    starts = np.cumsum(primitive_counts) - primitive_counts
+    for start, count in zip(starts, primitive_counts):
+        assert len(np.unique(ordered[start:start + count])) <= max_vertices
+
+def test_meshlet_records_match_meshlets(grid):
+    positions, triangles = grid(30)
+    order, primitive_counts = utils_meshlet.build_meshlets(triangles, positions)
+    ordered = triangles[order]
+    records = utils_meshlet.meshlet_records(ordered, primitive_counts)
+
+    assert records.dtype == np.uint32 and records.shape == (len(primitive_counts), 4)
+    assert np.array_equal(records[:, 2], primitive_counts)
+    assert np.array_equal(records[:, 1], np.cumsum(records[:, 0]) - records[:, 0])
+    assert records[0, 3] == 0 and np.all(records[:, 3] % 4 == 0)
+
+def test_cull_data_boxes_contain_their_triangles(grid):
+    positions, triangles = grid(30)
+    order, primitive_counts = utils_meshlet.build_meshlets(triangles, positions)
+    ordered = triangles[order]
+    culldata = utils_meshlet.cull_data(ordered, positions, primitive_counts)
+
+    assert culldata.shape == (len(primitive_counts), 6)
+    starts = np.cumsum(primitive_counts) - primitive_counts
+    for (start, count), box in zip(zip(starts, primitive_counts), culldata):
+        corners = positions[ordered[start:start + count].ravel()]
+        assert np.all(corners >= box[:3] - box[3:] - 1e-6)
+        assert np.all(corners <= box[:3] + box[3:] + 1e-6)
+
+def test_build_meshlets_rejects_impossible_limits(grid):
+    positions, triangles = grid(4)
+    with pytest.raises(ValueError):
+        utils_meshlet.build_meshlets(triangles, positions, 2, 1)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import MorphCodec
+
+def _sparse_morphs(rng, num_vertices = 2000, num_keys = 6) -> MorphCodec.SparseMorphs:
+    indices = [np.sort(rng.choice(num_vertices, rng.integers(1, num_vertices // 2), replace=False)) for _ in range(num_keys)]
+    def values(n, scale):
+        return (rng.normal(size=(n, 3)) * scale).astype(np.float32)
+    return MorphCodec.SparseMorphs(
+        num_vertices,
+        [f'key{k}' for k in range(num_keys)],
+        indices,
+        [values(len(ids), 0.05) for ids in indices],
+        [np.abs(values(len(ids), 100)).clip(0, 255) for ids in indices],
+        [values(len(ids), 0.3).clip(-1, 1) for ids in indices],
+        [values(len(ids), 0.3).clip(-1, 1) for ids in indices],
+    )
+
+def test_dense_round_trip(rng):
+    sparse = _sparse_morphs(rng, num_vertices=300, num_keys=3)
+    dense = sparse.to_dense()
+    again = MorphCodec.SparseMorphs.from_dense(dense)
+
+    assert again.shape_keys == sparse.shape_keys and again.num_vertices == sparse.num_vertices
+    for k in range(len(sparse.shape_keys)):
+        stored = np.any(np.abs(sparse.delta_positions[k]) > MorphCodec.DELTA_THRESHOLD, axis=1)
+        np.testing.assert_array_equal(again.indices[k], sparse.indices[k][stored])
+        for field in MorphCodec.SparseMorphs.fields:
+            np.testing.assert_array_equal(getattr(again, field)[k], getattr(sparse, field)[k][stored])
+
+def test_sparse_and_dense_files_match(tmp_path, rng):
+    sparse = _sparse_morphs(rng, num_vertices=500, num_keys=4)
+    dense = sparse.to_dense()
+    assert MorphCodec.ExportSparseMorph(sparse, str(tmp_path / 'sparse.dat'))
+    with MorphCodec.MorphWriter(str(tmp_path / 'dense.dat'), 500, dense['shapeKeys']) as writer:
+        writer.write_keys(*(dense[key] for key in MorphCodec.SparseMorphs._dense_keys))
+    assert (tmp_path / 'sparse.dat').read_bytes() == (tmp_path / 'dense.dat').read_bytes()
+
+def test_sparse_file_round_trip(tmp_path, rng):
+    sparse = _sparse_morphs(rng)
+    path = tmp_path / 'morph.dat'
+    assert MorphCodec.ExportSparseMorph(sparse, str(path))
+    read = MorphCodec.ImportMorphAsSparse(str(path))
+
+    assert read.num_vertices == sparse.num_vertices and read.shape_keys == sparse.shape_keys
+    for k in range(len(sparse.shape_keys)):
+        stored = np.any(np.abs(sparse.delta_positions[k]) > MorphCodec.DELTA_THRESHOLD, axis=1)
+        np.testing.assert_array_equal(read.indices[k], sparse.indices[k][stored])
+        # Positions are stored as halves, colors as RGB565 and normals and tangents as DEC3N
+        np.testing.assert_allclose(read.delta_positions[k], sparse.delta_positions[k][stored], rtol=2 ** -10, atol=1e-7)
+        np.testing.assert_allclose(read.target_colors[k], sparse.target_colors[k][stored], atol=8)
+        np.testing.assert_allclose(read.delta_normals[k], sparse.delta_normals[k][stored], atol=2 / 1023)
+        np.testing.assert_allclose(read.delta_tangents[k], sparse.delta_tangents[k][stored], atol=2 / 1023)
+
+def test_encode_decode_records(rng):
+    n = 1000
+    delta_positions = (rng.normal(size=(n, 3)) * 0.1).astype(np.float32)
+    target_colors = rng.integers(0, 256, (n, 3)).astype(np.float32)
+    delta_normals = rng.uniform(-1, 1, (n, 3)).astype(np.float32)
+    delta_tangents = rng.uniform(-1, 1, (n, 3)).astype(np.float32)
+
+    records = MorphCodec.encode_records(delta_positions, target_colors, delta_normals, delta_tangents)
+    assert records.dtype == MorphCodec.MORPH_DATA_DTYPE and len(records) == n
+    positions, colors, normals, tangents = MorphCodec.decode_records(records)
+
+    np.testing.assert_allclose(positions, delta_positions, rtol=2 ** -10, atol=1e-7)
+    # RGB565 keeps the top 5, 6 and 5 bits of every channel
+    np.testing.assert_array_equal(colors, target_colors.astype(np.uint8) & np.array([0xF8, 0xFC, 0xF8]))
+    np.testing.assert_allclose(normals, delta_normals, atol=2 / 1023)
+    np.testing.assert_allclose(tangents, delta_tangents, atol=2 / 1023)
+    # Halves and RGB565 are exact once decoded, DEC3N truncates and may land one step lower when encoded again
+    again = MorphCodec.encode_records(positions, colors, normals, tangents)
+    assert np.array_equal(again['offset'], records['offset'])
+    assert np.array_equal(again['target_color'], records['target_color'])
+
+def test_encoded_morphs_round_trip(rng):
+    sparse = _sparse_morphs(rng)
+    encoded = MorphCodec.EncodedMorphs.from_sparse(sparse)
+    decoded = encoded.to_sparse()
+
+    assert encoded.shape_keys == sparse.shape_keys and encoded.nnz <= sparse.nnz
+    assert encoded.errors.shape == (len(sparse.shape_keys), 3)
+    for k in range(len(sparse.shape_keys)):
+        stored = np.any(np.abs(sparse.delta_positions[k]) > MorphCodec.DELTA_THRESHOLD, axis=1)
+        assert np.array_equal(decoded.indices[k], sparse.indices[k][stored])
+        for column, field in enumerate(('delta_positions', 'delta_normals', 'delta_tangents')):
+            error = np.abs(getattr(decoded, field)[k] - getattr(sparse, field)[k][stored]).max(initial=0)
+            assert error == pytest.approx(encoded.errors[k, column])
+    assert encoded.errors[:, 1:].max() <= 2 / 1023
+
+def test_encoded_and_sparse_files_match(tmp_path, rng):
+    sparse = _sparse_morphs(rng)
+    encoded = MorphCodec.EncodedMorphs.from_sparse(sparse)
+    assert MorphCodec.ExportSparseMorph(sparse, str(tmp_path / 'sparse.dat'))
+    assert MorphCodec.ExportSparseMorph(encoded, str(tmp_path / 'encoded.dat'))
+    assert (tmp_path / 'sparse.dat').read_bytes() == (tmp_path / 'encoded.dat').read_bytes()
+
+def test_file_round_trip(tmp_path, rng):
+    sparse = _sparse_morphs(rng)
+    encoded = MorphCodec.EncodedMorphs.from_sparse(sparse)
+    path = tmp_path / 'morph.dat'
+    assert MorphCodec.ExportSparseMorph(encoded, str(path))
+    read = MorphCodec.ImportMorphAsSparse(str(path))
+    expected = encoded.to_sparse()
+
+    assert read.num_vertices == sparse.num_vertices and read.shape_keys == sparse.shape_keys
+    for k in range(len(sparse.shape_keys)):
+        assert np.array_equal(read.indices[k], expected.indices[k])
+        for field in MorphCodec.SparseMorphs.fields:
+            np.testing.assert_array_equal(getattr(read, field)[k], getattr(expected, field)[k])
+
+def test_import_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a_morph.dat'
+    path.write_bytes(b'\0' * 32)
+    with pytest.raises(MorphCodec.MorphFormatException):
+        MorphCodec.ImportMorphAsSparse(str(path))
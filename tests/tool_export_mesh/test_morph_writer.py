@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import MorphCodec
+
+def _dense_keys(rng, num_keys, num_vertices):
+    # Mostly static keys, the writer only stores vertices that move
+    moving = rng.random((num_keys, num_vertices, 1)) < 0.3
+    delta_positions = (rng.normal(size=(num_keys, num_vertices, 3)) * 0.05 * moving).astype(np.float32)
+    target_colors = rng.uniform(0, 255, (num_keys, num_vertices, 3)).astype(np.float32)
+    delta_normals = rng.uniform(-1, 1, (num_keys, num_vertices, 3)).astype(np.float32)
+    delta_tangents = rng.uniform(-1, 1, (num_keys, num_vertices, 3)).astype(np.float32)
+    return delta_positions, target_colors, delta_normals, delta_tangents
+
+def test_chunked_writer_matches_one_write(tmp_path, rng):
+    arrays = _dense_keys(rng, 5, 500)
+    shape_keys = [f'key{k}' for k in range(5)]
+    with MorphCodec.MorphWriter(str(tmp_path / 'whole.dat'), 500, shape_keys) as writer:
+        writer.write_keys(*arrays)
+    with MorphCodec.MorphWriter(str(tmp_path / 'chunked.dat'), 500, shape_keys) as writer:
+        for start in range(0, 5, 2):
+            writer.write_keys(*(a[start:start + 2] for a in arrays))
+    assert (tmp_path / 'whole.dat').read_bytes() == (tmp_path / 'chunked.dat').read_bytes()
+
+def test_writer_rejects_missing_keys(tmp_path):
+    with pytest.raises(MorphCodec.MorphFormatException):
+        with MorphCodec.MorphWriter(str(tmp_path / 'short.dat'), 10, ['a', 'b']) as writer:
+            writer.write_keys(*(np.zeros((1, 10, 3), dtype=np.float32) for _ in range(4)))
+    assert not (tmp_path / 'short.dat').exists()
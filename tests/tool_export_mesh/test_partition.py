@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import utils_partition
+
+@pytest.mark.parametrize('max_vertices', [300, 1000, 4000])
+def test_partition_triangles_stays_under_max_vertices(grid, max_vertices):
+    positions, triangles = grid(80)
+    centroids = positions[triangles].mean(axis=1)
+    labels = utils_partition.partition_triangles(triangles, triangles, centroids, max_vertices)
+
+    assert labels.shape == (len(triangles),)
+    assert np.array_equal(np.unique(labels), np.arange(labels.max() + 1))
+    for label in range(labels.max() + 1):
+        assert len(np.unique(triangles[labels == label])) <= max_vertices
+
+def test_partition_triangles_keeps_small_meshes_whole(grid):
+    positions, triangles = grid(10)
+    labels = utils_partition.partition_triangles(triangles, triangles, positions[triangles].mean(axis=1), 65535)
+    assert np.all(labels == 0)
+
+def test_partition_triangles_with_split_atomics(grid):
+    # Atomic vertices split at a uv seam share their mesh vertex, adjacency must still follow the mesh vertices
+    positions, triangles = grid(60)
+    atomics = triangles + np.where(positions[triangles][..., 0] < 30, 0, len(positions))
+    labels = utils_partition.partition_triangles(atomics, triangles, positions[triangles].mean(axis=1), 500)
+    for label in range(labels.max() + 1):
+        assert len(np.unique(atomics[labels == label])) <= 500
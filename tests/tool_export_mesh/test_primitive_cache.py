@@ -0,0 +1,55 @@
+import numpy as np
+
+from utils_primitive import Primitive, PrimitiveCache
+
+def _primitive(num_bytes):
+    primitive = object.__new__(Primitive)
+    primitive.positions = np.zeros(num_bytes, dtype=np.uint8)
+    return primitive
+
+def _key(name, mesh_options=()):
+    return (name, (), mesh_options)
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = PrimitiveCache(max_bytes=2500)
+    primitives = {name: _primitive(1000) for name in 'abc'}
+    cache.put(_key('a'), primitives['a'])
+    cache.put(_key('b'), primitives['b'])
+    assert cache.total_bytes == 2000
+
+    # Using a makes b the oldest entry
+    assert cache.get(_key('a')) is primitives['a']
+    cache.put(_key('c'), primitives['c'])
+
+    assert cache.get(_key('b')) is None
+    assert cache.get(_key('a')) is primitives['a']
+    assert cache.get(_key('c')) is primitives['c']
+    assert cache.total_bytes == 2000
+
+def test_keeps_a_single_entry_larger_than_the_cap():
+    cache = PrimitiveCache(max_bytes=100)
+    primitive = _primitive(1000)
+    cache.put(_key('a'), primitive)
+    assert cache.get(_key('a')) is primitive
+
+    cache.put(_key('b'), _primitive(10))
+    assert cache.get(_key('a')) is None
+    assert cache.total_bytes == 10
+
+def test_counts_arrays_added_after_put():
+    cache = PrimitiveCache(max_bytes=2500)
+    first = _primitive(1000)
+    cache.put(_key('a'), first)
+    first.cached_normals = np.zeros(1000, dtype=np.uint8)
+    cache.put(_key('b'), _primitive(1000))
+    assert cache.get(_key('a')) is None
+
+def test_mesh_options_and_morphs_must_match():
+    cache = PrimitiveCache()
+    primitive = _primitive(10)
+    cache.put(_key('a', ('smooth',)), primitive)
+
+    assert cache.get(_key('a', ('flat',))) is None
+    assert cache.get(_key('a', ('flat',)), mesh_export=False) is primitive
+    assert cache.get(_key('a', ('smooth',)), with_morphs=True) is None
+    assert cache.get(None) is None
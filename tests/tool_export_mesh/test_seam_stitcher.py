@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import utils_primitive
+from utils_primitive import Primitive
+
+GatheredData = Primitive.GatheredData
+
+def _unit(values):
+    return (values / np.linalg.norm(values, axis=-1, keepdims=True)).astype(np.float32)
+
+def _sheet(rng, x0, nx, ny, shape_keys):
+    '''
+    Gathered nx * ny vertex sheet in the z = 0 plane starting at x = x0, one atomic vertex per vertex.
+    '''
+    xs, ys = np.meshgrid(np.arange(nx) + x0, np.arange(ny), indexing='ij')
+    i, j = np.meshgrid(np.arange(nx - 1), np.arange(ny - 1), indexing='ij')
+    a = (i * ny + j).ravel()
+    num_verts = nx * ny
+
+    primitive = object.__new__(Primitive)
+    primitive.options = Primitive.Options()
+    primitive.atomic_vertices = np.zeros(num_verts, dtype=[('vertex_index', np.uint32),
+        ('normal_x', np.float32), ('normal_y', np.float32), ('normal_z', np.float32)])
+    primitive.atomic_vertices['vertex_index'] = np.arange(num_verts)
+    normals = _unit(rng.normal(size=(num_verts, 3)) * 0.1 + [0, 0, 1])
+    for k, axis in enumerate('xyz'):
+        primitive.atomic_vertices['normal_' + axis] = normals[:, k]
+    primitive.atomic_to_loop_id = np.arange(num_verts)
+    primitive.triangles = np.concatenate([np.stack([a, a + ny, a + ny + 1], 1), np.stack([a, a + ny + 1, a + 1], 1)]).ravel()
+    primitive.raw_positions = np.stack([xs.ravel(), ys.ravel(), np.zeros(num_verts)], 1).astype(np.float32)
+    primitive.raw_tangents = _unit(np.cross(normals, [0, 1, 0]))
+    primitive.raw_bitangent_signs = np.ones(num_verts, np.float32)
+    primitive.shapeKeys = shape_keys
+    primitive.raw_morph_normals = [_unit(rng.normal(size=(num_verts, 3)) * 0.1 + [0, 0, 1]) for _ in shape_keys]
+    primitive.raw_morph_tangents = [_unit(np.cross(n, [0, 1, 0])) for n in primitive.raw_morph_normals]
+    primitive.raw_morph_normal_deltas = [np.zeros((num_verts, 3), np.float32) for _ in shape_keys]
+    primitive.raw_morph_tangent_deltas = [np.zeros((num_verts, 3), np.float32) for _ in shape_keys]
+    primitive.raw_morph_position_deltas = [rng.normal(size=(num_verts, 3)).astype(np.float32) for _ in shape_keys]
+    primitive.encoded_morphs = None
+    primitive.gathered = {GatheredData.POSITION, GatheredData.TRIANGLES, GatheredData.NORMALS, GatheredData.MORPHNORMALS}
+    return primitive
+
+@pytest.fixture
+def seam(rng):
+    # The source spans x 0..20, one reference starts just past its right border, the other ends just past its left one
+    source = _sheet(rng, 0, 21, 8, ['a', 'b', 'c'])
+    right = _sheet(rng, 20.001, 6, 8, ['c', 'a'])
+    left = _sheet(rng, -4.999, 6, 8, ['b'])
+    return source, right, left
+
+def _border(primitive, x):
+    return np.flatnonzero(np.isclose(primitive.positions[:, 0], x, rtol=0, atol=1e-6))
+
+def test_snap_positions_and_normals(seam):
+    source, right, left = seam
+    stitcher = utils_primitive.SeamStitcher([right, left], 0.01)
+    # Only open borders of the references take part, their inner vertices are never hit
+    assert len(stitcher.atomic_ids) == 2 * (2 * 6 + 2 * 8 - 4)
+
+    original = source.positions.copy()
+    right_rows, left_rows = _border(source, 20), _border(source, 0)
+    stitcher.copy_normals(source)
+    stitcher.snap_positions(source)
+
+    np.testing.assert_array_equal(source.normals[right_rows], right.normals[_border(right, 20.001)])
+    np.testing.assert_array_equal(source.positions[right_rows], right.positions[_border(right, 20.001)])
+    np.testing.assert_array_equal(source.positions[left_rows], left.positions[_border(left, 0.001)])
+    inner = (original[:, 0] > 0) & (original[:, 0] < 20)
+    np.testing.assert_array_equal(source.positions[inner], original[inner])
+
+def test_copy_morph_normals_by_shape_key_name(seam):
+    source, right, left = seam
+    raw_normals = [n.copy() for n in source.raw_morph_normals]
+    utils_primitive.SeamStitcher([right, left], 0.01).copy_morph_normals(source, snap_delta_positions=True)
+
+    rows, right_rows, left_rows = _border(source, 20), _border(right, 20.001), _border(left, 0.001)
+    np.testing.assert_allclose(source.morph_normals[0][rows], right.morph_normals[1][right_rows], atol=1e-6)
+    np.testing.assert_allclose(source.morph_normals[2][rows], right.morph_normals[0][right_rows], atol=1e-6)
+    np.testing.assert_array_equal(source.morph_position_deltas[2][rows], right.morph_position_deltas[0][right_rows])
+    # b only exists on the left reference
+    np.testing.assert_allclose(source.morph_normals[1][_border(source, 0)], left.morph_normals[0][left_rows], atol=1e-6)
+    np.testing.assert_allclose(source.morph_normals[1][rows], raw_normals[1][rows], atol=1e-6)
+
+def test_rejects_ungathered_references(rng):
+    reference = _sheet(rng, 0, 3, 3, [])
+    reference.gathered = {GatheredData.POSITION}
+    with pytest.raises(utils_primitive.UngatheredException):
+        utils_primitive.SeamStitcher([reference])
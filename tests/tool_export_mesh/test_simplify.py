@@ -0,0 +1,39 @@
+import numpy as np
+
+import utils_simplify
+
+RATIOS = [0.5, 0.25, 0.1]
+
+def test_lod_chain_hits_target_triangle_counts(grid):
+    positions, triangles = grid(40)
+    lods = utils_simplify.lod_chain(triangles, positions, RATIOS)
+
+    assert len(lods) == len(RATIOS)
+    for lod, ratio in zip(lods, sorted(RATIOS, reverse=True)):
+        assert lod.shape[1] == 3
+        assert len(lod) <= int(len(triangles) * ratio)
+        # A flat grid has collapses left well below every ratio, the target is met and not overshot by much
+        assert len(lod) >= int(len(triangles) * ratio) * 0.9
+    assert all(len(a) >= len(b) for a, b in zip(lods, lods[1:]))
+
+def test_lod_chain_keeps_locked_and_boundary_vertices(grid, rng):
+    positions, triangles = grid(40)
+    boundary = utils_simplify.boundary_vertices(triangles, len(positions))
+    locked = np.zeros(len(positions), dtype=bool)
+    locked[rng.choice(np.flatnonzero(~boundary), 20, replace=False)] = True
+
+    lods = utils_simplify.lod_chain(triangles, positions, RATIOS, locked=locked)
+    for lod in lods:
+        used = np.zeros(len(positions), dtype=bool)
+        used[lod.ravel()] = True
+        assert np.all(used[boundary | locked])
+        # Triangles stay over the original vertices and non degenerate
+        assert lod.max() < len(positions)
+        assert np.all((lod[:, 0] != lod[:, 1]) & (lod[:, 1] != lod[:, 2]) & (lod[:, 0] != lod[:, 2]))
+
+def test_boundary_vertices_of_a_grid(grid):
+    n = 10
+    positions, triangles = grid(n)
+    boundary = utils_simplify.boundary_vertices(triangles, len(positions))
+    y, x = np.divmod(np.arange(n * n), n)
+    assert np.array_equal(boundary, (x == 0) | (y == 0) | (x == n - 1) | (y == n - 1))
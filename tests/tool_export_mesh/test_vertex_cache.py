@@ -0,0 +1,37 @@
+import numpy as np
+
+import utils_vertex_cache
+
+def test_cache_statistics_returns_floats(grid):
+    positions, triangles = grid(8)
+    acmr, atvr = utils_vertex_cache.cache_statistics(triangles, len(positions))
+    assert type(acmr) is float and type(atvr) is float
+    assert utils_vertex_cache.cache_statistics(triangles[:0], len(positions)) == (0.0, 0.0)
+
+def test_tipsify_is_a_permutation(grid, rng):
+    positions, triangles = grid(40)
+    triangles = triangles[rng.permutation(len(triangles))]
+    order, boundaries = utils_vertex_cache.tipsify(triangles, len(positions))
+    assert np.array_equal(np.sort(order), np.arange(len(triangles)))
+    assert np.all(np.diff(boundaries) > 0)
+    assert boundaries[0] == 0 and boundaries[-1] < len(triangles)
+
+def test_tipsify_lowers_acmr(grid, rng):
+    positions, triangles = grid(40)
+    triangles = triangles[rng.permutation(len(triangles))]
+    before, _ = utils_vertex_cache.cache_statistics(triangles, len(positions))
+    order, _ = utils_vertex_cache.tipsify(triangles, len(positions))
+    after, _ = utils_vertex_cache.cache_statistics(triangles[order], len(positions))
+    assert after < before
+    # A regular grid reorders to close to one miss per triangle
+    assert after < 1.0
+
+def test_fetch_order_renumbers_by_first_use(grid, rng):
+    positions, triangles = grid(10)
+    triangles = triangles[rng.permutation(len(triangles))]
+    order = utils_vertex_cache.fetch_order(triangles, len(positions))
+    assert np.array_equal(np.sort(order), np.arange(len(positions)))
+    new_ids = np.empty_like(order)
+    new_ids[order] = np.arange(len(order))
+    _, first = np.unique(new_ids[triangles.ravel()], return_index=True)
+    assert np.all(np.diff(first) > 0)
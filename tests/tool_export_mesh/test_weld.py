@@ -0,0 +1,58 @@
+import numpy as np
+
+import utils_weld
+
+_FIELDS = ['vertex_index', 'uv_x', 'uv_y', 'uv_x_2', 'uv_y_2', 'normal_x', 'normal_y', 'normal_z',
+    'color_r', 'color_g', 'color_b', 'color_a']
+
+def _atomics(rows):
+    dtype = np.dtype([('vertex_index', np.int32)] + [(name, np.float32) for name in _FIELDS[1:]])
+    return np.array([tuple(row) for row in rows], dtype=dtype)
+
+def _row(vertex_index, uv=(0.0, 0.0), normal=(0.0, 0.0, 1.0)):
+    return (vertex_index, *uv, 0.0, 0.0, *normal, 1.0, 1.0, 1.0, 1.0)
+
+def test_weld_keeps_first_appearance_order():
+    keys = np.array([[5, 1], [3, 2], [5, 1], [7, 7], [3, 2]], dtype=np.uint64)
+    representatives, inverse = utils_weld.weld(keys)
+    np.testing.assert_array_equal(representatives, [0, 1, 3])
+    np.testing.assert_array_equal(inverse, [0, 1, 0, 2, 1])
+
+def test_weld_falls_back_to_full_keys_on_collision(monkeypatch, rng):
+    keys = rng.integers(0, 4, size=(200, 3)).astype(np.uint64)
+    expected = utils_weld.weld(keys)
+
+    # Every row hashing alike would merge everything without the full key comparison
+    monkeypatch.setattr(utils_weld, 'hash_rows', lambda keys: np.zeros(len(keys), dtype=np.uint64))
+    representatives, inverse = utils_weld.weld(keys)
+
+    np.testing.assert_array_equal(representatives, expected[0])
+    np.testing.assert_array_equal(inverse, expected[1])
+    np.testing.assert_array_equal(keys[representatives[inverse]], keys)
+
+def test_weld_empty():
+    representatives, inverse = utils_weld.weld(np.zeros((0, 2), dtype=np.uint64))
+    assert len(representatives) == 0 and len(inverse) == 0
+
+def test_atomic_keys_stored_precision():
+    atomics = _atomics([
+        _row(0, uv=(0.25, 0.5)),
+        _row(0, uv=(0.25, 0.5), normal=(0.0, 0.0, 2.0)),
+        _row(0, uv=(-0.0, 0.5)),
+        _row(0, uv=(0.0, 0.5)),
+        _row(1, uv=(0.25, 0.5)),
+    ])
+    _, inverse = utils_weld.weld(utils_weld.atomic_keys(atomics))
+    # Unnormalized normals and -0.0 key like what gets written, vertex indices never merge
+    np.testing.assert_array_equal(inverse, [0, 0, 1, 1, 2])
+
+def test_atomic_keys_tolerance_welds_near_loops():
+    atomics = _atomics([
+        _row(0, uv=(0.25, 0.5)),
+        _row(0, uv=(0.2504, 0.5), normal=(0.002, 0.0, 1.0)),
+        _row(0, uv=(0.3, 0.5)),
+    ])
+    _, exact = utils_weld.weld(utils_weld.atomic_keys(atomics))
+    _, snapped = utils_weld.weld(utils_weld.atomic_keys(atomics, uv_tolerance=1e-2, normal_tolerance=1e-2))
+    np.testing.assert_array_equal(exact, [0, 1, 2])
+    np.testing.assert_array_equal(snapped, [0, 0, 1])